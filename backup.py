@@ -0,0 +1,368 @@
+import discord
+import io
+import json
+import re
+import gzip
+import hashlib
+import secrets
+import logging
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from participants import ParticipantSet, json_default
+from storage import giveaway_fields
+
+SNAPSHOT_TITLE = "🗄️ Givzy Giveaway Database Backup"
+DATABASE_VERSION = "2.2-givzy"
+CHUNK_SIZE = 1900
+
+# Snapshots are uploaded as gzip-compressed compact JSON attachments
+SNAPSHOT_SCHEMA = 3
+SNAPSHOT_FILENAME = "givzy-giveaways.json.gz"
+# Discord caps the total upload size of one message (guild.filesize_limit, which grows with
+# boosts); this is the floor used when the guild is unknown. Room is left for the request framing
+DEFAULT_UPLOAD_LIMIT = 8 * 1024 * 1024
+UPLOAD_HEADROOM = 64 * 1024
+# After a snapshot turned out too big to upload, keep posting deltas and only try again this much later
+OVERSIZE_RETRY_SECONDS = 3600
+
+_SCHEMA_RE = re.compile(r"\*\*Schema:\*\* `(\d+)`")
+_HASH_RE = re.compile(r"\*\*Hash:\*\* `([0-9a-f]+)`")
+_SPLIT_RE = re.compile(r"\*\*Split into (\d+) parts\*\*")
+_PART_RE = re.compile(r"^\*\*Part (\d+)/(\d+):\*\*")
+# Each posting attempt of a delta carries its own tag: a failed attempt leaves parts behind
+# under the same sequence number as its retry, and they must not be mixed
+_DELTA_RE = re.compile(r"^\*\*Delta (\d+) of `([0-9a-f]+)`(?: • Attempt `([0-9a-f]+)`)? • Part (\d+)/(\d+):\*\*")
+
+def _fenced_json(content: str) -> Optional[str]:
+    start = content.find("```json")
+    end = content.rfind("```")
+    if start == -1 or end <= start + 6:
+        return None
+    return content[start + 7:end].strip()
+
+class ChannelBackup:
+    """Off-host backup of the giveaway map in the database channel.
+
+    Instead of re-uploading the whole database on every save, each flush posts a
+    delta (changed giveaways, participants appended since the last flush, removed
+    giveaways). A full snapshot is posted first and then again every
+    ``snapshot_every`` deltas; restore replays the newest snapshot plus its deltas.
+    With ``track_changes`` off nothing is recorded and only explicit full snapshots
+    are posted (a sharded process only sees part of the map, so its deltas would
+    not line up with anyone's snapshot).
+    """
+
+    def __init__(self, bot, channel_id: int, snapshot_every: int = 50, track_changes: bool = True):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.snapshot_every = snapshot_every
+        self.track_changes = track_changes
+        self.snapshot_hash: Optional[str] = None
+        self.deltas_since_snapshot = 0
+        self._changed: Set[str] = set()
+        self._joins: Dict[str, List[int]] = {}
+        self._removed: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self._oversize_retry_at = 0.0
+
+    # --- change tracking ---------------------------------------------------------
+
+    def mark_changed(self, message_id: str):
+        if not self.track_changes:
+            return
+        self._changed.add(message_id)
+        self._removed.discard(message_id)
+
+    def mark_join(self, message_id: str, user_id: int):
+        if not self.track_changes:
+            return
+        self._joins.setdefault(message_id, []).append(user_id)
+
+    def mark_removed(self, message_id: str):
+        if not self.track_changes:
+            return
+        self._changed.discard(message_id)
+        self._joins.pop(message_id, None)
+        self._removed.add(message_id)
+
+    def request_snapshot(self):
+        """Make the next flush post a full snapshot (e.g. after a bulk import too big for a delta)."""
+        self.deltas_since_snapshot = self.snapshot_every
+
+    def has_changes(self) -> bool:
+        return bool(self._changed or self._joins or self._removed)
+
+    # --- posting -----------------------------------------------------------------
+
+    async def flush(self, giveaways: Dict[str, dict], force_snapshot: bool = False):
+        """Post pending changes as a delta, or a full snapshot when one is due."""
+        async with self._lock:
+            channel = self.bot.get_channel(self.channel_id)
+            if not channel:
+                logging.error(f"Database channel {self.channel_id} not found!")
+                return
+
+            snapshot_due = (force_snapshot or self.snapshot_hash is None
+                            or (self.deltas_since_snapshot >= self.snapshot_every
+                                and time.monotonic() >= self._oversize_retry_at))
+            if snapshot_due:
+                changed, joins, removed = self._take_pending()
+                try:
+                    await self._post_snapshot(channel, giveaways)
+                except ValueError as e:
+                    self._restore_pending(changed, joins, removed)
+                    self._oversize_retry_at = time.monotonic() + OVERSIZE_RETRY_SECONDS
+                    logging.critical(f"❌ Database snapshot not saved, the channel backup cannot checkpoint: {e}")
+                except discord.HTTPException as e:
+                    self._restore_pending(changed, joins, removed)
+                    logging.error(f"Error saving database snapshot: {e}")
+                return
+
+            if not self.has_changes():
+                return
+
+            changed, joins, removed = self._take_pending()
+            delta = {
+                "changed": {mid: giveaway_fields(giveaways[mid]) for mid in changed if mid in giveaways},
+                "joins": joins,
+                "removed": sorted(removed),
+            }
+            try:
+                await self._post_delta(channel, delta)
+            except discord.HTTPException as e:
+                self._restore_pending(changed, joins, removed)
+                logging.error(f"Discord HTTP error saving database delta: {e}")
+
+    def _take_pending(self):
+        pending = (self._changed, self._joins, self._removed)
+        self._changed, self._joins, self._removed = set(), {}, set()
+        return pending
+
+    def _restore_pending(self, changed: Set[str], joins: Dict[str, List[int]], removed: Set[str]):
+        # Put a failed upload's changes back in front of anything recorded meanwhile
+        for message_id, user_ids in self._joins.items():
+            joins.setdefault(message_id, []).extend(user_ids)
+        self._changed |= changed
+        self._removed |= removed
+        self._joins = joins
+
+    async def _post_delta(self, channel, delta: dict):
+        seq = self.deltas_since_snapshot + 1
+        attempt = secrets.token_hex(4)
+        json_content = json.dumps(delta, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        chunks = [json_content[i:i + CHUNK_SIZE] for i in range(0, len(json_content), CHUNK_SIZE)]
+        for i, chunk in enumerate(chunks):
+            await channel.send(f"**Delta {seq} of `{self.snapshot_hash}` • Attempt `{attempt}` • Part {i+1}/{len(chunks)}:**\n```json\n{chunk}\n```")
+        self.deltas_since_snapshot = seq
+        logging.info(f"✅ Database delta {seq} saved ({len(delta['changed'])} changed, "
+                     f"{sum(len(v) for v in delta['joins'].values())} joins, {len(delta['removed'])} removed)")
+
+    async def _post_snapshot(self, channel, giveaways: Dict[str, dict]):
+        metadata = {
+            "version": DATABASE_VERSION,
+            "schema": SNAPSHOT_SCHEMA,
+            "last_updated": datetime.now(timezone.utc).isoformat(),
+            "total_giveaways": len(giveaways),
+            "active_giveaways": sum(1 for g in giveaways.values() if g.get("status") == "active"),
+            "total_servers": len(set(g.get("server_id") for g in giveaways.values() if g.get("server_id"))),
+        }
+        raw = json.dumps({"giveaways": giveaways, "metadata": metadata},
+                         ensure_ascii=False, separators=(",", ":"), default=json_default).encode()
+        compressed = await asyncio.to_thread(gzip.compress, raw, 6)
+        content_hash = hashlib.sha256(raw).hexdigest()[:16]
+
+        guild = getattr(channel, "guild", None)
+        budget = (guild.filesize_limit if guild else DEFAULT_UPLOAD_LIMIT) - UPLOAD_HEADROOM
+        if len(compressed) > budget:
+            # Splitting into several files does not help: the limit is per message
+            raise ValueError(f"snapshot is {len(compressed):,} bytes compressed, over the {budget:,} byte "
+                             f"upload limit of the database channel; it cannot be backed up there")
+        files = [discord.File(io.BytesIO(compressed), filename=SNAPSHOT_FILENAME)]
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        embed = discord.Embed(
+            title=SNAPSHOT_TITLE,
+            description=f"**Database Version:** {DATABASE_VERSION} (Multi-Server)\n"
+                       f"**Total Giveaways:** {metadata['total_giveaways']}\n"
+                       f"**Active:** {metadata['active_giveaways']}\n"
+                       f"**Servers:** {metadata['total_servers']}\n"
+                       f"**Last Updated:** {timestamp}\n"
+                       f"**Size:** {len(raw):,} bytes ({len(compressed):,} compressed)\n"
+                       f"**Schema:** `{SNAPSHOT_SCHEMA}`\n"
+                       f"**Hash:** `{content_hash}`",
+            color=discord.Color.green(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        await channel.send(embed=embed, files=files)
+
+        self.snapshot_hash = content_hash
+        self.deltas_since_snapshot = 0
+        logging.info(f"✅ Database snapshot saved as an attachment "
+                     f"({len(compressed):,} bytes, hash: {content_hash})")
+
+    # --- restoring ---------------------------------------------------------------
+
+    async def restore(self) -> Dict[str, dict]:
+        """Rebuild the giveaway map from the newest complete snapshot plus its deltas."""
+        channel = self.bot.get_channel(self.channel_id)
+        if not channel:
+            logging.error(f"Database channel {self.channel_id} not found!")
+            return {}
+
+        # (base hash, seq) -> {part number: json text}, plus the expected part count
+        delta_parts: Dict[tuple, Dict[int, str]] = {}
+        delta_totals: Dict[tuple, int] = {}
+        # (base hash, seq) -> tag of its newest attempt, the only one whose parts are kept
+        delta_attempts: Dict[tuple, Optional[str]] = {}
+        snapshot_parts: Dict[int, str] = {}
+
+        # Newest first: deltas, then the snapshot's parts, then its header embed
+        async for message in channel.history(limit=None):
+            if message.author != self.bot.user:
+                continue
+            content = message.content or ""
+
+            delta_match = _DELTA_RE.match(content)
+            if delta_match:
+                key = (delta_match.group(2), int(delta_match.group(1)))
+                attempt = delta_attempts.setdefault(key, delta_match.group(3))
+                text = _fenced_json(content)
+                if text is not None and delta_match.group(3) == attempt:
+                    delta_parts.setdefault(key, {}).setdefault(int(delta_match.group(4)), text)
+                    delta_totals.setdefault(key, int(delta_match.group(5)))
+                continue
+
+            part_match = _PART_RE.match(content)
+            if part_match:
+                text = _fenced_json(content)
+                if text is not None:
+                    snapshot_parts.setdefault(int(part_match.group(1)), text)
+                continue
+
+            if not message.embeds or message.embeds[0].title != SNAPSHOT_TITLE:
+                continue
+
+            header = message.embeds[0].description or ""
+            hash_match = _HASH_RE.search(header)
+            split_match = _SPLIT_RE.search(header)
+            if message.attachments:
+                snapshot_parts = {}
+                giveaways = await self._read_attachment_snapshot(message, header)
+                if giveaways is None:
+                    continue
+                snapshot_hash = hash_match.group(1) if hash_match else None
+                applied = self._apply_deltas(giveaways, snapshot_hash, delta_parts, delta_totals)
+                logging.info(f"✅ Restored {len(giveaways)} giveaways from snapshot {snapshot_hash} + {applied} deltas")
+                return giveaways
+            # Text snapshots from before attachment backups
+            if split_match:
+                total = int(split_match.group(1))
+                if len(snapshot_parts) != total or set(snapshot_parts) != set(range(1, total + 1)):
+                    logging.warning(f"Incomplete database snapshot in message {message.id}, trying an older one")
+                    snapshot_parts = {}
+                    continue
+                json_content = "".join(snapshot_parts[i] for i in range(1, total + 1))
+            else:
+                json_content = _fenced_json(content)
+            snapshot_parts = {}
+
+            giveaways = self._parse_snapshot(message.id, json_content)
+            if giveaways is None:
+                continue
+
+            snapshot_hash = hash_match.group(1) if hash_match else None
+            applied = self._apply_deltas(giveaways, snapshot_hash, delta_parts, delta_totals)
+            logging.info(f"✅ Restored {len(giveaways)} giveaways from snapshot {snapshot_hash} + {applied} deltas")
+            return giveaways
+
+        logging.warning("⚠️ No valid database found, starting with empty database")
+        return {}
+
+    async def _read_attachment_snapshot(self, message, header: str) -> Optional[Dict[str, dict]]:
+        schema_match = _SCHEMA_RE.search(header)
+        schema = int(schema_match.group(1)) if schema_match else None
+        if schema != SNAPSHOT_SCHEMA:
+            logging.warning(f"Snapshot {message.id} has unsupported schema {schema}, trying an older one")
+            return None
+        try:
+            attachments = sorted(message.attachments, key=lambda a: a.filename)
+            compressed = b"".join([await attachment.read() for attachment in attachments])
+            raw = await asyncio.to_thread(gzip.decompress, compressed)
+        except (discord.HTTPException, OSError, EOFError) as e:
+            logging.warning(f"Could not download snapshot {message.id}: {e}")
+            return None
+
+        hash_match = _HASH_RE.search(header)
+        if hash_match and hashlib.sha256(raw).hexdigest()[:16] != hash_match.group(1):
+            logging.warning(f"Snapshot {message.id} failed its integrity check, trying an older one")
+            return None
+        return self._parse_snapshot(message.id, raw.decode())
+
+    def _parse_snapshot(self, message_id: int, json_content: Optional[str]) -> Optional[Dict[str, dict]]:
+        if not json_content:
+            return None
+        try:
+            data = json.loads(json_content)
+        except json.JSONDecodeError as e:
+            logging.warning(f"JSON decode error in snapshot {message_id}: {e}")
+            return None
+        if not isinstance(data, dict):
+            return None
+        # Legacy dumps stored the giveaway map at the top level
+        giveaways = data.get("giveaways", data)
+        if not isinstance(giveaways, dict) or not all(isinstance(v, dict) for v in giveaways.values()):
+            return None
+        for entry in giveaways.values():
+            entry["participants"] = ParticipantSet.from_json(entry.get("participants"))
+        return giveaways
+
+    def _apply_deltas(self, giveaways: Dict[str, dict], snapshot_hash: Optional[str],
+                      delta_parts: Dict[tuple, Dict[int, str]], delta_totals: Dict[tuple, int]) -> int:
+        """Replay the snapshot's deltas in sequence, stopping at the first missing, incomplete or corrupt one.
+
+        Later deltas build on the one that is lost, so the restore ends at the last
+        consistent point instead. A full snapshot is then requested, so new deltas do
+        not reuse the sequence numbers left behind.
+        """
+        applied = 0
+        sequence = sorted(seq for base, seq in delta_parts if base == snapshot_hash)
+        for seq in sequence:
+            if seq != applied + 1:
+                logging.warning(f"Delta {applied + 1} of {snapshot_hash} is missing, stopping replay there")
+                break
+            key = (snapshot_hash, seq)
+            parts, total = delta_parts[key], delta_totals[key]
+            if set(parts) != set(range(1, total + 1)):
+                logging.warning(f"Delta {seq} is incomplete, stopping replay there")
+                break
+            try:
+                delta = json.loads("".join(parts[i] for i in range(1, total + 1)))
+            except json.JSONDecodeError as e:
+                logging.warning(f"Delta {seq} is corrupt, stopping replay there: {e}")
+                break
+            apply_delta(giveaways, delta)
+            applied = seq
+
+        self.snapshot_hash = snapshot_hash
+        self.deltas_since_snapshot = applied
+        if sequence and applied != sequence[-1]:
+            logging.warning(f"⚠️ Restored up to delta {applied} of {sequence[-1]}; the next backup will be a full snapshot")
+            self.request_snapshot()
+        return applied
+
+def apply_delta(giveaways: Dict[str, dict], delta: dict):
+    """Apply one backup delta (changed fields, appended joins, removals) to a giveaway map."""
+    for message_id, fields in delta.get("changed", {}).items():
+        entry = giveaways.setdefault(message_id, {"participants": ParticipantSet()})
+        entry.update(fields)
+    for message_id, user_ids in delta.get("joins", {}).items():
+        entry = giveaways.get(message_id)
+        if entry is not None:
+            participants = entry.setdefault("participants", ParticipantSet())
+            for user_id in user_ids:
+                participants.add(user_id)
+    for message_id in delta.get("removed", []):
+        giveaways.pop(message_id, None)
@@ -0,0 +1,157 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import tempfile
+from typing import Awaitable, BinaryIO, Callable, Iterable, Iterator, List, Optional, TextIO
+
+from participants import ParticipantSet
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+
+# IDs are merged and journaled this many at a time, so memory stays bounded by the chunk
+IMPORT_CHUNK_SIZE = 10000
+# Column names / JSON keys recognised as the user ID (CSV falls back to the first column)
+ID_FIELDS = ("user_id", "userid", "id", "discord_id", "member_id")
+# Downloads stay in memory up to this size, then spill to a temporary file
+SPOOL_MEMORY_LIMIT = 4 * 1024 * 1024
+MAX_SNOWFLAKE = 2 ** 64 - 1
+
+class ImportStats:
+    """Counters for one bulk import run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.ineligible = 0
+        self.added = 0
+
+    def summary(self) -> str:
+        parts = [f"{self.added:,} added", f"{self.duplicates:,} already entered"]
+        if self.ineligible:
+            parts.append(f"{self.ineligible:,} ineligible")
+        if self.invalid:
+            parts.append(f"{self.invalid:,} invalid")
+        return f"{self.rows:,} rows: " + ", ".join(parts)
+
+def detect_format(filename: str) -> str:
+    """Pick the parser from the file name (``.jsonl``/``.ndjson``, optionally ``.gz``; else CSV)."""
+    name = filename.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return FORMAT_JSONL if name.endswith((".jsonl", ".ndjson", ".json")) else FORMAT_CSV
+
+def open_text(fileobj: BinaryIO, filename: str) -> TextIO:
+    """Wrap a binary stream for line-by-line reading, decompressing ``.gz`` transparently."""
+    if filename.lower().endswith(".gz"):
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+
+def _parse_id(value) -> Optional[int]:
+    try:
+        user_id = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return user_id if 0 < user_id <= MAX_SNOWFLAKE else None
+
+def iter_user_ids(lines: Iterable[str], fmt: str, stats: ImportStats) -> Iterator[int]:
+    """Lazily yield user IDs from CSV or JSONL lines, counting rows and unparseable entries."""
+    if fmt == FORMAT_JSONL:
+        yield from _iter_jsonl(lines, stats)
+    else:
+        yield from _iter_csv(lines, stats)
+
+def _iter_csv(lines: Iterable[str], stats: ImportStats) -> Iterator[int]:
+    column = 0
+    first = True
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        if first:
+            first = False
+            # A header row: use the ID column it names, otherwise the first column
+            if _parse_id(row[0]) is None:
+                header = [cell.strip().lower() for cell in row]
+                column = next((header.index(f) for f in ID_FIELDS if f in header), 0)
+                continue
+        stats.rows += 1
+        user_id = _parse_id(row[column]) if column < len(row) else None
+        if user_id is None:
+            stats.invalid += 1
+        else:
+            yield user_id
+
+def _iter_jsonl(lines: Iterable[str], stats: ImportStats) -> Iterator[int]:
+    for line in lines:
+        if not line.strip():
+            continue
+        stats.rows += 1
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            stats.invalid += 1
+            continue
+        if isinstance(value, dict):
+            value = next((value[f] for f in ID_FIELDS if f in value), None)
+        user_id = _parse_id(value)
+        if user_id is None:
+            stats.invalid += 1
+        else:
+            yield user_id
+
+def chunked(values: Iterable[int], size: int) -> Iterator[List[int]]:
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+async def ingest(participants: ParticipantSet, user_ids: Iterable[int],
+                 commit_chunk: Callable[[List[int]], None], stats: ImportStats,
+                 eligible: Optional[Callable[[List[int]], Awaitable[List[int]]]] = None,
+                 chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Merge streamed user IDs into ``participants`` chunk by chunk.
+
+    IDs already present (or repeated in the file) are skipped, ``eligible`` may
+    filter each chunk of new IDs, and every chunk of accepted IDs is handed to
+    ``commit_chunk`` (which journals it without syncing). Yields to the event loop
+    between chunks so a large import never stalls joins or heartbeats.
+    """
+    for chunk in chunked(user_ids, chunk_size):
+        fresh = [user_id for user_id in chunk if user_id not in participants]
+        stats.duplicates += len(chunk) - len(fresh)
+        if eligible and fresh:
+            allowed = await eligible(fresh)
+            stats.ineligible += len(fresh) - len(allowed)
+            fresh = allowed
+
+        added = [user_id for user_id in fresh if participants.add(user_id)]
+        stats.duplicates += len(fresh) - len(added)
+        if added:
+            commit_chunk(added)
+            stats.added += len(added)
+        await asyncio.sleep(0)
+
+async def spool_attachment(url: str, chunk_size: int = 64 * 1024) -> BinaryIO:
+    """Stream a download into a spooled temporary file (memory first, disk once it grows)."""
+    # Imported here so the offline CLI does not need the bot's HTTP stack
+    import aiohttp
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                async for block in response.content.iter_chunked(chunk_size):
+                    spool.write(block)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
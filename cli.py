@@ -0,0 +1,197 @@
+"""Offline maintenance commands over Givzy's local giveaway storage.
+
+Run these while the bot is stopped: the bot keeps the giveaway map in memory and
+would not see (or would overwrite) changes made to the store underneath it.
+
+    python cli.py import <message_id> <file.csv|file.jsonl[.gz]>
+    python cli.py export <server_id> [--format jsonl] [--split-mb 8]
+    python cli.py verify <export part> [<export part> ...] [--giveaway <message_id>]
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+from bulk_import import ImportStats, detect_format, open_text, iter_user_ids, ingest
+from draw import draw_winners, draw_rng, participants_digest, seed_commitment
+from export import (FORMAT_CSV, FORMAT_JSONL, iter_export_rows, encode_rows, header_line, iter_parts, part_filename,
+                    read_export_rows, iter_export_draws)
+from storage import create_store, BACKEND_CHANNEL, BACKEND_JOURNAL, BACKEND_SQLITE, OP_BULK_JOIN
+
+def open_store(args):
+    if args.backend == BACKEND_CHANNEL:
+        sys.exit("❌ The channel backend keeps no local data; use the bot commands instead.")
+    store = create_store(args.backend, args.data_dir)
+    giveaways = store.load()
+    if giveaways is None:
+        store.close()
+        sys.exit(f"❌ No giveaway data found in {args.data_dir!r} ({args.backend} backend).")
+    return store, giveaways
+
+async def cmd_import(args) -> int:
+    store, giveaways = open_store(args)
+    try:
+        giveaway_data = giveaways.get(args.message_id)
+        if not giveaway_data:
+            print(f"❌ Giveaway {args.message_id} not found.")
+            return 1
+        if giveaway_data.get("status") != "active":
+            print(f"❌ Giveaway {args.message_id} is already {giveaway_data.get('status', 'inactive')}.")
+            return 1
+
+        stats = ImportStats()
+        imported_at = datetime.now(timezone.utc).isoformat()
+        fmt = args.format or detect_format(args.file)
+
+        def commit_chunk(user_ids):
+            store.append(OP_BULK_JOIN, args.message_id, users=user_ids, at=imported_at)
+
+        try:
+            with open(args.file, "rb") as raw, open_text(raw, args.file) as lines:
+                await ingest(giveaway_data["participants"], iter_user_ids(lines, fmt, stats), commit_chunk, stats)
+        except (OSError, EOFError, UnicodeDecodeError, csv.Error) as e:
+            print(f"⚠️ Import stopped early, file could not be read: {e}")
+
+        # Everything merged so far becomes durable in one write
+        await store.sync()
+        print(f"✅ {stats.summary()}")
+        print(f"👥 Participants: {len(giveaway_data['participants'])}")
+        return 0
+    finally:
+        store.close()
+
+async def cmd_export(args) -> int:
+    if args.backend == BACKEND_CHANNEL:
+        sys.exit("❌ The channel backend keeps no local data; use /export instead.")
+    store = create_store(args.backend, args.data_dir)
+    try:
+        # Schedules share the giveaway map but have nothing to export yet
+        server_giveaways = {k: v for k, v in store.server_giveaways(args.server_id).items()
+                            if v.get("status") != "scheduled"}
+        if not server_giveaways:
+            print(f"📭 No giveaways found for server {args.server_id}.")
+            return 1
+
+        def participants_of(message_id, data):
+            # Journal snapshots carry participants inline; SQLite is queried one giveaway at a time
+            if "participants" in data:
+                return data["participants"]
+            return list(store.participants(message_id))
+
+        ordered = sorted(server_giveaways.items(), key=lambda item: item[1].get("created_at") or "")
+        lines = encode_rows(iter_export_rows(ordered, participants_of), args.format)
+        part_limit = int(args.split_mb * 1024 * 1024) if args.split_mb else None
+        basename = os.path.join(args.output_dir, f"givzy-export-{args.server_id}")
+        os.makedirs(args.output_dir, exist_ok=True)
+
+        paths = []
+        def new_part():
+            paths.append(part_filename(basename, args.format, len(paths) + 1))
+            return open(paths[-1], "wb")
+
+        for part in iter_parts(lines, new_part, header_line(args.format), part_limit):
+            part.close()
+            print(f"📦 {paths[-1]} ({os.path.getsize(paths[-1]):,} bytes)")
+
+        print(f"✅ Exported {len(server_giveaways)} giveaways in {len(paths)} file(s)")
+        return 0
+    finally:
+        store.close()
+
+def verify_draw(row: dict, participants, draw: dict) -> list:
+    """Problems found when replaying one exported draw round (empty when it checks out)."""
+    problems = []
+    if participants_digest(participants) != draw.get("participants_digest"):
+        problems.append("participant list does not match the recorded digest")
+
+    winner_ids = [str(uid) for uid in draw.get("winner_ids") or ()]
+    rng = draw_rng(row.get("draw_seed"), str(row["giveaway_id"]), int(draw.get("round") or 0))
+    excluded = [int(uid) for uid in draw.get("excluded") or ()]
+    replayed = [str(uid) for uid in draw_winners(participants, len(winner_ids), draw["weights"], rng, excluded)]
+    if replayed != winner_ids:
+        problems.append(f"replayed winners {' '.join(replayed)} differ from recorded {' '.join(winner_ids)}")
+    return problems
+
+async def cmd_verify(args) -> int:
+    def rows():
+        for path in args.files:
+            with open(path, "rb") as f:
+                yield from read_export_rows(f, path)
+
+    checked = failed = 0
+    for row, participants, rounds in iter_export_draws(rows()):
+        giveaway_id = str(row["giveaway_id"])
+        if args.giveaway and giveaway_id != args.giveaway:
+            continue
+        if not row.get("draw_seed") or not row.get("participants_digest"):
+            if args.giveaway:
+                print(f"⏭️ {giveaway_id}: no revealed draw to verify ({row.get('status')})")
+            continue
+        if not row.get("draw_commitment"):
+            print(f"⚠️ {giveaway_id}: started before seed commitments, checking the replay only")
+
+        if row.get("draw_commitment") and seed_commitment(row["draw_seed"]) != row["draw_commitment"]:
+            checked += 1
+            failed += 1
+            print(f"❌ {giveaway_id}: seed does not match the published commitment")
+            continue
+
+        for draw in rounds:
+            round_number = draw.get("round") or 0
+            if not draw.get("participants_digest") or draw.get("weights") is None:
+                print(f"⏭️ {giveaway_id}: round {round_number} was recorded without its draw inputs, skipping")
+                continue
+            checked += 1
+            problems = verify_draw(row, participants, draw)
+            if problems:
+                failed += 1
+                for problem in problems:
+                    print(f"❌ {giveaway_id} round {round_number}: {problem}")
+            else:
+                print(f"✅ {giveaway_id}: round {round_number} replayed, "
+                      f"{len(participants):,} participants, winners {' '.join(draw['winner_ids'])}")
+
+    print(f"{'✅' if not failed else '❌'} {checked - failed}/{checked} draws verified")
+    return 1 if failed or not checked else 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Givzy offline storage tools")
+    parser.add_argument("--data-dir", default=os.getenv("GIVZY_DATA_DIR", "data"),
+                        help="storage directory (default: $GIVZY_DATA_DIR or ./data)")
+    parser.add_argument("--backend", default=os.getenv("GIVZY_STORAGE", BACKEND_JOURNAL),
+                        choices=(BACKEND_JOURNAL, BACKEND_SQLITE, BACKEND_CHANNEL),
+                        help="storage backend (default: $GIVZY_STORAGE or journal)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subcommands.add_parser("import", help="bulk-add participants to an active giveaway")
+    import_parser.add_argument("message_id", help="giveaway message ID")
+    import_parser.add_argument("file", help="CSV or JSONL file of user IDs (optionally .gz)")
+    import_parser.add_argument("--format", choices=("csv", "jsonl"),
+                               help="input format (default: from the file extension)")
+    import_parser.set_defaults(handler=cmd_import)
+
+    export_parser = subcommands.add_parser("export", help="export a server's giveaways, participants and winners")
+    export_parser.add_argument("server_id", type=int, help="Discord server (guild) ID")
+    export_parser.add_argument("--format", choices=(FORMAT_CSV, FORMAT_JSONL), default=FORMAT_CSV)
+    export_parser.add_argument("--output-dir", default=".", help="directory for the .gz files (default: .)")
+    export_parser.add_argument("--split-mb", type=float,
+                               help="start a new file once a part reaches this compressed size")
+    export_parser.set_defaults(handler=cmd_export)
+
+    verify_parser = subcommands.add_parser("verify", help="replay ended giveaway draws from export files")
+    verify_parser.add_argument("files", nargs="+", help="export parts (.csv.gz / .jsonl.gz) in order")
+    verify_parser.add_argument("--giveaway", help="only verify this giveaway message ID")
+    verify_parser.set_defaults(handler=cmd_verify)
+
+    return parser
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import hashlib
+import hmac
+import logging
+import os
+import random
+import secrets
+import sys
+import discord
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from participants import ParticipantSet
+
+# Bonus entries a single role may grant (weight multiplier)
+MIN_BONUS_ENTRIES = 2
+MAX_BONUS_ENTRIES = 10
+# Above this share of excluded IDs, rejection sampling from the base class gets slow
+# enough that materialising its remaining members is cheaper
+MAX_REJECTION_SHARE = 0.5
+
+# --- verifiable draws ---------------------------------------------------------
+#
+# Every giveaway gets a random seed when it starts. Only its SHA-256 (the commitment)
+# is published; the seed is revealed with the results. Each draw round seeds its own
+# RNG from (seed, message ID, round), so anyone holding the seed, the join-ordered
+# participant list and the bonus entries can replay the draw exactly.
+#
+# The seed is never stored while the giveaway runs: it is HMAC(draw secret, nonce),
+# and only the public nonce and the commitment are persisted and backed up. The
+# seed is derived and written to the giveaway when the winners are drawn.
+
+DRAW_SECRET_ENV = "GIVZY_DRAW_SECRET"
+DRAW_SECRET_FILENAME = "draw_secret.key"
+
+def load_draw_secret(data_dir: str) -> bytes:
+    """The key draw seeds are derived with: $GIVZY_DRAW_SECRET, else a key file kept in ``data_dir``.
+
+    The key file is created on first use. Anyone who can read it can compute the
+    seeds of running giveaways, so deployments should prefer the environment variable.
+    """
+    secret = os.getenv(DRAW_SECRET_ENV)
+    if secret:
+        return secret.encode()
+    path = os.path.join(data_dir, DRAW_SECRET_FILENAME)
+    try:
+        with open(path, "rb") as f:
+            secret = f.read().strip()
+    except FileNotFoundError:
+        secret = b""
+    if not secret:
+        os.makedirs(data_dir, exist_ok=True)
+        secret = secrets.token_hex(32).encode()
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(secret)
+        logging.warning(f"⚠️ {DRAW_SECRET_ENV} not set, created a draw secret in {path}; keep it private")
+    return secret
+
+def new_draw_nonce() -> str:
+    return secrets.token_hex(16)
+
+def derive_draw_seed(secret: bytes, nonce: str) -> str:
+    return hmac.new(secret, nonce.encode(), hashlib.sha256).hexdigest()
+
+def new_draw_seed() -> str:
+    return secrets.token_hex(32)
+
+def seed_commitment(seed: str) -> str:
+    return hashlib.sha256(seed.encode()).hexdigest()
+
+def participants_digest(participants: ParticipantSet) -> str:
+    """SHA-256 of the join-ordered IDs as unsigned 64-bit little-endian integers."""
+    ids = participants.as_sequence()
+    if sys.byteorder == "big":
+        ids = array("Q", ids)
+        ids.byteswap()
+    return hashlib.sha256(memoryview(ids)).hexdigest()
+
+def draw_rng(seed: str, message_id: str, round_number: int) -> random.Random:
+    material = hashlib.sha256(f"{seed}:{message_id}:{round_number}".encode()).digest()
+    return random.Random(int.from_bytes(material, "big"))
+
+def bonus_entries_record(weights: Dict[int, int]) -> Dict[str, List[str]]:
+    """Bonus holders grouped by entries (JSON-friendly), stored with the draw for replay."""
+    record: Dict[str, List[str]] = {}
+    for uid, entries in sorted(weights.items()):
+        if entries > 1:
+            record.setdefault(str(entries), []).append(str(uid))
+    return record
+
+def weights_from_record(record: Optional[Dict[str, List[str]]]) -> Dict[int, int]:
+    return {int(uid): int(entries) for entries, uids in (record or {}).items() for uid in uids}
+
+def bonus_entry_weights(guild: Optional[discord.Guild], data: dict,
+                        participants: ParticipantSet) -> Dict[int, int]:
+    """Entries per participant from the giveaway's ``bonus_roles`` (role ID -> entries).
+
+    Only participants holding a bonus role appear in the result; everyone else has
+    one entry. With several bonus roles the largest applies. Walks each role's
+    cached members rather than every participant.
+    """
+    weights: Dict[int, int] = {}
+    bonus_roles = data.get("bonus_roles") or {}
+    if not guild or not bonus_roles:
+        return weights
+    for role_id, entries in bonus_roles.items():
+        role = guild.get_role(int(role_id))
+        if role is None or entries <= 1:
+            continue
+        for member in role.members:
+            if member.id in participants and weights.get(member.id, 1) < entries:
+                weights[member.id] = entries
+    return weights
+
+class _WeightClass:
+    """Entrants sharing one weight; ``pool`` is sampled with rejection of ``taken``."""
+
+    __slots__ = ("weight", "pool", "remaining", "taken")
+
+    def __init__(self, weight: int, pool: Sequence[int], remaining: int, taken: set):
+        self.weight = weight
+        self.pool = pool
+        self.remaining = remaining
+        self.taken = taken
+
+    def pick(self, rng: random.Random) -> int:
+        if len(self.taken) > MAX_REJECTION_SHARE * len(self.pool):
+            self.pool = [uid for uid in self.pool if uid not in self.taken]
+            self.taken = set()
+        while True:
+            uid = self.pool[rng.randrange(len(self.pool))]
+            if uid not in self.taken:
+                break
+        self.taken.add(uid)
+        self.remaining -= 1
+        return uid
+
+def draw_winners(participants: ParticipantSet, count: int,
+                 weights: Optional[Dict[int, int]] = None,
+                 rng: Optional[random.Random] = None,
+                 exclude: Optional[Iterable[int]] = None) -> List[int]:
+    """Weighted sampling without replacement of ``count`` winners.
+
+    Each draw picks entrant ``i`` with probability ``w_i / sum(remaining w)``, exactly
+    like drawing tickets from a hat where a 2x entrant holds two tickets and all of
+    their tickets leave the hat once they win. Entrants are grouped by weight, so a
+    draw is one weighted choice between a handful of classes plus a uniform pick
+    inside the class: after one pass over the bonus holders, O(count * classes)
+    regardless of the number of entrants.
+    Entrants in ``exclude`` (e.g. earlier winners on a reroll) are skipped by
+    rejection, so nothing proportional to the entrant list is copied. Without
+    ``weights`` or ``exclude`` this is a plain uniform sample.
+    """
+    rng = rng or random
+    excluded = {int(uid) for uid in exclude or () if uid in participants}
+    count = min(count, len(participants) - len(excluded))
+    if count <= 0:
+        return []
+    if not weights and not excluded:
+        return rng.sample(participants.as_sequence(), count)
+
+    by_weight: Dict[int, List[int]] = {}
+    bonus_ids = set()
+    for uid, weight in (weights or {}).items():
+        if weight > 1 and uid in participants and uid not in excluded:
+            by_weight.setdefault(weight, []).append(uid)
+            bonus_ids.add(uid)
+
+    # Base class: the full entrant array, skipping bonus holders and exclusions by rejection
+    skipped = bonus_ids | excluded
+    classes = [_WeightClass(1, participants.as_sequence(), len(participants) - len(skipped), skipped)]
+    for weight in sorted(by_weight):
+        # Sorted so a seeded draw does not depend on the order the weights were collected in
+        members = sorted(by_weight[weight])
+        classes.append(_WeightClass(weight, members, len(members), set()))
+
+    winners = []
+    for _ in range(count):
+        total = sum(c.weight * c.remaining for c in classes)
+        target = rng.random() * total
+        for weight_class in classes:
+            target -= weight_class.weight * weight_class.remaining
+            if target < 0 and weight_class.remaining:
+                break
+        else:
+            # Float rounding at the upper end: take the last non-empty class
+            weight_class = next(c for c in reversed(classes) if c.remaining)
+        winners.append(weight_class.pick(rng))
+    return winners
@@ -0,0 +1,106 @@
+import time
+import discord
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+SECONDS_PER_DAY = 86400
+
+class EligibilityRules(NamedTuple):
+    """A giveaway's join requirements, compiled once from its stored fields."""
+    required_role: Optional[int]
+    min_account_days: int
+    min_server_days: int
+
+    @classmethod
+    def from_giveaway(cls, data: dict) -> "EligibilityRules":
+        return cls(
+            data.get("required_role") or None,
+            data.get("min_account_age_days", 0) or 0,
+            data.get("min_server_days", 0) or 0,
+        )
+
+class Verdict(NamedTuple):
+    """Cached outcome for one member: the role check result plus the absolute
+    timestamps from which the account-age and server-time checks pass."""
+    role_ok: bool
+    account_ok_from: float
+    server_ok_from: float
+
+class EligibilityChecker:
+    """Per-(giveaway, member) eligibility verdicts over precompiled rules.
+
+    Account and server age become absolute timestamps per member, so a repeated
+    or retried click is a dict lookup and a comparison against the clock.
+    Verdicts depend on the member's roles and join date, so they are
+    invalidated on role changes and when the member leaves.
+    """
+
+    def __init__(self):
+        self._rules: Dict[str, EligibilityRules] = {}
+        self._verdicts: Dict[Tuple[str, int], Verdict] = {}
+        self._by_user: Dict[int, Set[str]] = {}
+        self._by_giveaway: Dict[str, Set[int]] = {}
+
+    def compile(self, message_id: str, data: dict) -> EligibilityRules:
+        rules = self._rules[message_id] = EligibilityRules.from_giveaway(data)
+        return rules
+
+    def check(self, member: discord.Member, data: dict, message_id: Optional[str] = None) -> Tuple[bool, str]:
+        """Return ``(eligible, reason)`` for ``member`` joining the giveaway."""
+        if message_id is None:
+            verdict = self._judge(member, EligibilityRules.from_giveaway(data))
+        else:
+            key = (message_id, member.id)
+            verdict = self._verdicts.get(key)
+            if verdict is None:
+                rules = self._rules.get(message_id) or self.compile(message_id, data)
+                verdict = self._verdicts[key] = self._judge(member, rules)
+                self._by_user.setdefault(member.id, set()).add(message_id)
+                self._by_giveaway.setdefault(message_id, set()).add(member.id)
+
+        if verdict.role_ok and verdict.account_ok_from == verdict.server_ok_from == 0:
+            return True, "Eligible"
+
+        rules = self._rules.get(message_id) or EligibilityRules.from_giveaway(data)
+        if not verdict.role_ok:
+            return False, f"🛡️ You must have the role <@&{rules.required_role}> to join."
+        now = time.time()
+        if now < verdict.account_ok_from:
+            return False, f"⏰ Your account must be at least {rules.min_account_days} days old to join."
+        if now < verdict.server_ok_from:
+            return False, f"🏠 You must be in this server for at least {rules.min_server_days} days to join."
+        return True, "Eligible"
+
+    def invalidate_member(self, user_id: int):
+        """Forget every cached verdict for a member (roles changed, left the server)."""
+        for message_id in self._by_user.pop(user_id, ()):
+            self._verdicts.pop((message_id, user_id), None)
+            members = self._by_giveaway.get(message_id)
+            if members is not None:
+                members.discard(user_id)
+
+    def drop_giveaway(self, message_id: str):
+        """Forget a giveaway's rules and verdicts once it stops accepting joins."""
+        self._rules.pop(message_id, None)
+        for user_id in self._by_giveaway.pop(message_id, ()):
+            self._verdicts.pop((message_id, user_id), None)
+            giveaway_ids = self._by_user.get(user_id)
+            if giveaway_ids is not None:
+                giveaway_ids.discard(message_id)
+                if not giveaway_ids:
+                    del self._by_user[user_id]
+
+    @staticmethod
+    def _judge(member: discord.Member, rules: EligibilityRules) -> Verdict:
+        role_ok = True
+        if rules.required_role:
+            # A role that no longer exists is not enforced
+            if member.guild.get_role(rules.required_role) is not None:
+                role_ok = member.get_role(rules.required_role) is not None
+
+        account_ok_from = 0.0
+        if rules.min_account_days > 0:
+            account_ok_from = member.created_at.timestamp() + rules.min_account_days * SECONDS_PER_DAY
+        server_ok_from = 0.0
+        if rules.min_server_days > 0 and member.joined_at:
+            server_ok_from = member.joined_at.timestamp() + rules.min_server_days * SECONDS_PER_DAY
+        return Verdict(role_ok, account_ok_from, server_ok_from)
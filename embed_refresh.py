@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import discord
+from typing import Callable, Dict, Optional, Set
+
+PARTICIPANTS_PREFIX = "👥 **Participants:**"
+
+class _PendingRefresh:
+    __slots__ = ("message", "joins", "due", "task")
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.joins = 0
+        self.due = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+class EmbedRefreshCoalescer:
+    """Keeps at most one pending participant-count edit per giveaway message.
+
+    The first join after an edit arms a timer; further joins only bump a counter.
+    The edit fires after ``interval`` seconds, or early once ``count_threshold``
+    joins have piled up, and always shows the count at that moment, so
+    intermediate counts are dropped. ``cancel`` stops a giveaway's refresh when it ends,
+    including an edit already in flight, so it cannot land on top of the final embed.
+    """
+
+    def __init__(self, get_count: Callable[[str], Optional[int]],
+                 interval: float = 5.0, count_threshold: int = 25):
+        self._get_count = get_count
+        self.interval = interval
+        self.count_threshold = count_threshold
+        self._pending: Dict[str, _PendingRefresh] = {}
+        # Refreshes past their timer whose edit has not completed yet
+        self._editing: Dict[str, Set[asyncio.Task]] = {}
+
+    def request(self, message_id: str, message: discord.Message):
+        """Note a join on ``message``; schedules an edit if none is pending."""
+        pending = self._pending.get(message_id)
+        if pending is None:
+            pending = self._pending[message_id] = _PendingRefresh(message)
+            pending.task = asyncio.create_task(self._refresh_later(message_id, pending))
+        pending.message = message
+        pending.joins += 1
+        if pending.joins >= self.count_threshold:
+            pending.due.set()
+
+    def cancel(self, message_id: str):
+        """Drop any pending edit for a giveaway (it ended or was cancelled)."""
+        pending = self._pending.pop(message_id, None)
+        if pending and pending.task:
+            pending.task.cancel()
+        for task in self._editing.pop(message_id, ()):
+            task.cancel()
+
+    async def stop(self):
+        for message_id in set(self._pending) | set(self._editing):
+            self.cancel(message_id)
+
+    async def _refresh_later(self, message_id: str, pending: _PendingRefresh):
+        try:
+            await asyncio.wait_for(pending.due.wait(), self.interval)
+        except asyncio.TimeoutError:
+            pass
+
+        # Joins arriving from here on arm a fresh refresh
+        if self._pending.get(message_id) is pending:
+            del self._pending[message_id]
+
+        count = self._get_count(message_id)
+        if count is None:
+            return
+        editing = self._editing.setdefault(message_id, set())
+        editing.add(pending.task)
+        try:
+            await self._edit_count(pending.message, count)
+        except discord.Forbidden:
+            logging.warning(f"Permission denied when trying to update embed for giveaway {message_id}")
+        except Exception as e:
+            logging.warning(f"Could not update embed for giveaway {message_id}: {e}")
+        finally:
+            editing.discard(pending.task)
+            if not editing and self._editing.get(message_id) is editing:
+                del self._editing[message_id]
+
+    async def _edit_count(self, message: discord.Message, count: int):
+        if not message.embeds:
+            return
+        updated_embed = message.embeds[0].copy()
+        lines = (updated_embed.description or "").split('\n')
+        for i, line in enumerate(lines):
+            if line.startswith(PARTICIPANTS_PREFIX):
+                lines[i] = f"{PARTICIPANTS_PREFIX} {count}"
+                break
+        updated_embed.description = '\n'.join(lines)
+        await message.edit(embed=updated_embed)
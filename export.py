@@ -0,0 +1,212 @@
+import csv
+import gzip
+import io
+import json
+import zlib
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from draw import weights_from_record
+from participants import ParticipantSet
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+
+# One row per (giveaway, participant); giveaways without entrants get a single row with no user
+EXPORT_COLUMNS = (
+    "giveaway_id", "server_id", "channel_id", "status", "prize", "donor_name", "winners",
+    "created_at", "end_time", "finished_at", "participant_count", "entry_number", "user_id", "is_winner",
+    # Draw audit trail: replayable with ``cli.py verify`` once the seed is revealed
+    "entries", "draw_round", "winner_ids", "draw_excluded", "draw_commitment", "draw_seed", "participants_digest",
+    # Every round with its own inputs (JSON, first row of each giveaway only)
+    "draw_rounds",
+)
+
+# Compressed parts stay below this size so each fits in one Discord upload
+EXPORT_PART_LIMIT = 8 * 1024 * 1024
+# The compressor is flushed after this much input. Unflushed input is counted at full
+# size (deflate never grows it by more than a few bytes), so parts cannot overshoot
+FLUSH_EVERY = 256 * 1024
+# Room for the final line and the gzip trailer
+PART_HEADROOM = 64 * 1024
+
+def draw_rounds(data: dict) -> List[dict]:
+    """Every draw of a giveaway with the inputs to replay it: the reroll history, or just the one draw."""
+    history = data.get("reroll_history")
+    if not history:
+        history = [{
+            "round": data.get("reroll_count", 0),
+            "winner_ids": data.get("winner_ids"),
+            "excluded": data.get("draw_excluded"),
+            "participants_digest": data.get("participants_digest"),
+            "bonus_entries": data.get("draw_bonus_entries") or {},
+        }]
+    return [
+        {
+            "round": entry.get("round", 0),
+            "winner_ids": [str(uid) for uid in entry.get("winner_ids") or ()],
+            "excluded": [str(uid) for uid in entry.get("excluded") or ()],
+            # Rounds recorded before the history kept these cannot be replayed (None)
+            "participants_digest": entry.get("participants_digest"),
+            "bonus_entries": entry.get("bonus_entries"),
+        }
+        for entry in history
+    ]
+
+def iter_export_rows(giveaways: Iterable[Tuple[str, dict]],
+                     participants_of: Callable[[str, dict], Iterable[int]]) -> Iterator[dict]:
+    """Lazily yield export rows, walking each giveaway's participants in join order."""
+    for message_id, data in giveaways:
+        winner_list = [str(uid) for uid in data.get("winner_ids") or ()]
+        winner_ids = set(winner_list)
+        entrants = participants_of(message_id, data)
+        drawn = bool(data.get("participants_digest"))
+        bonus_entries = weights_from_record(data.get("draw_bonus_entries"))
+        base = {
+            "giveaway_id": message_id,
+            "server_id": data.get("server_id"),
+            "channel_id": data.get("channel_id"),
+            "status": data.get("status"),
+            "prize": data.get("prize"),
+            "donor_name": data.get("donor_name"),
+            "winners": data.get("winners"),
+            "created_at": data.get("created_at"),
+            "end_time": data.get("end_time"),
+            "finished_at": data.get("ended_at") or data.get("cancelled_at"),
+            "participant_count": len(entrants) if hasattr(entrants, "__len__") else None,
+            "draw_round": data.get("reroll_count", 0) if drawn else None,
+            "winner_ids": " ".join(winner_list) if drawn else None,
+            "draw_excluded": " ".join(data.get("draw_excluded") or ()) if drawn else None,
+            "draw_commitment": data.get("draw_commitment"),
+            # The seed stays secret until the results are out
+            "draw_seed": data.get("draw_seed") if data.get("status") == "ended" else None,
+            "participants_digest": data.get("participants_digest"),
+            "draw_rounds": None,
+        }
+        rounds = json.dumps(draw_rounds(data), separators=(",", ":")) if drawn else None
+        entry_number = 0
+        for entry_number, user_id in enumerate(entrants, 1):
+            yield {**base, "entry_number": entry_number, "user_id": str(user_id),
+                   "is_winner": str(user_id) in winner_ids,
+                   "entries": bonus_entries.get(int(user_id), 1) if drawn else None,
+                   "draw_rounds": rounds if entry_number == 1 else None}
+        if not entry_number:
+            yield {**base, "entry_number": None, "user_id": None, "is_winner": False, "entries": None,
+                   "draw_rounds": rounds}
+
+def encode_rows(rows: Iterable[dict], fmt: str) -> Iterator[bytes]:
+    """Serialize rows one line at a time (no header; see ``header_line``)."""
+    if fmt == FORMAT_JSONL:
+        for row in rows:
+            yield (json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in EXPORT_COLUMNS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+def header_line(fmt: str) -> Optional[bytes]:
+    if fmt != FORMAT_CSV:
+        return None
+    return (",".join(EXPORT_COLUMNS) + "\r\n").encode()
+
+def iter_parts(lines: Iterable[bytes], new_part: Callable[[], BinaryIO],
+               header: Optional[bytes] = None,
+               part_limit: Optional[int] = EXPORT_PART_LIMIT) -> Iterator[BinaryIO]:
+    """Gzip ``lines`` into consecutive parts, yielding each finished part's file object.
+
+    Every part is a complete gzip stream (with the CSV header repeated), so parts can be
+    opened independently. ``new_part`` supplies the target for the next part, e.g.
+    ``io.BytesIO`` for uploads or an on-disk file for the CLI; only one part is open at
+    a time. ``part_limit`` of None writes a single part.
+    """
+    threshold = max(part_limit - PART_HEADROOM, part_limit // 2) if part_limit else None
+    target = gz = None
+    unflushed = 0
+    for line in lines:
+        if gz is not None and threshold and target.tell() + unflushed >= threshold:
+            gz.close()
+            yield target
+            gz = None
+        if gz is None:
+            target = new_part()
+            gz = gzip.GzipFile(fileobj=target, mode="wb", compresslevel=6)
+            unflushed = 0
+            if header:
+                gz.write(header)
+        gz.write(line)
+        unflushed += len(line)
+        if unflushed >= FLUSH_EVERY:
+            gz.flush(zlib.Z_SYNC_FLUSH)
+            unflushed = 0
+
+    if gz is not None:
+        gz.close()
+        yield target
+
+def part_filename(basename: str, fmt: str, index: int) -> str:
+    return f"{basename}-{index:03d}.{fmt}.gz"
+
+def server_rows(giveaways: Dict[str, dict]) -> Iterator[dict]:
+    """Rows for an in-memory giveaway map (participants already loaded)."""
+    ordered = sorted(giveaways.items(), key=lambda item: item[1].get("created_at") or "")
+    return iter_export_rows(ordered, lambda message_id, data: data.get("participants", ()))
+
+def read_export_rows(fileobj: BinaryIO, filename: str) -> Iterator[dict]:
+    """Stream rows back out of one export part (CSV values come back as strings)."""
+    with gzip.GzipFile(fileobj=fileobj, mode="rb") as gz, io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+        if FORMAT_JSONL in filename.lower():
+            for line in text:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(text)
+
+def export_draw_rounds(row: dict, weights: Dict[int, int]) -> List[dict]:
+    """The draw rounds recorded in a giveaway's first export row, bonus entries as weights.
+
+    ``weights`` is None for a round whose inputs were not kept. Exports made before
+    ``draw_rounds`` existed only describe the newest round, taken from the row itself.
+    """
+    raw = row.get("draw_rounds")
+    if not raw:
+        return [{
+            "round": int(row.get("draw_round") or 0),
+            "winner_ids": (row.get("winner_ids") or "").split(),
+            "excluded": (row.get("draw_excluded") or "").split(),
+            "participants_digest": row.get("participants_digest"),
+            "weights": weights,
+        }]
+    rounds = json.loads(raw) if isinstance(raw, str) else raw
+    for draw in rounds:
+        record = draw.pop("bonus_entries", None)
+        draw["weights"] = weights_from_record(record) if record is not None else None
+    return rounds
+
+def iter_export_draws(rows: Iterable[dict]) -> Iterator[Tuple[dict, ParticipantSet, List[dict]]]:
+    """Rebuild ``(giveaway row, participants, draw rounds)`` per giveaway from streamed rows.
+
+    Exports write each giveaway's rows consecutively in join order, so only one
+    giveaway's participants are held in memory at a time.
+    """
+    current_id = None
+    first: Optional[dict] = None
+    participants = ParticipantSet()
+    weights: Dict[int, int] = {}
+    for row in rows:
+        if row["giveaway_id"] != current_id:
+            if first is not None:
+                yield first, participants, export_draw_rounds(first, weights)
+            current_id, first = row["giveaway_id"], row
+            participants, weights = ParticipantSet(), {}
+        if row.get("user_id"):
+            user_id = int(row["user_id"])
+            participants.add(user_id)
+            entries = int(row.get("entries") or 1)
+            if entries > 1:
+                weights[user_id] = entries
+    if first is not None:
+        yield first, participants, export_draw_rounds(first, weights)
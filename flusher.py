@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Hashable, Optional, Set
+
+class WriteBehindFlusher:
+    """Coalesces many mutations into a single persistence write.
+
+    Mutation paths call ``mark_dirty``; one background task waits until either
+    ``max_delay`` seconds have passed since the oldest unflushed change or
+    ``max_batch`` entries are dirty, then hands the whole dirty set to ``flush``.
+    Changes made during a flush are picked up by the next round, and ``stop``
+    performs a final flush so nothing is lost on shutdown.
+    """
+
+    def __init__(self, flush: Callable[[Set[Hashable]], Awaitable[None]],
+                 max_delay: float = 5.0, max_batch: int = 1000, retry_delay: float = 10.0):
+        self._flush = flush
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self._dirty: Set[Hashable] = set()
+        self._first_dirty_at: Optional[float] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, key: Hashable):
+        """Record that ``key`` changed and needs to be persisted."""
+        if not self._dirty:
+            self._first_dirty_at = time.monotonic()
+        self._dirty.add(key)
+        if len(self._dirty) == 1 or len(self._dirty) >= self.max_batch:
+            self._changed.set()
+
+    def start(self):
+        """Start the background flusher (no-op if already running)."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever is still pending."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_now()
+
+    async def flush_now(self):
+        """Persist every dirty entry immediately."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, set()
+            self._first_dirty_at = None
+            try:
+                await self._flush(batch)
+            except Exception:
+                # Keep the entries dirty so the next round retries them
+                self._dirty |= batch
+                self._first_dirty_at = self._first_dirty_at or time.monotonic()
+                raise
+
+    async def _run(self):
+        while True:
+            if not self._dirty:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            remaining = self.max_delay - (time.monotonic() - self._first_dirty_at)
+            if remaining > 0 and len(self._dirty) < self.max_batch:
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.flush_now()
+            except Exception as e:
+                logging.error(f"Write-behind flush failed, retrying in {self.retry_delay}s: {e}")
+                await asyncio.sleep(self.retry_delay)
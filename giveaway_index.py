@@ -0,0 +1,81 @@
+from typing import Dict, Set, Optional, Tuple
+
+class GiveawayIndex:
+    """Secondary indexes over the giveaway map (server_id -> IDs, status -> IDs).
+
+    Every mutation of the global giveaway map goes through ``update``/``remove`` so
+    per-server queries and the active/server counters cost O(result) instead of a
+    full scan.
+    """
+
+    def __init__(self):
+        self._by_server: Dict[int, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        # message_id -> (server_id, status) currently indexed, used to unlink on change
+        self._entries: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._entries
+
+    def update(self, message_id: str, data: dict):
+        """Index a giveaway, or re-index it after its server or status changed."""
+        server_id = data.get("server_id")
+        status = data.get("status")
+
+        previous = self._entries.get(message_id)
+        if previous == (server_id, status):
+            return
+        if previous is not None:
+            self._unlink(message_id, *previous)
+
+        if server_id:
+            self._by_server.setdefault(server_id, set()).add(message_id)
+        if status:
+            self._by_status.setdefault(status, set()).add(message_id)
+        self._entries[message_id] = (server_id, status)
+
+    def remove(self, message_id: str):
+        """Drop a giveaway from every index."""
+        previous = self._entries.pop(message_id, None)
+        if previous is not None:
+            self._unlink(message_id, *previous)
+
+    def rebuild(self, giveaways: Dict[str, dict]):
+        """Rebuild all indexes from scratch (used once after loading the database)."""
+        self._by_server.clear()
+        self._by_status.clear()
+        self._entries.clear()
+        for message_id, data in giveaways.items():
+            self.update(message_id, data)
+
+    def server_ids(self, server_id: int) -> Set[str]:
+        """Message IDs of every giveaway belonging to a server."""
+        return self._by_server.get(server_id, set())
+
+    def status_ids(self, status: str) -> Set[str]:
+        """Message IDs of every giveaway with the given status."""
+        return self._by_status.get(status, set())
+
+    def count_status(self, status: str) -> int:
+        return len(self._by_status.get(status, ()))
+
+    def server_count(self) -> int:
+        """Number of servers that have at least one giveaway."""
+        return len(self._by_server)
+
+    def _unlink(self, message_id: str, server_id: Optional[int], status: Optional[str]):
+        if server_id:
+            bucket = self._by_server.get(server_id)
+            if bucket is not None:
+                bucket.discard(message_id)
+                if not bucket:
+                    del self._by_server[server_id]
+        if status:
+            bucket = self._by_status.get(status)
+            if bucket is not None:
+                bucket.discard(message_id)
+                if not bucket:
+                    del self._by_status[status]
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+class JoinEvent(NamedTuple):
+    message_id: str
+    user_id: int
+    joined_at: str
+    # The giveaway message the button was clicked on, for the participant-count refresh
+    message: Optional[object] = None
+
+class JoinQueue:
+    """In-memory queue between the join button and the join bookkeeping.
+
+    The button callback validates and records the participant in memory, acks the
+    click and ``put``s a JoinEvent. A single consumer drains the queue in batches of
+    up to ``max_batch`` and hands each batch to ``apply_batch`` (persistence,
+    counters, audit), keeping that work off the interaction's critical path.
+    """
+
+    def __init__(self, apply_batch: Callable[[List[JoinEvent]], Awaitable[None]], max_batch: int = 500):
+        self._apply_batch = apply_batch
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, event: JoinEvent):
+        self._queue.put_nowait(event)
+
+    def start(self):
+        """Start the consumer (no-op if already running)."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the consumer and apply every join still queued."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            await self._apply(self._take_batch([]))
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            await self._apply(self._take_batch([first]))
+
+    def _take_batch(self, batch: List[JoinEvent]) -> List[JoinEvent]:
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _apply(self, batch: List[JoinEvent]):
+        try:
+            await self._apply_batch(batch)
+        except Exception as e:
+            logging.error(f"Error applying {len(batch)} queued joins: {e}")
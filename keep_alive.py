@@ -1,32 +1,26 @@
 import os
-import time
-import requests
+import asyncio
 import logging
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from threading import Thread
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class SimpleHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        html = f"""
+STATUS_PAGE = """
         <!DOCTYPE html>
         <html>
         <head>
             <title>Bot Keep Alive</title>
             <meta http-equiv="refresh" content="30">
             <style>
-                body {{ font-family: Arial, sans-serif; text-align: center; padding: 50px; 
+                body {{ font-family: Arial, sans-serif; text-align: center; padding: 50px;
                        background: linear-gradient(135deg, #667eea, #764ba2); color: white; margin: 0; }}
-                .container {{ background: rgba(255,255,255,0.1); padding: 30px; border-radius: 15px; 
+                .container {{ background: rgba(255,255,255,0.1); padding: 30px; border-radius: 15px;
                             backdrop-filter: blur(10px); display: inline-block; box-shadow: 0 8px 32px rgba(0,0,0,0.1); }}
                 .status {{ color: #4ade80; font-size: 24px; margin: 20px 0; animation: pulse 2s infinite; }}
                 @keyframes pulse {{ 0% {{ opacity: 1; }} 50% {{ opacity: 0.7; }} 100% {{ opacity: 1; }} }}
@@ -37,31 +31,29 @@ class SimpleHandler(BaseHTTPRequestHandler):
             <div class="container">
                 <h1>🤖 Giveaway Bot Keep Alive</h1>
                 <div class="status">✅ Status: Online & Running</div>
-                <div class="info">Server Port: {os.environ.get('PORT', 8080)}</div>
-                <div class="info">Last Check: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}</div>
+                <div class="info">Server Port: {port}</div>
+                <div class="info">Last Check: {last_check}</div>
                 <div class="info">Auto-refresh every 30 seconds</div>
                 <p style="margin-top: 20px; opacity: 0.7;">Bot is alive and monitoring giveaways!</p>
             </div>
         </body>
         </html>
         """
-        self.wfile.write(html.encode())
-    
-    def do_HEAD(self):
-        self.send_response(200)
-        self.end_headers()
-    
-    def log_message(self, format, *args):
-        # Suppress HTTP server logs to reduce spam
-        pass
 
 class KeepAlive:
-    def __init__(self):
-        self.port = int(os.environ.get('PORT', 8080))
+    """HTTP server on the bot's own event loop: the status page, webhook routes and a self-ping.
+
+    Routes are added with ``add_post`` before ``start``; handlers run as coroutines
+    next to the gateway, so there is no server thread to hand work back from.
+    """
+
+    def __init__(self, port: Optional[int] = None):
+        self.port = port or int(os.environ.get('PORT', 8080))
         self.ping_interval = 240  # 4 minutes (Render restarts after 15 minutes of inactivity)
-        self.running = False
         self.external_url = None
-        
+        self._runner: Optional[web.AppRunner] = None
+        self._ping_task: Optional[asyncio.Task] = None
+
         # Try to get external URL from Render environment
         render_url = os.environ.get('RENDER_EXTERNAL_URL')
         if render_url:
@@ -71,83 +63,85 @@ class KeepAlive:
             render_service = os.environ.get('RENDER_SERVICE_NAME')
             if render_service:
                 self.external_url = f"https://{render_service}.onrender.com"
-    
-    def start_server(self):
-        """Start the HTTP server"""
+
+        self.app = web.Application(client_max_size=1024 * 1024)
+        self.app.router.add_get("/", self.status_page)  # also answers HEAD
+
+    def add_post(self, path: str, handler):
+        """Register a POST route (must happen before ``start``)."""
+        self.app.router.add_post(path, handler)
+
+    async def status_page(self, request: web.Request) -> web.Response:
+        html = STATUS_PAGE.format(port=self.port, last_check=datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'))
+        return web.Response(text=html, content_type="text/html", headers={"Access-Control-Allow-Origin": "*"})
+
+    async def start(self):
+        """Start serving on the running loop, plus the auto-ping task"""
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.app, access_log=None)  # Suppress access logs to reduce spam
+        await self._runner.setup()
         try:
-            server = HTTPServer(('0.0.0.0', self.port), SimpleHandler)
-            logger.info(f"✅ Keep alive server started on port {self.port}")
-            logger.info(f"🌐 External URL: {self.external_url or 'localhost'}")
-            server.serve_forever()
-        except Exception as e:
+            await web.TCPSite(self._runner, "0.0.0.0", self.port).start()
+        except OSError as e:
             logger.error(f"❌ Server error: {e}")
-            # Try to restart server after error
-            time.sleep(5)
-            self.start_server()
-    
-    def auto_ping(self):
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        logger.info(f"✅ Keep alive server started on port {self.port}")
+        logger.info(f"🌐 External URL: {self.external_url or 'localhost'}")
+        logger.info(f"📍 Platform: {'Render' if self.external_url else 'Local/Other'}")
+        self._ping_task = asyncio.create_task(self.auto_ping())
+
+    async def stop(self):
+        if self._ping_task:
+            self._ping_task.cancel()
+            self._ping_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def auto_ping(self):
         """Auto ping to keep the server alive"""
         logger.info(f"🚀 Auto-ping started - pinging every {self.ping_interval} seconds")
-        
-        while self.running:
-            try:
-                # Use external URL if available, otherwise localhost
-                if self.external_url:
-                    url = self.external_url
-                else:
-                    url = f"http://localhost:{self.port}"
-                
-                headers = {
-                    'User-Agent': 'KeepAlive-Bot/1.0',
-                    'Accept': 'text/html'
-                }
-                
-                response = requests.get(url, timeout=15, headers=headers)
-                if response.status_code == 200:
-                    logger.info(f"✅ Keep-alive ping successful: {url}")
-                else:
-                    logger.warning(f"⚠️ Ping returned status {response.status_code}: {url}")
-                    
-            except requests.exceptions.Timeout:
-                logger.warning("⏱️ Ping timeout - server might be slow")
-            except requests.exceptions.ConnectionError as e:
-                if "localhost" in str(e):
-                    logger.info("ℹ️ Localhost ping failed (normal on hosting platforms)")
-                else:
-                    logger.warning(f"🔌 Connection error: {e}")
-            except Exception as e:
-                logger.warning(f"⚠️ Ping error: {e}")
-            
-            # Wait before next ping
-            time.sleep(self.ping_interval)
-    
-    def start(self):
-        """Start the keep alive system"""
-        self.running = True
-        
-        # Start server in background thread
-        server_thread = Thread(target=self.start_server, daemon=True)
-        server_thread.start()
-        
-        # Wait a moment for server to start
-        time.sleep(2)
-        
-        # Start auto-ping in background thread
-        ping_thread = Thread(target=self.auto_ping, daemon=True)
-        ping_thread.start()
-        
-        logger.info("🚀 Keep alive system fully started!")
-        logger.info(f"📍 Platform: {'Render' if self.external_url else 'Local/Other'}")
+        # Use external URL if available, otherwise localhost
+        url = self.external_url or f"http://localhost:{self.port}"
+        headers = {
+            'User-Agent': 'KeepAlive-Bot/1.0',
+            'Accept': 'text/html'
+        }
+        timeout = aiohttp.ClientTimeout(total=15)
+
+        async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+            while True:
+                # Wait first: the server was just started
+                await asyncio.sleep(self.ping_interval)
+                try:
+                    async with session.get(url) as response:
+                        if response.status == 200:
+                            logger.info(f"✅ Keep-alive ping successful: {url}")
+                        else:
+                            logger.warning(f"⚠️ Ping returned status {response.status}: {url}")
+                except asyncio.TimeoutError:
+                    logger.warning("⏱️ Ping timeout - server might be slow")
+                except aiohttp.ClientConnectionError as e:
+                    if "localhost" in url:
+                        logger.info("ℹ️ Localhost ping failed (normal on hosting platforms)")
+                    else:
+                        logger.warning(f"🔌 Connection error: {e}")
+                except Exception as e:
+                    logger.warning(f"⚠️ Ping error: {e}")
 
-def keep_alive():
-    """Simple function to start keep alive server"""
+async def _serve_forever():
     server = KeepAlive()
-    server.start()
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
 
 if __name__ == "__main__":
-    keep_alive()
     try:
-        while True:
-            time.sleep(1)
+        asyncio.run(_serve_forever())
     except KeyboardInterrupt:
         print("Shutting down...")
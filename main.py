@@ -3,7 +3,6 @@ from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Button, Modal, TextInput
 import json
-import random
 import os
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, List
@@ -11,30 +10,264 @@ import re
 import logging
 import asyncio
 import hashlib
-from keep_alive import keep_alive
+import sqlite3
+import csv
+import io
+import aiohttp
+from keep_alive import KeepAlive
+from paypal_webhooks import WebhookVerifier, WebhookReceiver
+from subs import paypal, apply_webhook_events, add_subscription_commands, load_subscriptions, check_feature_access
+from giveaway_index import GiveawayIndex
+from scheduler import ExpiryScheduler
+from participants import ParticipantSet
+from backup import ChannelBackup
+from flusher import WriteBehindFlusher
+from workers import BoundedWorkerPool
+from members import WinnerResolver, QUERY_CHUNK_SIZE
+from export import FORMAT_CSV, FORMAT_JSONL, server_rows, encode_rows, header_line, iter_parts, part_filename
+from embed_refresh import EmbedRefreshCoalescer
+from join_queue import JoinQueue, JoinEvent
+from eligibility import EligibilityChecker
+from recurrence import Recurrence
+from sharding import ShardPlan
+from draw import (draw_winners, bonus_entry_weights, bonus_entries_record, draw_rng, new_draw_seed,
+                  new_draw_nonce, derive_draw_seed, load_draw_secret,
+                  seed_commitment, participants_digest, MIN_BONUS_ENTRIES, MAX_BONUS_ENTRIES)
+from bulk_import import ImportStats, detect_format, open_text, iter_user_ids, ingest, spool_attachment
+from storage import create_store, giveaway_fields, BACKEND_CHANNEL, BACKEND_SQLITE, OP_CREATE, OP_JOIN, OP_BULK_JOIN, OP_END, OP_CANCEL, OP_REROLL, OP_CLEANUP
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Database channel ID
 DATABASE_CHANNEL_ID = 1393415294663528529
+# Concurrency limits for ending expired giveaways (each one fetches, edits and replies)
+EXPIRY_WORKERS = 16
+EXPIRY_WORKERS_PER_GUILD = 4
+EXPIRY_WORKERS_PER_CHANNEL = 2
+# Participant-count embed edits: at most one per giveaway per interval, sooner after this many joins
+EMBED_REFRESH_INTERVAL = 5.0
+EMBED_REFRESH_JOIN_THRESHOLD = 25
+# /export uploads at most this many compressed parts; larger exports go through cli.py
+MAX_EXPORT_PARTS = 10
+# Timer events share one scheduler, keyed (event, giveaway or schedule ID)
+START_EVENT = "start"
+END_EVENT = "end"
+# Schedule bookkeeping fields, stripped from the settings of the giveaways a schedule starts
+SCHEDULE_FIELDS = ("participants", "status", "created_at", "next_start", "recurrence", "runs",
+                   "last_started_at", "last_message_id")
+MAX_SCHEDULES_PER_SERVER = 25
+MAX_SCHEDULE_AHEAD_DAYS = 365
+MIN_RECURRENCE_SECONDS = 3600
+# Post a full snapshot to the database channel after this many deltas
+BACKUP_SNAPSHOT_EVERY = int(os.getenv("GIVZY_BACKUP_SNAPSHOT_EVERY", "50"))
+
+# Durable storage: "journal" (local snapshot + append-only journal), "sqlite",
+# or "channel" (no local copy, state lives only in the DATABASE_CHANNEL_ID backup; kept for migration)
+DATA_DIR = os.getenv("GIVZY_DATA_DIR", "data")
+STORAGE_BACKEND = os.getenv("GIVZY_STORAGE", "journal")
+# Key the draw seeds of running giveaways are derived from (see draw.py); never persisted with them
+DRAW_SECRET = load_draw_secret(DATA_DIR)
+
+# Shards this process runs (SHARD_COUNT / SHARD_IDS, see sharding.py). Processes splitting
+# the shards between them share one store in a common GIVZY_DATA_DIR, which needs SQLite:
+# the journal assumes a single writer
+shard_plan = ShardPlan.from_env()
+if shard_plan.partial and STORAGE_BACKEND != BACKEND_SQLITE:
+    logging.warning(f"⚠️ The {STORAGE_BACKEND!r} backend cannot be shared between shard processes, using {BACKEND_SQLITE!r}")
+    STORAGE_BACKEND = BACKEND_SQLITE
+# Sharded deployments: how often the shard 0 process snapshots the whole shared store to the database channel
+SHARED_BACKUP_INTERVAL_HOURS = 6
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class GivzyBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        # Status page and PayPal webhooks share the bot's event loop (one per deployment, it binds $PORT)
+        if shard_plan.primary:
+            await web_server.start()
+            paypal_webhooks.start()
+
+    async def close(self):
+        # Flush pending giveaway changes before the connection goes away
+        await join_queue.stop()
+        await embed_refresher.stop()
+        try:
+            await database_flusher.stop()
+        except Exception as e:
+            logging.error(f"Final database flush failed: {e}")
+        await paypal_webhooks.stop()
+        await web_server.stop()
+        await paypal.aclose()
+        await super().close()
+
+bot = GivzyBot(
+    command_prefix="!", intents=intents,
+    shard_count=shard_plan.shard_count,
+    shard_ids=list(shard_plan.shard_ids) if shard_plan.shard_ids else None
+)
 tree = bot.tree
+# /buy and /subscription
+add_subscription_commands(tree, bot)
 
 # Global data structures - server-isolated
 giveaways = {}
-pending_database_save = False
-last_database_save = datetime.now()
+# Set by the first on_ready; later ones are gateway reconnects
+startup_complete = False
+giveaway_index = GiveawayIndex()
+expiry_scheduler = ExpiryScheduler()
+giveaway_store = create_store(STORAGE_BACKEND, DATA_DIR)
+# A process that owns only some shards cannot post deltas (see shared_store_backup)
+channel_backup = ChannelBackup(bot, DATABASE_CHANNEL_ID, snapshot_every=BACKUP_SNAPSHOT_EVERY,
+                               track_changes=not shard_plan.partial)
+winner_resolver = WinnerResolver(bot)
+eligibility_checker = EligibilityChecker()
+embed_refresher = EmbedRefreshCoalescer(
+    lambda message_id: get_active_participant_count(message_id),
+    interval=EMBED_REFRESH_INTERVAL, count_threshold=EMBED_REFRESH_JOIN_THRESHOLD
+)
+expiry_pool = BoundedWorkerPool(EXPIRY_WORKERS, per_guild=EXPIRY_WORKERS_PER_GUILD, per_channel=EXPIRY_WORKERS_PER_CHANNEL)
+join_queue = JoinQueue(lambda events: apply_join_batch(events), max_batch=500)
+database_flusher = WriteBehindFlusher(lambda message_ids: save_database(), max_delay=5.0, max_batch=1000)
+paypal_webhooks = WebhookReceiver(
+    WebhookVerifier(paypal, os.getenv("PAYPAL_WEBHOOK_ID")),
+    lambda events: apply_webhook_events(bot, events)
+)
+web_server = KeepAlive()
+web_server.add_post("/webhooks/paypal", paypal_webhooks.handle)
+
+def get_active_participant_count(message_id: str) -> Optional[int]:
+    """Current participant count, or None once the giveaway is no longer active"""
+    data = giveaways.get(message_id)
+    if not data or data.get("status") != "active":
+        return None
+    return len(data.get("participants", ()))
 
 def get_server_giveaways(server_id: int) -> Dict:
     """Get giveaways for a specific server only"""
-    return {k: v for k, v in giveaways.items() if v.get("server_id") == server_id}
+    return {k: giveaways[k] for k in giveaway_index.server_ids(server_id) if k in giveaways}
+
+def update_giveaway(message_id: str, data: dict, op: str):
+    """Store a giveaway, keep the server/status indexes in sync and journal the change"""
+    giveaways[message_id] = data
+    giveaway_index.update(message_id, data)
+    if data.get("status") != "active":
+        embed_refresher.cancel(message_id)
+        eligibility_checker.drop_giveaway(message_id)
+    giveaway_store.append(op, message_id, data=giveaway_fields(data))
+    channel_backup.mark_changed(message_id)
+    database_flusher.mark_dirty(message_id)
+
+def record_join(message_id: str, data: dict, user_id: int, message: Optional[discord.Message] = None):
+    """Add a participant in memory; persistence and the embed refresh happen on the join queue"""
+    joined_at = datetime.now(timezone.utc).isoformat()
+    data["participants"].add(user_id)
+    data["last_participant_join"] = joined_at
+    join_queue.put(JoinEvent(message_id, user_id, joined_at, message))
+
+async def apply_join_batch(events: List[JoinEvent]):
+    """Journal a batch of queued joins and schedule the resulting persistence and embed updates"""
+    for event in events:
+        giveaway_store.append(OP_JOIN, event.message_id, user=event.user_id, at=event.joined_at)
+        channel_backup.mark_join(event.message_id, event.user_id)
+        database_flusher.mark_dirty(event.message_id)
+        if event.message is not None:
+            embed_refresher.request(event.message_id, event.message)
+    
+    if len(events) > 1:
+        giveaway_count = len({event.message_id for event in events})
+        logging.info(f"📥 Applied {len(events)} queued joins across {giveaway_count} giveaways")
+
+def remove_giveaway(message_id: str):
+    """Delete a giveaway and drop it from the indexes"""
+    giveaways.pop(message_id, None)
+    giveaway_index.remove(message_id)
+    expiry_scheduler.cancel((END_EVENT, message_id))
+    expiry_scheduler.cancel((START_EVENT, message_id))
+    embed_refresher.cancel(message_id)
+    eligibility_checker.drop_giveaway(message_id)
+    giveaway_store.append(OP_CLEANUP, message_id)
+    channel_backup.mark_removed(message_id)
+    database_flusher.mark_dirty(message_id)
+
+def parse_end_timestamp(data: dict) -> Optional[float]:
+    """Parse a giveaway's end_time into a UNIX timestamp, or None if missing/invalid"""
+    try:
+        return datetime.fromisoformat(data["end_time"].replace('Z', '+00:00')).timestamp()
+    except (KeyError, ValueError, AttributeError):
+        return None
+
+def parse_start_timestamp(schedule: dict) -> Optional[float]:
+    """Parse a schedule's next_start into a UNIX timestamp, or None if missing/invalid"""
+    try:
+        return datetime.fromisoformat(schedule["next_start"]).timestamp()
+    except (KeyError, ValueError, TypeError):
+        return None
+
+def rebuild_expiry_schedule():
+    """Schedule every active giveaway's end and every pending scheduled start (run once after loading the database)"""
+    entries = []
+    for message_id in giveaway_index.status_ids("active"):
+        end_ts = parse_end_timestamp(giveaways[message_id])
+        if end_ts is None:
+            logging.warning(f"Giveaway {message_id} has a missing or invalid end_time, not scheduling")
+            continue
+        entries.append(((END_EVENT, message_id), end_ts))
+    # Starts missed while the bot was down are due immediately and fire once
+    for schedule_id in giveaway_index.status_ids("scheduled"):
+        start_ts = parse_start_timestamp(giveaways[schedule_id])
+        if start_ts is None:
+            logging.warning(f"Schedule {schedule_id} has a missing or invalid next_start, not scheduling")
+            continue
+        entries.append(((START_EVENT, schedule_id), start_ts))
+    expiry_scheduler.rebuild(entries)
+
+async def build_winner_details(guild: Optional[discord.Guild], winner_ids: List[str]) -> List[dict]:
+    """Winner names for display/tracking, resolved from caches instead of per-winner API calls"""
+    names = await winner_resolver.resolve(guild, winner_ids)
+    return [
+        {
+            "id": winner_id,
+            "name": names[int(winner_id)][0],
+            "username": names[int(winner_id)][1],
+            "mention": f"<@{winner_id}>"
+        }
+        for winner_id in winner_ids
+    ]
+
+def pick_winners(guild: Optional[discord.Guild], message_id: str, data: dict, count: int,
+                 round_number: int = 0, exclude: Optional[set] = None) -> List[str]:
+    """Draw winners from the giveaway's committed seed (bonus roles get extra entries) and record what a replay needs"""
+    participants = data.get("participants", ParticipantSet())
+    if not data.get("draw_seed"):
+        data["draw_seed"] = reveal_draw_seed(message_id, data)
+    
+    weights = bonus_entry_weights(guild, data, participants)
+    rng = draw_rng(data["draw_seed"], message_id, round_number)
+    winner_ids = [str(uid) for uid in draw_winners(participants, count, weights, rng, exclude)]
+    
+    data["participants_digest"] = participants_digest(participants)
+    data["draw_bonus_entries"] = bonus_entries_record(weights)
+    data["draw_excluded"] = sorted(str(uid) for uid in exclude or ())
+    return winner_ids
+
+def reveal_draw_seed(message_id: str, data: dict) -> str:
+    """The seed a giveaway committed to, derived from its nonce now that the winners are drawn"""
+    if data.get("draw_nonce"):
+        seed = derive_draw_seed(DRAW_SECRET, data["draw_nonce"])
+        if seed_commitment(seed) == data.get("draw_commitment"):
+            return seed
+        # The draw secret changed since the giveaway started: the commitment cannot be honoured
+        logging.error(f"Draw secret does not match the commitment of giveaway {message_id}, drawing with an uncommitted seed")
+        data["draw_commitment"] = None
+        return new_draw_seed()
+    # Giveaways created before seeded draws: the seed is fixed now, without a prior commitment
+    seed = new_draw_seed()
+    data["draw_commitment"] = seed_commitment(seed)
+    return seed
 
 async def validate_message_id(message_id: str) -> bool:
     """Validate that message_id is a valid Discord message ID"""
@@ -51,279 +284,91 @@ async def validate_server_access(interaction: discord.Interaction, giveaway_data
         return False
     return giveaway_data.get("server_id") == interaction.guild.id
 
-async def check_user_eligibility(user: discord.Member, giveaway_data: dict) -> tuple[bool, str]:
-    """Check if user meets all requirements to join giveaway"""
-    now = datetime.now(timezone.utc)
-    
-    # Check required role
-    required_role_id = giveaway_data.get("required_role")
-    if required_role_id:
-        role = user.guild.get_role(required_role_id)
-        if role and role not in user.roles:
-            return False, f"🛡️ You must have the role {role.mention} to join."
-    
-    # Check minimum account age
-    min_account_days = giveaway_data.get("min_account_age_days", 0)
-    if min_account_days > 0:
-        account_age = (now - user.created_at.replace(tzinfo=timezone.utc)).days
-        if account_age < min_account_days:
-            return False, f"⏰ Your account must be at least {min_account_days} days old to join."
-    
-    # Check minimum server join time
-    min_server_days = giveaway_data.get("min_server_days", 0)
-    if min_server_days > 0 and user.joined_at:
-        server_time = (now - user.joined_at.replace(tzinfo=timezone.utc)).days
-        if server_time < min_server_days:
-            return False, f"🏠 You must be in this server for at least {min_server_days} days to join."
+async def check_user_eligibility(user: discord.Member, giveaway_data: dict, message_id: Optional[str] = None) -> tuple[bool, str]:
+    """Check if user meets all requirements to join giveaway (verdict cached per giveaway and member)"""
+    return eligibility_checker.check(user, giveaway_data, message_id)
+
+async def filter_eligible_members(guild: discord.Guild, giveaway_data: dict, user_ids: List[int]) -> List[int]:
+    """Keep the user IDs that are members of ``guild`` and pass the giveaway's requirements"""
+    members = {}
+    misses = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member:
+            members[user_id] = member
+        else:
+            misses.append(user_id)
     
-    return True, "Eligible"
-
-async def batch_save_database():
-    """Batch database saves to avoid rate limiting"""
-    global pending_database_save, last_database_save
+    for i in range(0, len(misses), QUERY_CHUNK_SIZE):
+        chunk = misses[i:i + QUERY_CHUNK_SIZE]
+        try:
+            for member in await guild.query_members(user_ids=chunk, limit=len(chunk), cache=False):
+                members[member.id] = member
+        except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException) as e:
+            logging.warning(f"Member query for {len(chunk)} imported users in {guild.id} failed: {e}")
     
-    if not pending_database_save:
-        pending_database_save = True
-        # Wait 5 seconds to batch multiple changes
-        await asyncio.sleep(5)
-        
-        # Only save if it's been at least 30 seconds since last save
-        if (datetime.now() - last_database_save).total_seconds() >= 30:
-            await save_database()
-            last_database_save = datetime.now()
-        
-        pending_database_save = False
+    eligible = []
+    for user_id in user_ids:
+        member = members.get(user_id)
+        if member and (await check_user_eligibility(member, giveaway_data))[0]:
+            eligible.append(user_id)
+    return eligible
 
 async def load_database():
-    """Load giveaway data from the database channel with improved error handling and recovery."""
+    """Load giveaway data from local storage (channel backup as fallback) and rebuild the in-memory indexes."""
     global giveaways
     
     try:
-        db_channel = bot.get_channel(DATABASE_CHANNEL_ID)
-        if not db_channel:
-            logging.error(f"Database channel {DATABASE_CHANNEL_ID} not found!")
-            # Initialize with empty data to prevent crashes
-            giveaways = {}
-            return
-
-        # Initialize with empty data
-        giveaways = {}
-        
-        # Look for the most recent valid database message
-        messages_to_check = []
-        
-        # Collect recent messages from the database channel
-        async for message in db_channel.history(limit=50):  # Increased limit for better recovery
-            if message.author == bot.user:
-                messages_to_check.append(message)
-        
-        # Sort messages by creation time (newest first)
-        messages_to_check.sort(key=lambda m: m.created_at, reverse=True)
-        
-        # Try to find complete database backup first
-        for message in messages_to_check:
-            if not message.content:
-                continue
-                
-            # Check for single complete JSON message
-            if message.content.startswith("```json") and message.content.endswith("```"):
-                try:
-                    json_content = message.content[7:-3].strip()  # Remove ```json and ```
-                    if not json_content:
-                        continue
-                        
-                    data = json.loads(json_content)
-                    
-                    # Validate the data structure
-                    if isinstance(data, dict):
-                        # New format with separate sections
-                        if "giveaways" in data:
-                            loaded_giveaways = data.get("giveaways", {})
-                            
-                            # Validate that loaded data is properly structured
-                            if isinstance(loaded_giveaways, dict):
-                                giveaways = loaded_giveaways
-                                
-                                logging.info(f"✅ Successfully loaded database from single message:")
-                                logging.info(f"   📊 {len(giveaways)} giveaways")
-                                
-                                # Log active giveaways for verification
-                                active_count = sum(1 for g in giveaways.values() if g.get("status") == "active")
-                                logging.info(f"   🎉 {active_count} active giveaways found")
-                                
-                                if active_count > 0:
-                                    logging.info("   Active giveaway details:")
-                                    for msg_id, data in giveaways.items():
-                                        if data.get("status") == "active":
-                                            server_name = data.get("server_name", "Unknown")
-                                            prize = data.get("prize", "Unknown Prize")
-                                            participants = len(data.get("participants", []))
-                                            logging.info(f"     - {msg_id}: {prize} in {server_name} ({participants} participants)")
-                                
-                                return
-                        else:
-                            # Legacy format - just giveaways
-                            if all(isinstance(v, dict) for v in data.values()):
-                                giveaways = data
-                                logging.info(f"✅ Loaded legacy database format: {len(giveaways)} giveaways")
-                                return
-                    
-                except json.JSONDecodeError as e:
-                    logging.warning(f"JSON decode error in message {message.id}: {e}")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error processing message {message.id}: {e}")
-                    continue
-        
-        # Try to reconstruct from multi-part messages if single message failed
-        logging.info("🔍 Attempting multi-part database reconstruction...")
-        
-        part_messages = []
-        
-        for message in messages_to_check:
-            if "Part" in message.content and "```json" in message.content:
-                try:
-                    # Extract part number and content
-                    part_match = re.search(r'Part (\d+)/(\d+)', message.content)
-                    if part_match:
-                        part_num = int(part_match.group(1))
-                        total_parts = int(part_match.group(2))
-                        
-                        start = message.content.find("```json") + 7
-                        end = message.content.rfind("```")
-                        if start > 6 and end > start:
-                            json_content = message.content[start:end]
-                            part_messages.append((part_num, json_content, message.created_at))
-                except Exception as e:
-                    logging.warning(f"Error parsing multi-part message {message.id}: {e}")
-                    continue
-        
-        # Sort parts by part number and reconstruct
-        if part_messages:
-            part_messages.sort(key=lambda x: x[0])  # Sort by part number
-            combined_json = "".join([content for _, content, _ in part_messages])
-            
-            try:
-                data = json.loads(combined_json)
-                
-                if isinstance(data, dict):
-                    if "giveaways" in data:
-                        giveaways = data.get("giveaways", {})
-                    else:
-                        giveaways = data
-                    
-                    logging.info(f"✅ Reconstructed database from {len(part_messages)} parts:")
-                    logging.info(f"   📊 {len(giveaways)} giveaways")
-                    
-                    active_count = sum(1 for g in giveaways.values() if g.get("status") == "active")
-                    logging.info(f"   🎉 {active_count} active giveaways found")
-                    return
-                    
-            except json.JSONDecodeError as e:
-                logging.error(f"Failed to parse reconstructed multi-part JSON: {e}")
-            except Exception as e:
-                logging.error(f"Error processing reconstructed data: {e}")
-        
-        # If all attempts failed, start with empty database
-        logging.warning("⚠️ No valid database found, starting with empty database")
-        giveaways = {}
-        
-    except Exception as e:
-        logging.error(f"Critical error loading database: {e}")
-        # Initialize with empty data to prevent crashes
+        local_giveaways = giveaway_store.load()
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"Could not read local giveaway storage: {e}")
+        local_giveaways = None
+    
+    if local_giveaways is not None:
+        giveaways = local_giveaways
+    elif not shard_plan.primary:
+        # Seeding an empty shared store from the channel backup is the shard 0 process's job
+        logging.warning("📂 Shared giveaway storage is empty; start the process running shard 0 first to restore it")
         giveaways = {}
+    else:
+        # Fresh disk: restore from the channel backup and seed local storage with it
+        logging.info("📂 No local giveaway storage found, restoring from the database channel")
+        giveaways = await channel_backup.restore()
+        try:
+            await giveaway_store.import_all(giveaways)
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Could not seed local giveaway storage: {e}")
+    
+    if shard_plan.partial:
+        # Keep only the giveaways of guilds on our shards: their timers, joins and writes are ours alone
+        giveaways = {message_id: data for message_id, data in giveaways.items()
+                     if shard_plan.owns(data.get("server_id"))}
+        logging.info(f"🧩 Running {shard_plan.describe()}: {len(giveaways)} giveaways owned by this process")
+    
+    giveaway_index.rebuild(giveaways)
+    rebuild_expiry_schedule()
 
 async def save_database():
-    """Save all data to the database channel with improved structure."""
+    """Make recorded changes durable locally, then post them to the database channel as a delta.
+    
+    A failed local write is raised so the write-behind flusher keeps the batch dirty and retries it.
+    """
     try:
-        db_channel = bot.get_channel(DATABASE_CHANNEL_ID)
-        if not db_channel:
-            logging.error(f"Database channel {DATABASE_CHANNEL_ID} not found!")
-            return
-
-        # Create comprehensive data structure
-        database_data = {
-            "giveaways": giveaways,
-            "metadata": {
-                "version": "2.2-givzy",
-                "last_updated": datetime.now(timezone.utc).isoformat(),
-                "total_giveaways": len(giveaways),
-                "active_giveaways": sum(1 for g in giveaways.values() if g.get("status") == "active"),
-                "total_servers": len(set(g.get("server_id") for g in giveaways.values() if g.get("server_id"))),
-                "save_timestamp": datetime.now(timezone.utc).timestamp()
-            }
-        }
-        
-        json_content = json.dumps(database_data, indent=2, ensure_ascii=False)
-        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        await giveaway_store.sync()
         
-        # Calculate content hash for integrity
-        content_hash = hashlib.md5(json_content.encode()).hexdigest()[:8]
-        
-        # Check if content is too large for Discord
-        if len(json_content) > 1900:
-            # Split into chunks
-            chunk_size = 1900
-            chunks = [json_content[i:i+chunk_size] for i in range(0, len(json_content), chunk_size)]
-            
-            # Send header embed first
-            embed = discord.Embed(
-                title="🗄️ Givzy Giveaway Database Backup",
-                description=f"**Database Version:** 2.2-givzy (Multi-Server)\n"
-                           f"**Total Giveaways:** {database_data['metadata']['total_giveaways']}\n"
-                           f"**Active:** {database_data['metadata']['active_giveaways']}\n"
-                           f"**Servers:** {database_data['metadata']['total_servers']}\n"
-                           f"**Last Updated:** {timestamp}\n"
-                           f"**Split into {len(chunks)} parts**\n"
-                           f"**Hash:** `{content_hash}`",
-                color=discord.Color.green(),
-                timestamp=datetime.now(timezone.utc)
-            )
-            
-            await db_channel.send(embed=embed)
-            
-            # Send JSON chunks with clear part indicators
-            for i, chunk in enumerate(chunks):
-                chunk_message = f"**Part {i+1}/{len(chunks)}:**\n```json\n{chunk}\n```"
-                await db_channel.send(chunk_message)
-                # Add small delay to ensure proper order
-                await asyncio.sleep(0.5)
-            
-            logging.info(f"✅ Database saved in {len(chunks)} parts (hash: {content_hash})")
-        else:
-            # Small database - single message
-            message_content = f"```json\n{json_content}\n```"
-            embed = discord.Embed(
-                title="🗄️ Givzy Giveaway Database Backup",
-                description=f"**Database Version:** 2.2-givzy (Multi-Server)\n"
-                           f"**Total Giveaways:** {database_data['metadata']['total_giveaways']}\n"
-                           f"**Active:** {database_data['metadata']['active_giveaways']}\n"
-                           f"**Servers:** {database_data['metadata']['total_servers']}\n"
-                           f"**Last Updated:** {timestamp}\n"
-                           f"**Hash:** `{content_hash}`",
-                color=discord.Color.green(),
-                timestamp=datetime.now(timezone.utc)
-            )
-            
-            await db_channel.send(content=message_content, embed=embed)
-            logging.info(f"✅ Database saved successfully (hash: {content_hash})")
-        
-        # Log active giveaways for verification
-        active_giveaways = [g for g in giveaways.values() if g.get("status") == "active"]
-        if active_giveaways:
-            logging.info(f"📝 Saved {len(active_giveaways)} active giveaways:")
-            for g in active_giveaways[:3]:  # Log first 3 for brevity
-                server_name = g.get("server_name", "Unknown")
-                prize = g.get("prize", "Unknown Prize")
-                participants = len(g.get("participants", []))
-                logging.info(f"   - {prize} in {server_name} ({participants} participants)")
-            if len(active_giveaways) > 3:
-                logging.info(f"   ... and {len(active_giveaways) - 3} more")
-        
-    except discord.HTTPException as e:
-        logging.error(f"Discord HTTP error saving database: {e}")
-    except Exception as e:
+        if giveaway_store.needs_compaction():
+            await giveaway_store.compact(giveaways)
+    except (OSError, sqlite3.Error) as e:
         logging.error(f"Critical error saving database: {e}")
+        raise
+    
+    # Off-host copy: only what changed since the last flush, plus a full snapshot every N deltas
+    if not channel_backup.track_changes:
+        return
+    try:
+        await channel_backup.flush(giveaways)
+    except Exception as e:
+        logging.error(f"Critical error backing up database: {e}")
 
 class ConfirmationView(View):
     """A view for confirmation dialogs"""
@@ -356,132 +401,56 @@ class JoinView(View):
 
     @discord.ui.button(label="🎉 Join Giveaway", style=discord.ButtonStyle.green, custom_id="join_button")
     async def join(self, interaction: discord.Interaction, button: Button):
-        """Enhanced join callback with comprehensive checks."""
-        await interaction.response.defer(ephemeral=True)
-        
-        user_id = str(interaction.user.id)
+        """Join callback: every check runs in memory so the click is acknowledged in one response."""
+        user_id = interaction.user.id
         giveaway_data = giveaways.get(self.message_id)
 
         if not giveaway_data:
-            await interaction.followup.send("❌ This giveaway no longer exists.", ephemeral=True)
+            await interaction.response.send_message("❌ This giveaway no longer exists.", ephemeral=True)
             return
 
         # SECURITY: Validate server access
         if not await validate_server_access(interaction, giveaway_data):
-            await interaction.followup.send("❌ This giveaway is not accessible from this server.", ephemeral=True)
+            await interaction.response.send_message("❌ This giveaway is not accessible from this server.", ephemeral=True)
             return
 
         if giveaway_data.get("status") != "active":
             status = giveaway_data.get("status", "unknown")
-            await interaction.followup.send(f"❌ This giveaway is {status}.", ephemeral=True)
+            await interaction.response.send_message(f"❌ This giveaway is {status}.", ephemeral=True)
             return
 
         # Check if already joined
         if "participants" not in giveaway_data:
-            giveaway_data["participants"] = []
+            giveaway_data["participants"] = ParticipantSet()
 
         if user_id in giveaway_data["participants"]:
-            await interaction.followup.send("❌ You have already joined this giveaway!", ephemeral=True)
+            await interaction.response.send_message("❌ You have already joined this giveaway!", ephemeral=True)
             return
 
         # Check user eligibility
         member = interaction.user if isinstance(interaction.user, discord.Member) else None
         if not member:
-            await interaction.followup.send("❌ Cannot verify eligibility outside of a guild.", ephemeral=True)
+            await interaction.response.send_message("❌ Cannot verify eligibility outside of a guild.", ephemeral=True)
             return
         
-        eligible, reason = await check_user_eligibility(member, giveaway_data)
+        eligible, reason = await check_user_eligibility(member, giveaway_data, self.message_id)
         if not eligible:
-            await interaction.followup.send(reason, ephemeral=True)
+            await interaction.response.send_message(reason, ephemeral=True)
             return
 
-        # Add user to giveaway
-        giveaway_data["participants"].append(user_id)
-        giveaway_data["last_participant_join"] = datetime.now(timezone.utc).isoformat()
-        giveaways[self.message_id] = giveaway_data
-        
-        # Batch save to avoid rate limiting
-        asyncio.create_task(batch_save_database())
-        
-        await interaction.followup.send("✅ You have successfully joined the giveaway! Good luck! 🍀", ephemeral=True)
+        # Participant count in the embed is refreshed (coalesced) by the join queue - with permission check
+        original_message = interaction.message
+        if original_message and not interaction.guild.me.guild_permissions.manage_messages:
+            logging.warning(f"Missing permission to edit message for giveaway {self.message_id}")
+            original_message = None
 
-        # Update participant count in embed - with permission check
-        try:
-            original_message = interaction.message
-            if original_message and original_message.embeds:
-                # Check if we have permission to edit messages
-                if interaction.guild.me.guild_permissions.manage_messages:
-                    updated_embed = original_message.embeds[0].copy()
-                    description = updated_embed.description
-                    
-                    lines = description.split('\n')
-                    for i, line in enumerate(lines):
-                        if line.startswith("👥 **Participants:**"):
-                            lines[i] = f"👥 **Participants:** {len(giveaway_data['participants'])}"
-                            break
-                    
-                    updated_embed.description = '\n'.join(lines)
-                    await original_message.edit(embed=updated_embed)
-                else:
-                    logging.warning(f"Missing permission to edit message for giveaway {self.message_id}")
-        except discord.Forbidden:
-            logging.warning(f"Permission denied when trying to update embed for giveaway {self.message_id}")
-        except Exception as e:
-            logging.warning(f"Could not update embed for giveaway {self.message_id}: {e}")
-
-# Enhanced slash commands with server isolation
-
-@tree.command(name="giveaway", description="Start a giveaway with advanced options")
-@app_commands.checks.has_permissions(manage_guild=True)
-@app_commands.describe(
-    prize="What is the prize?",
-    winners="How many winners?",
-    duration="Duration (1m, 1h, 1d)",
-    donor="The name of the giveaway donor (optional)",
-    role="Optional role required to join",
-    min_account_age="Minimum account age in days",
-    min_server_time="Minimum time in server in days"
-)
-async def giveaway(
-    interaction: discord.Interaction,
-    prize: str,
-    winners: int,
-    duration: str,
-    donor: Optional[str] = None,
-    role: Optional[discord.Role] = None,
-    min_account_age: Optional[int] = None,
-    min_server_time: Optional[int] = None
-):
-    """Start a new giveaway with enhanced validation and features."""
-    await interaction.response.defer()
-    
-    # Comprehensive input validation
-    if not isinstance(interaction.channel, (discord.TextChannel, discord.Thread)):
-        await interaction.followup.send("❌ Giveaways can only be started in text channels!", ephemeral=True)
-        return
-
-    if interaction.guild is None:
-        await interaction.followup.send("❌ This command can only be used in a server!", ephemeral=True)
-        return
-
-    if winners <= 0 or winners > 100:
-        await interaction.followup.send("❌ Number of winners must be between 1 and 100.", ephemeral=True)
-        return
-
-    if len(prize) > 256:
-        await interaction.followup.send("❌ Prize description is too long (max 256 characters).", ephemeral=True)
-        return
-
-    if min_account_age and (min_account_age < 0 or min_account_age > 3650):
-        await interaction.followup.send("❌ Minimum account age must be between 0 and 3650 days.", ephemeral=True)
-        return
-
-    if min_server_time and (min_server_time < 0 or min_server_time > 365):
-        await interaction.followup.send("❌ Minimum server time must be between 0 and 365 days.", ephemeral=True)
-        return
+        # Add user to giveaway in memory, then acknowledge; bookkeeping is queued
+        record_join(self.message_id, giveaway_data, user_id, original_message)
+        
+        await interaction.response.send_message("✅ You have successfully joined the giveaway! Good luck! 🍀", ephemeral=True)
 
-    # Enhanced duration parsing
-    total_seconds = 0
+def parse_duration(duration: str) -> int:
+    """Parse durations like 1d2h30m, 2h, 90m or 45s into seconds (0 when invalid)"""
     duration_lower = duration.lower().strip()
     
     # Support multiple formats: 1d2h30m, 2h30m, 90m, etc.
@@ -490,60 +459,108 @@ async def giveaway(
     
     if match and any(match.groups()):
         days, hours, minutes, seconds = match.groups()
-        total_seconds = (
+        return (
             (int(days or 0) * 86400) +
             (int(hours or 0) * 3600) +
             (int(minutes or 0) * 60) +
             (int(seconds or 0))
         )
-    else:
-        # Fallback to simple format
-        simple_match = re.fullmatch(r'(\d+)([smhd])', duration_lower)
-        if simple_match:
-            value = int(simple_match.group(1))
-            unit = simple_match.group(2)
-            multipliers = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
-            total_seconds = value * multipliers[unit]
-
+    
+    # Fallback to simple format
+    simple_match = re.fullmatch(r'(\d+)([smhd])', duration_lower)
+    if simple_match:
+        value = int(simple_match.group(1))
+        unit = simple_match.group(2)
+        multipliers = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+        return value * multipliers[unit]
+    return 0
+
+def giveaway_options_error(prize: str, winners: int, total_seconds: int, min_account_age: Optional[int],
+                           min_server_time: Optional[int], bonus_role: Optional[discord.Role],
+                           bonus_entries: Optional[int]) -> Optional[str]:
+    """Validation message for giveaway options, or None when they are all valid"""
+    if winners <= 0 or winners > 100:
+        return "❌ Number of winners must be between 1 and 100."
+    if len(prize) > 256:
+        return "❌ Prize description is too long (max 256 characters)."
+    if min_account_age and (min_account_age < 0 or min_account_age > 3650):
+        return "❌ Minimum account age must be between 0 and 3650 days."
+    if min_server_time and (min_server_time < 0 or min_server_time > 365):
+        return "❌ Minimum server time must be between 0 and 365 days."
+    if bonus_entries is not None and not bonus_role:
+        return "❌ Bonus entries need a bonus role."
+    if bonus_entries is not None and not MIN_BONUS_ENTRIES <= bonus_entries <= MAX_BONUS_ENTRIES:
+        return f"❌ Bonus entries must be between {MIN_BONUS_ENTRIES} and {MAX_BONUS_ENTRIES}."
     if total_seconds <= 0:
-        await interaction.followup.send(
-            "❌ Invalid duration format. Examples: `30m`, `2h`, `1d`, `1d2h30m`",
-            ephemeral=True
-        )
-        return
-
+        return "❌ Invalid duration format. Examples: `30m`, `2h`, `1d`, `1d2h30m`"
     if total_seconds < 60:
-        await interaction.followup.send("❌ Giveaway duration must be at least 1 minute.", ephemeral=True)
-        return
-
+        return "❌ Giveaway duration must be at least 1 minute."
     if total_seconds > 2592000:  # 30 days
-        await interaction.followup.send("❌ Giveaway duration cannot exceed 30 days.", ephemeral=True)
-        return
+        return "❌ Giveaway duration cannot exceed 30 days."
+    return None
+
+def pro_options_error(server_id: int, required_role: Optional[int], min_account_age: Optional[int],
+                      min_server_time: Optional[int]) -> Optional[str]:
+    """Upgrade message when a free server asks for Pro-only options (a cached tier lookup, no PayPal call)"""
+    requested = (("role_requirement", required_role), ("account_age", min_account_age), ("server_time", min_server_time))
+    for feature, value in requested:
+        if value:
+            allowed, message = check_feature_access(server_id, feature)
+            if not allowed:
+                return message
+    return None
+
+def giveaway_settings(interaction: discord.Interaction, channel, prize: str, winners: int, duration: str,
+                      total_seconds: int, donor: Optional[str], role: Optional[discord.Role],
+                      min_account_age: Optional[int], min_server_time: Optional[int],
+                      bonus_role: Optional[discord.Role], bonus_entries: Optional[int]) -> dict:
+    """The reusable part of a giveaway: everything except its message, timing and draw seed"""
+    bonus_roles = {}
+    if bonus_role:
+        bonus_roles[str(bonus_role.id)] = bonus_entries or MIN_BONUS_ENTRIES
+    return {
+        "server_id": interaction.guild.id,
+        "server_name": interaction.guild.name,
+        "channel_id": channel.id,
+        "prize": prize,
+        "winners": winners,
+        "donor_name": donor or interaction.user.display_name,
+        "required_role": role.id if role else None,
+        "min_account_age_days": min_account_age or 0,
+        "min_server_days": min_server_time or 0,
+        "bonus_roles": bonus_roles,
+        "created_by": interaction.user.id,
+        "creator_name": interaction.user.display_name,
+        "duration": duration,
+        "original_duration_seconds": total_seconds
+    }
 
-    # Calculate end time
-    end_time = datetime.now(timezone.utc) + timedelta(seconds=total_seconds)
+def build_giveaway_embed(settings: dict, end_time: datetime, draw_commitment: str) -> discord.Embed:
+    """The embed a running giveaway is posted with"""
     end_timestamp = int(end_time.timestamp())
 
-    # Set default donor
-    donor_name = donor or interaction.user.display_name
-
     # Build description
     description_parts = [
-        f"🎁 **Prize:** {prize}",
-        f"✨ **Donor:** {donor_name}",
+        f"🎁 **Prize:** {settings['prize']}",
+        f"✨ **Donor:** {settings['donor_name']}",
         f"⏰ **Ends:** <t:{end_timestamp}:R> (<t:{end_timestamp}:f>)",
-        f"🏆 **Winners:** {winners}",
+        f"🏆 **Winners:** {settings['winners']}",
         f"👥 **Participants:** 0"
     ]
 
-    if role:
-        description_parts.append(f"🛡️ **Required Role:** {role.mention}")
+    if settings.get("required_role"):
+        description_parts.append(f"🛡️ **Required Role:** <@&{settings['required_role']}>")
+    
+    if settings.get("min_account_age_days"):
+        description_parts.append(f"⏰ **Min Account Age:** {settings['min_account_age_days']} days")
     
-    if min_account_age:
-        description_parts.append(f"⏰ **Min Account Age:** {min_account_age} days")
+    if settings.get("min_server_days"):
+        description_parts.append(f"🏠 **Min Server Time:** {settings['min_server_days']} days")
     
-    if min_server_time:
-        description_parts.append(f"🏠 **Min Server Time:** {min_server_time} days")
+    for role_id, entries in (settings.get("bonus_roles") or {}).items():
+        description_parts.append(f"🎟️ **Bonus Entries:** <@&{role_id}> ×{entries}")
+
+    description_parts.append(f"🔒 **Draw Commitment:** `{draw_commitment}`")
 
     description_parts.append(f"\n✨ **Powered by Givzy**")
 
@@ -553,38 +570,92 @@ async def giveaway(
         color=discord.Color.blue(),
         timestamp=end_time
     )
-    embed.set_footer(text=f"Started by {interaction.user.display_name} • Ends")
-
-    view = JoinView(message_id="temp_placeholder")
+    embed.set_footer(text=f"Started by {settings.get('creator_name', 'Givzy')} • Ends")
+    return embed
 
-    await interaction.followup.send(embed=embed, view=view)
-    message = await interaction.original_response()
-
-    # Register view and save giveaway data
+def register_giveaway(message: discord.Message, view: "JoinView", settings: dict, end_time: datetime, draw_nonce: str) -> str:
+    """Record a freshly posted giveaway, wire up its join button and schedule its end"""
     message_id_str = str(message.id)
     view.message_id = message_id_str
     bot.add_view(view, message_id=message.id)
 
-    giveaways[message_id_str] = {
-        "server_id": interaction.guild.id,
-        "server_name": interaction.guild.name,
-        "channel_id": interaction.channel.id,
-        "prize": prize,
-        "winners": winners,
-        "participants": [],
-        "donor_name": donor_name,
-        "required_role": role.id if role else None,
-        "min_account_age_days": min_account_age or 0,
-        "min_server_days": min_server_time or 0,
+    giveaway_data = {
+        **settings,
+        "participants": ParticipantSet(),
+        # The seed itself stays out of storage and backups until the draw reveals it
+        "draw_nonce": draw_nonce,
+        "draw_commitment": seed_commitment(derive_draw_seed(DRAW_SECRET, draw_nonce)),
         "status": "active",
-        "created_by": interaction.user.id,
         "created_at": datetime.now(timezone.utc).isoformat(),
-        "end_time": end_time.isoformat(),
-        "duration": duration,
-        "original_duration_seconds": total_seconds
+        "end_time": end_time.isoformat()
     }
+    update_giveaway(message_id_str, giveaway_data, OP_CREATE)
+    eligibility_checker.compile(message_id_str, giveaway_data)
+    expiry_scheduler.schedule((END_EVENT, message_id_str), end_time.timestamp())
+    return message_id_str
+
+# Enhanced slash commands with server isolation
+
+@tree.command(name="giveaway", description="Start a giveaway with advanced options")
+@app_commands.checks.has_permissions(manage_guild=True)
+@app_commands.describe(
+    prize="What is the prize?",
+    winners="How many winners?",
+    duration="Duration (1m, 1h, 1d)",
+    donor="The name of the giveaway donor (optional)",
+    role="Optional role required to join",
+    min_account_age="Minimum account age in days",
+    min_server_time="Minimum time in server in days",
+    bonus_role="Optional role whose members get extra entries",
+    bonus_entries=f"Entries for members of the bonus role ({MIN_BONUS_ENTRIES}-{MAX_BONUS_ENTRIES}, default {MIN_BONUS_ENTRIES})"
+)
+async def giveaway(
+    interaction: discord.Interaction,
+    prize: str,
+    winners: int,
+    duration: str,
+    donor: Optional[str] = None,
+    role: Optional[discord.Role] = None,
+    min_account_age: Optional[int] = None,
+    min_server_time: Optional[int] = None,
+    bonus_role: Optional[discord.Role] = None,
+    bonus_entries: Optional[int] = None
+):
+    """Start a new giveaway with enhanced validation and features."""
+    await interaction.response.defer()
+    
+    # Comprehensive input validation
+    if not isinstance(interaction.channel, (discord.TextChannel, discord.Thread)):
+        await interaction.followup.send("❌ Giveaways can only be started in text channels!", ephemeral=True)
+        return
+
+    if interaction.guild is None:
+        await interaction.followup.send("❌ This command can only be used in a server!", ephemeral=True)
+        return
+
+    total_seconds = parse_duration(duration)
+    error = (giveaway_options_error(prize, winners, total_seconds, min_account_age, min_server_time, bonus_role, bonus_entries)
+             or pro_options_error(interaction.guild.id, role.id if role else None, min_account_age, min_server_time))
+    if error:
+        await interaction.followup.send(error, ephemeral=True)
+        return
+
+    settings = giveaway_settings(
+        interaction, interaction.channel, prize, winners, duration, total_seconds,
+        donor, role, min_account_age, min_server_time, bonus_role, bonus_entries
+    )
+    end_time = datetime.now(timezone.utc) + timedelta(seconds=total_seconds)
+    # Commit to the draw seed up front; it is revealed with the results
+    draw_nonce = new_draw_nonce()
+    commitment = seed_commitment(derive_draw_seed(DRAW_SECRET, draw_nonce))
+
+    view = JoinView(message_id="temp_placeholder")
+
+    await interaction.followup.send(embed=build_giveaway_embed(settings, end_time, commitment), view=view)
+    message = await interaction.original_response()
+
+    message_id_str = register_giveaway(message, view, settings, end_time, draw_nonce)
     
-    asyncio.create_task(batch_save_database())
     logging.info(f"Enhanced giveaway {message_id_str} created in {interaction.guild.name} ({interaction.guild.id}) - ends in {duration}")
 
 @tree.command(name="endgiveaway", description="End a giveaway and pick winners")
@@ -639,7 +710,7 @@ async def end_giveaway(interaction: discord.Interaction, message_id: str):
         await interaction.edit_original_response(content="❌ Giveaway end cancelled.", embed=None, view=None)
         return
 
-    participants = giveaway_data.get("participants", [])
+    participants = giveaway_data.get("participants", ParticipantSet())
     if not participants:
         await interaction.edit_original_response(
             content="❌ No one participated in this giveaway.", 
@@ -648,34 +719,17 @@ async def end_giveaway(interaction: discord.Interaction, message_id: str):
         giveaway_data["status"] = "ended"
         giveaway_data["ended_at"] = datetime.now(timezone.utc).isoformat()
         giveaway_data["ended_by"] = interaction.user.id
-        giveaways[message_id] = giveaway_data
-        await save_database()
+        update_giveaway(message_id, giveaway_data, OP_END)
+        expiry_scheduler.cancel((END_EVENT, message_id))
         return
 
     # Enhanced winner selection
     winners_count = min(len(participants), giveaway_data["winners"])
-    winner_ids = random.sample(participants, winners_count)
+    winner_ids = pick_winners(interaction.guild, message_id, giveaway_data, winners_count)
     
     # Get winner objects for display
-    winner_mentions = []
-    winner_details = []
-    
-    for winner_id in winner_ids:
-        try:
-            user = await bot.fetch_user(int(winner_id))
-            winner_mentions.append(f"<@{winner_id}>")
-            winner_details.append({
-                "id": winner_id,
-                "name": user.display_name if hasattr(user, 'display_name') else user.name,
-                "mention": f"<@{winner_id}>"
-            })
-        except:
-            winner_mentions.append(f"<@{winner_id}>")
-            winner_details.append({
-                "id": winner_id,
-                "name": "Unknown User",
-                "mention": f"<@{winner_id}>"
-            })
+    winner_mentions = [f"<@{winner_id}>" for winner_id in winner_ids]
+    winner_details = await build_winner_details(interaction.guild, winner_ids)
 
     # Update giveaway status
     giveaway_data["status"] = "ended"
@@ -683,8 +737,8 @@ async def end_giveaway(interaction: discord.Interaction, message_id: str):
     giveaway_data["ended_by"] = interaction.user.id
     giveaway_data["winner_ids"] = winner_ids
     giveaway_data["winner_details"] = winner_details
-    giveaways[message_id] = giveaway_data
-    await save_database()
+    update_giveaway(message_id, giveaway_data, OP_END)
+    expiry_scheduler.cancel((END_EVENT, message_id))
 
     # Update original message with permission checks
     channel = bot.get_channel(giveaway_data["channel_id"])
@@ -700,7 +754,8 @@ async def end_giveaway(interaction: discord.Interaction, message_id: str):
                                f"✨ **Donor:** {giveaway_data['donor_name']}\n"
                                f"🏆 **Winners:** {' '.join(winner_mentions)}\n"
                                f"👥 **Total Participants:** {len(participants)}\n"
-                               f"⏰ **Ended by:** {interaction.user.mention}",
+                               f"⏰ **Ended by:** {interaction.user.mention}\n"
+                               f"🔑 **Draw Seed:** `{giveaway_data['draw_seed']}`",
                     color=discord.Color.gold(),
                     timestamp=datetime.now(timezone.utc)
                 )
@@ -732,9 +787,12 @@ async def end_giveaway(interaction: discord.Interaction, message_id: str):
 @app_commands.checks.has_permissions(manage_guild=True)
 @app_commands.describe(
     message_id="The message ID of the giveaway to reroll",
-    new_winners="Number of new winners to pick (optional, uses original count if not specified)"
+    new_winners="Number of new winners to pick (optional, uses original count if not specified)",
+    exclude_previous="Exclude everyone who already won this giveaway (default: yes)",
+    exclude_users="User mentions or IDs to exclude from this reroll"
 )
-async def reroll_giveaway(interaction: discord.Interaction, message_id: str, new_winners: Optional[int] = None):
+async def reroll_giveaway(interaction: discord.Interaction, message_id: str, new_winners: Optional[int] = None,
+                          exclude_previous: bool = True, exclude_users: Optional[str] = None):
     """Reroll winners for an ended giveaway."""
     await interaction.response.defer(ephemeral=True)
 
@@ -764,27 +822,59 @@ async def reroll_giveaway(interaction: discord.Interaction, message_id: str, new
         await interaction.followup.send("❌ Only the giveaway creator or users with Manage Server permission can reroll.", ephemeral=True)
         return
 
-    participants = giveaway_data.get("participants", [])
+    participants = giveaway_data.get("participants", ParticipantSet())
     if not participants:
         await interaction.followup.send("❌ No participants to reroll from.", ephemeral=True)
         return
 
+    # Earlier rounds are kept in the reroll history; the first reroll records the original draw
+    history = giveaway_data.setdefault("reroll_history", [])
+    if not history and giveaway_data.get("winner_ids"):
+        history.append({
+            "round": 0,
+            "winner_ids": list(giveaway_data["winner_ids"]),
+            "excluded": giveaway_data.get("draw_excluded", []),
+            "participants_digest": giveaway_data.get("participants_digest"),
+            "bonus_entries": giveaway_data.get("draw_bonus_entries"),
+            "drawn_at": giveaway_data.get("ended_at"),
+            "drawn_by": giveaway_data.get("ended_by"),
+        })
+
+    exclude = {int(uid) for uid in re.findall(r"\d{15,20}", exclude_users or "")}
+    if exclude_previous:
+        for entry in history:
+            exclude.update(int(uid) for uid in entry["winner_ids"])
+    exclude = {uid for uid in exclude if uid in participants}
+
     # Determine number of winners
-    winners_count = new_winners or giveaway_data["winners"]
-    if winners_count > len(participants):
-        winners_count = len(participants)
+    winners_count = min(new_winners or giveaway_data["winners"], len(participants) - len(exclude))
+    if winners_count <= 0:
+        await interaction.followup.send("❌ No participants left to reroll from after exclusions.", ephemeral=True)
+        return
 
     # Pick new winners
-    winner_ids = random.sample(participants, winners_count)
+    round_number = giveaway_data.get("reroll_count", 0) + 1
+    winner_ids = pick_winners(interaction.guild, message_id, giveaway_data, winners_count,
+                              round_number=round_number, exclude=exclude)
     winner_mentions = [f"<@{winner_id}>" for winner_id in winner_ids]
 
     # Update giveaway data
     giveaway_data["winner_ids"] = winner_ids
+    giveaway_data["winner_details"] = await build_winner_details(interaction.guild, winner_ids)
     giveaway_data["rerolled_at"] = datetime.now(timezone.utc).isoformat()
     giveaway_data["rerolled_by"] = interaction.user.id
-    giveaway_data["reroll_count"] = giveaway_data.get("reroll_count", 0) + 1
-    giveaways[message_id] = giveaway_data
-    await save_database()
+    giveaway_data["reroll_count"] = round_number
+    history.append({
+        "round": round_number,
+        "winner_ids": winner_ids,
+        "excluded": giveaway_data["draw_excluded"],
+        # pick_winners overwrites the top-level draw inputs; each round keeps its own for replay
+        "participants_digest": giveaway_data["participants_digest"],
+        "bonus_entries": giveaway_data["draw_bonus_entries"],
+        "drawn_at": giveaway_data["rerolled_at"],
+        "drawn_by": interaction.user.id,
+    })
+    update_giveaway(message_id, giveaway_data, OP_REROLL)
 
     # Update original message with permission checks
     channel = bot.get_channel(giveaway_data["channel_id"])
@@ -800,7 +890,8 @@ async def reroll_giveaway(interaction: discord.Interaction, message_id: str, new
                                f"✨ **Donor:** {giveaway_data['donor_name']}\n"
                                f"🏆 **New Winners:** {' '.join(winner_mentions)}\n"
                                f"👥 **Total Participants:** {len(participants)}\n"
-                               f"🔄 **Rerolled by:** {interaction.user.mention}",
+                               f"🔄 **Rerolled by:** {interaction.user.mention}\n"
+                               f"🔑 **Draw Seed:** `{giveaway_data['draw_seed']}` (round {giveaway_data['reroll_count']})",
                     color=discord.Color.purple(),
                     timestamp=datetime.now(timezone.utc)
                 )
@@ -880,8 +971,8 @@ async def cancel_giveaway(interaction: discord.Interaction, message_id: str):
     giveaway_data["status"] = "cancelled"
     giveaway_data["cancelled_at"] = datetime.now(timezone.utc).isoformat()
     giveaway_data["cancelled_by"] = interaction.user.id
-    giveaways[message_id] = giveaway_data
-    await save_database()
+    update_giveaway(message_id, giveaway_data, OP_CANCEL)
+    expiry_scheduler.cancel((END_EVENT, message_id))
 
     # Update original message with permission checks
     channel = bot.get_channel(giveaway_data["channel_id"])
@@ -912,27 +1003,373 @@ async def cancel_giveaway(interaction: discord.Interaction, message_id: str):
     
     logging.info(f"Giveaway {message_id} cancelled in {interaction.guild.name}")
 
+def parse_start_time(value: str) -> Optional[datetime]:
+    """Parse a schedule start: a delay (2h, 1d), a UNIX or Discord timestamp, or an ISO date-time (UTC unless an offset is given)"""
+    value = value.strip()
+    delay = parse_duration(value)
+    if delay:
+        return datetime.now(timezone.utc) + timedelta(seconds=delay)
+    match = re.fullmatch(r"<t:(\d+)(?::\w)?>|(\d{9,11})", value)
+    if match:
+        return datetime.fromtimestamp(int(match.group(1) or match.group(2)), timezone.utc)
+    try:
+        start = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+
+def shortest_recurrence_gap(recurrence: Recurrence, after: float, samples: int = 24) -> Optional[float]:
+    """Smallest gap between the next few runs of a recurrence (None if it runs at most once)"""
+    gaps = []
+    previous = recurrence.next_after(after)
+    for _ in range(samples):
+        if previous is None:
+            break
+        following = recurrence.next_after(previous)
+        if following is None:
+            break
+        gaps.append(following - previous)
+        previous = following
+    return min(gaps) if gaps else None
+
+@tree.command(name="schedulegiveaway", description="Schedule a giveaway to start later, optionally repeating")
+@app_commands.checks.has_permissions(manage_guild=True)
+@app_commands.describe(
+    prize="What is the prize?",
+    winners="How many winners?",
+    duration="How long each giveaway runs (1m, 1h, 1d)",
+    start="When to start: a delay (2h, 1d), a UNIX timestamp or 2025-01-31 18:00 (UTC)",
+    repeat="Repeat on a cron schedule in UTC, e.g. @daily, @weekly or '0 18 * * 5'",
+    channel="Channel to post in (defaults to this one)",
+    donor="The name of the giveaway donor (optional)",
+    role="Optional role required to join",
+    min_account_age="Minimum account age in days",
+    min_server_time="Minimum time in server in days",
+    bonus_role="Optional role whose members get extra entries",
+    bonus_entries=f"Entries for members of the bonus role ({MIN_BONUS_ENTRIES}-{MAX_BONUS_ENTRIES}, default {MIN_BONUS_ENTRIES})"
+)
+async def schedule_giveaway(
+    interaction: discord.Interaction,
+    prize: str,
+    winners: int,
+    duration: str,
+    start: Optional[str] = None,
+    repeat: Optional[str] = None,
+    channel: Optional[discord.TextChannel] = None,
+    donor: Optional[str] = None,
+    role: Optional[discord.Role] = None,
+    min_account_age: Optional[int] = None,
+    min_server_time: Optional[int] = None,
+    bonus_role: Optional[discord.Role] = None,
+    bonus_entries: Optional[int] = None
+):
+    """Create a one-off or recurring giveaway schedule; the timer posts each giveaway when due."""
+    await interaction.response.defer(ephemeral=True)
+
+    if interaction.guild is None:
+        await interaction.followup.send("❌ This command can only be used in a server!", ephemeral=True)
+        return
+
+    channel = channel or interaction.channel
+    if not isinstance(channel, (discord.TextChannel, discord.Thread)):
+        await interaction.followup.send("❌ Giveaways can only be posted in text channels!", ephemeral=True)
+        return
+
+    if not channel.permissions_for(interaction.guild.me).send_messages:
+        await interaction.followup.send(f"❌ I don't have permission to send messages in {channel.mention}.", ephemeral=True)
+        return
+
+    total_seconds = parse_duration(duration)
+    error = (giveaway_options_error(prize, winners, total_seconds, min_account_age, min_server_time, bonus_role, bonus_entries)
+             or pro_options_error(interaction.guild.id, role.id if role else None, min_account_age, min_server_time))
+    if error:
+        await interaction.followup.send(error, ephemeral=True)
+        return
+
+    if not start and not repeat:
+        await interaction.followup.send("❌ Give a start time, a repeat schedule, or both.", ephemeral=True)
+        return
+
+    server_schedules = giveaway_index.server_ids(interaction.guild.id) & giveaway_index.status_ids("scheduled")
+    if len(server_schedules) >= MAX_SCHEDULES_PER_SERVER:
+        await interaction.followup.send(f"❌ This server already has {MAX_SCHEDULES_PER_SERVER} schedules. Remove one with `/unschedule` first.", ephemeral=True)
+        return
+
+    now = datetime.now(timezone.utc)
+    recurrence = None
+    if repeat:
+        try:
+            recurrence = Recurrence(repeat)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}. Examples: `@daily`, `@weekly`, `0 18 * * 5`", ephemeral=True)
+            return
+        gap = shortest_recurrence_gap(recurrence, now.timestamp())
+        if gap is not None and gap < MIN_RECURRENCE_SECONDS:
+            await interaction.followup.send("❌ Recurring giveaways can start at most once per hour.", ephemeral=True)
+            return
+
+    if start:
+        start_time = parse_start_time(start)
+        if start_time is None:
+            await interaction.followup.send("❌ Invalid start time. Examples: `2h`, `1d`, `1767225600`, `2026-01-01 18:00`", ephemeral=True)
+            return
+    else:
+        next_ts = recurrence.next_after(now.timestamp())
+        if next_ts is None:
+            await interaction.followup.send("❌ That repeat schedule never matches a date.", ephemeral=True)
+            return
+        start_time = datetime.fromtimestamp(next_ts, timezone.utc)
+
+    if start_time <= now:
+        await interaction.followup.send("❌ The start time must be in the future.", ephemeral=True)
+        return
+
+    if start_time > now + timedelta(days=MAX_SCHEDULE_AHEAD_DAYS):
+        await interaction.followup.send(f"❌ Giveaways can be scheduled at most {MAX_SCHEDULE_AHEAD_DAYS} days ahead.", ephemeral=True)
+        return
+
+    schedule_id = f"schedule-{interaction.id}"
+    schedule = {
+        **giveaway_settings(
+            interaction, channel, prize, winners, duration, total_seconds,
+            donor, role, min_account_age, min_server_time, bonus_role, bonus_entries
+        ),
+        "participants": ParticipantSet(),
+        "status": "scheduled",
+        "created_at": now.isoformat(),
+        "next_start": start_time.isoformat(),
+        "recurrence": str(recurrence) if recurrence else None,
+        "runs": 0
+    }
+    update_giveaway(schedule_id, schedule, OP_CREATE)
+    expiry_scheduler.schedule((START_EVENT, schedule_id), start_time.timestamp())
+
+    start_ts = int(start_time.timestamp())
+    await interaction.followup.send(
+        f"✅ Giveaway for **{prize}** scheduled in {channel.mention}\n"
+        f"⏰ **First start:** <t:{start_ts}:f> (<t:{start_ts}:R>)\n"
+        f"🔁 **Repeats:** {f'`{recurrence}` (UTC)' if recurrence else 'no'}\n"
+        f"🆔 **Schedule ID:** `{schedule_id}`",
+        ephemeral=True
+    )
+    
+    logging.info(f"Giveaway schedule {schedule_id} created in {interaction.guild.name} - first start {start_time.isoformat()}, repeat {recurrence}")
+
+@tree.command(name="schedules", description="List this server's scheduled giveaways")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def list_schedules(interaction: discord.Interaction):
+    """Show pending and recurring giveaway schedules for the current server."""
+    if interaction.guild is None:
+        await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
+        return
+
+    schedule_ids = giveaway_index.server_ids(interaction.guild.id) & giveaway_index.status_ids("scheduled")
+    if not schedule_ids:
+        await interaction.response.send_message("📭 No giveaways are scheduled in this server.", ephemeral=True)
+        return
+
+    lines = []
+    for schedule_id in sorted(schedule_ids, key=lambda sid: giveaways[sid].get("next_start") or ""):
+        schedule = giveaways[schedule_id]
+        start_ts = int(parse_start_timestamp(schedule) or 0)
+        repeat = f" • 🔁 `{schedule['recurrence']}`" if schedule.get("recurrence") else ""
+        lines.append(
+            f"`{schedule_id}` • 🎁 {schedule['prize']} • <#{schedule['channel_id']}> • "
+            f"⏰ <t:{start_ts}:R>{repeat}"
+        )
+
+    embed = discord.Embed(
+        title="🗓️ Scheduled Giveaways",
+        description="\n".join(lines),
+        color=discord.Color.blue()
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="unschedule", description="Remove a scheduled or recurring giveaway")
+@app_commands.checks.has_permissions(manage_guild=True)
+@app_commands.describe(schedule_id="The schedule ID shown by /schedules")
+async def unschedule_giveaway(interaction: discord.Interaction, schedule_id: str):
+    """Delete a schedule; giveaways it already started keep running."""
+    schedule_id = schedule_id.strip().strip("`")
+    schedule = giveaways.get(schedule_id)
+    if not schedule or schedule.get("status") != "scheduled":
+        await interaction.response.send_message("❌ Schedule not found.", ephemeral=True)
+        return
+
+    # SECURITY: Validate server access
+    if not await validate_server_access(interaction, schedule):
+        await interaction.response.send_message("❌ You can only manage schedules from your current server.", ephemeral=True)
+        return
+
+    remove_giveaway(schedule_id)
+    await interaction.response.send_message(f"✅ Schedule for **{schedule['prize']}** removed.", ephemeral=True)
+    
+    logging.info(f"Giveaway schedule {schedule_id} removed in {interaction.guild.name}")
+
+@tree.command(name="bulkjoin", description="Import participants into a giveaway from a CSV or JSONL file")
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(
+    message_id="The message ID of the giveaway to import participants into",
+    file="CSV (user_id column or first column) or JSONL file of user IDs, optionally .gz compressed",
+    check_eligibility="Only import users who are in this server and meet the giveaway requirements"
+)
+async def bulk_join(interaction: discord.Interaction, message_id: str, file: discord.Attachment, check_eligibility: bool = False):
+    """Bulk-load entrants, e.g. when migrating a giveaway from another bot."""
+    await interaction.response.defer(ephemeral=True)
+
+    if not await validate_message_id(message_id):
+        await interaction.followup.send("❌ Please provide a valid Discord message ID.", ephemeral=True)
+        return
+
+    giveaway_data = giveaways.get(message_id)
+    if not giveaway_data:
+        await interaction.followup.send("❌ Giveaway not found.", ephemeral=True)
+        return
+
+    # SECURITY: Validate server access
+    if not await validate_server_access(interaction, giveaway_data):
+        await interaction.followup.send("❌ You can only manage giveaways from your current server.", ephemeral=True)
+        return
+
+    if giveaway_data.get("status") != "active":
+        await interaction.followup.send(f"❌ This giveaway is already {giveaway_data.get('status', 'inactive')}.", ephemeral=True)
+        return
+
+    try:
+        spool = await spool_attachment(file.url)
+    except aiohttp.ClientError as e:
+        await interaction.followup.send(f"❌ Could not download the file: {e}", ephemeral=True)
+        return
+
+    stats = ImportStats()
+    imported_at = datetime.now(timezone.utc).isoformat()
+    eligible = None
+    if check_eligibility:
+        eligible = lambda user_ids: filter_eligible_members(interaction.guild, giveaway_data, user_ids)
+
+    def commit_chunk(user_ids: List[int]):
+        giveaway_store.append(OP_BULK_JOIN, message_id, users=user_ids, at=imported_at)
+
+    try:
+        with spool, open_text(spool, file.filename) as lines:
+            user_ids = iter_user_ids(lines, detect_format(file.filename), stats)
+            await ingest(giveaway_data["participants"], user_ids, commit_chunk, stats, eligible=eligible)
+    except (OSError, EOFError, UnicodeDecodeError, csv.Error) as e:
+        # Chunks merged before the error are kept and still get persisted below
+        logging.error(f"Bulk import into giveaway {message_id} stopped early: {e}")
+        await interaction.followup.send(f"⚠️ Import stopped early, file could not be read: {e}", ephemeral=True)
+
+    if stats.added:
+        giveaway_data["last_participant_join"] = imported_at
+        # One sync for the whole import; the backup gets a snapshot instead of a huge delta
+        channel_backup.request_snapshot()
+        database_flusher.mark_dirty(message_id)
+        try:
+            await database_flusher.flush_now()
+        except Exception as e:
+            # Still dirty: the background flusher retries it
+            logging.error(f"Could not save bulk import into giveaway {message_id} yet: {e}")
+
+        # The participants are merged and journaled; a failed embed refresh must not fail the command
+        channel = bot.get_channel(giveaway_data["channel_id"])
+        if channel:
+            try:
+                embed_refresher.request(message_id, await channel.fetch_message(int(message_id)))
+            except (discord.NotFound, discord.Forbidden):
+                pass
+            except discord.HTTPException as e:
+                logging.warning(f"Could not refresh the embed of giveaway {message_id} after bulk import: {e}")
+
+    await interaction.followup.send(
+        f"✅ Bulk import finished: {stats.summary()}.\n"
+        f"👥 **Participants:** {len(giveaway_data['participants'])}",
+        ephemeral=True
+    )
+    
+    logging.info(f"📥 Bulk import into giveaway {message_id} in {interaction.guild.name} by {interaction.user}: {stats.summary()}")
+
+@tree.command(name="export", description="Export this server's giveaways, participants and winners")
+@app_commands.checks.has_permissions(manage_guild=True)
+@app_commands.describe(format="File format of the export (gzip compressed)")
+@app_commands.choices(format=[
+    app_commands.Choice(name="CSV", value=FORMAT_CSV),
+    app_commands.Choice(name="JSON Lines", value=FORMAT_JSONL),
+])
+async def export_giveaways(interaction: discord.Interaction, format: str = FORMAT_CSV):
+    """Stream the server's giveaway history as compressed attachments, split to fit upload limits."""
+    await interaction.response.defer(ephemeral=True)
+
+    if interaction.guild is None:
+        await interaction.followup.send("❌ This command can only be used in a server!", ephemeral=True)
+        return
+
+    server_giveaways = {k: v for k, v in get_server_giveaways(interaction.guild.id).items() if v.get("status") != "scheduled"}
+    if not server_giveaways:
+        await interaction.followup.send("📭 This server has no giveaways to export.", ephemeral=True)
+        return
+
+    # Parts are compressed one at a time off the event loop and uploaded as soon as they are ready
+    lines = encode_rows(server_rows(server_giveaways), format)
+    parts = iter_parts(lines, io.BytesIO, header_line(format))
+    basename = f"givzy-export-{interaction.guild.id}"
+    sent = 0
+    try:
+        while True:
+            part = await asyncio.to_thread(next, parts, None)
+            if part is None:
+                break
+            if sent == MAX_EXPORT_PARTS:
+                await interaction.followup.send(
+                    f"⚠️ Export truncated after {MAX_EXPORT_PARTS} files. Use the offline CLI for the full history.",
+                    ephemeral=True
+                )
+                break
+            sent += 1
+            part.seek(0)
+            await interaction.followup.send(
+                f"📦 Export part {sent}" if sent > 1 else f"📦 Giveaway export for **{interaction.guild.name}** ({len(server_giveaways)} giveaways)",
+                file=discord.File(part, filename=part_filename(basename, format, sent)),
+                ephemeral=True
+            )
+    except discord.HTTPException as e:
+        logging.error(f"Export for {interaction.guild.id} failed after {sent} parts: {e}")
+        await interaction.followup.send("❌ Export upload failed, please try again later.", ephemeral=True)
+        return
+    finally:
+        parts.close()
+
+    logging.info(f"📤 Exported {len(server_giveaways)} giveaways from {interaction.guild.name} in {sent} part(s)")
+
 # Enhanced event handlers and background tasks
 
 @bot.event
 async def on_ready():
     """Enhanced startup sequence with proper view restoration."""
-    logging.info(f"🚀 Givzy Bot logged in as {bot.user}")
+    global startup_complete
+    # on_ready fires again after gateway reconnects; reloading then would replace the
+    # live giveaway map that views and queued jobs still hold, losing their writes
+    if startup_complete:
+        logging.info(f"🔌 Givzy Bot reconnected as {bot.user}, keeping the loaded state")
+        return
+    startup_complete = True
+    logging.info(f"🚀 Givzy Bot logged in as {bot.user} ({shard_plan.describe()})")
     
     # Load all data from database
     await load_database()
+    await load_subscriptions(bot, None if STORAGE_BACKEND == BACKEND_CHANNEL else giveaway_store, shard_plan.primary)
     
-    # Sync commands
-    try:
-        synced = await tree.sync()
-        logging.info(f"✅ Synced {len(synced)} slash commands.")
-        
-        # Log command names for verification
-        command_names = [cmd.name for cmd in synced]
-        logging.info(f"📝 Available commands: {', '.join(command_names)}")
-        
-    except Exception as e:
-        logging.error(f"❌ Failed to sync commands: {e}")
+    # Sync commands (global, so the shard 0 process does it for the whole deployment)
+    if shard_plan.primary:
+        try:
+            synced = await tree.sync()
+            logging.info(f"✅ Synced {len(synced)} slash commands.")
+            
+            # Log command names for verification
+            command_names = [cmd.name for cmd in synced]
+            logging.info(f"📝 Available commands: {', '.join(command_names)}")
+            
+        except Exception as e:
+            logging.error(f"❌ Failed to sync commands: {e}")
 
     # Re-attach views for active giveaways - CRITICAL FIX
     active_count = 0
@@ -940,7 +1377,8 @@ async def on_ready():
     
     logging.info("🔧 Re-attaching views for active giveaways...")
     
-    for message_id, data in list(giveaways.items()):
+    for message_id in list(giveaway_index.status_ids("active")):
+        data = giveaways[message_id]
         if data.get("status") == "active":
             try:
                 # Validate that the message ID is valid
@@ -967,7 +1405,7 @@ async def on_ready():
     
     # Log comprehensive startup statistics
     total_giveaways = len(giveaways)
-    total_servers = len(set(g.get("server_id") for g in giveaways.values() if g.get("server_id")))
+    total_servers = giveaway_index.server_count()
     
     logging.info(f"📊 Givzy Bot Statistics:")
     logging.info(f"   🎪 Total Giveaways: {total_giveaways}")
@@ -977,51 +1415,101 @@ async def on_ready():
     # Log active giveaways for verification
     if active_count > 0:
         logging.info("   Active giveaway details:")
-        for msg_id, data in giveaways.items():
-            if data.get("status") == "active":
-                server_name = data.get("server_name", "Unknown")
-                prize = data.get("prize", "Unknown Prize")
-                participants = len(data.get("participants", []))
-                logging.info(f"     - {msg_id}: {prize} in {server_name} ({participants} participants)")
+        for msg_id in giveaway_index.status_ids("active"):
+            data = giveaways[msg_id]
+            server_name = data.get("server_name", "Unknown")
+            prize = data.get("prize", "Unknown Prize")
+            participants = len(data.get("participants", []))
+            logging.info(f"     - {msg_id}: {prize} in {server_name} ({participants} participants)")
     
     # Start background tasks
-    check_giveaways.start()
+    expiry_scheduler.start(check_giveaways)
+    database_flusher.start()
+    join_queue.start()
     database_maintenance.start()
+    if shard_plan.partial and shard_plan.primary:
+        shared_store_backup.start()
     
     logging.info("🎊 Givzy Bot is fully ready!")
 
-@tasks.loop(minutes=1)
-async def check_giveaways():
-    """Enhanced giveaway expiration checker with better error handling."""
+async def check_giveaways(events: List[tuple]):
+    """Hand due timer events (giveaway ends, scheduled starts) to the bounded worker pool."""
+    for event in events:
+        kind, key = event
+        data = giveaways.get(key)
+        if kind == START_EVENT:
+            # Unscheduled while the start was pending
+            if not data or data.get("status") != "scheduled":
+                continue
+            job = start_scheduled_giveaway
+        else:
+            # Ended or cancelled manually while the deadline was pending
+            if not data or data.get("status") != "active":
+                continue
+            job = process_expired_giveaway
+        expiry_pool.submit(
+            event, job, key, data,
+            guild_id=data.get("server_id"), channel_id=data.get("channel_id")
+        )
+
+async def start_scheduled_giveaway(schedule_id: str, schedule: dict):
+    """Post the giveaway for a due schedule, then move the schedule to its next run or retire it."""
+    # Unscheduled (or replaced) while the job waited on the pool's limits
+    if giveaways.get(schedule_id) is not schedule or schedule.get("status") != "scheduled":
+        logging.info(f"Skipping start of schedule {schedule_id}: no longer scheduled")
+        return
     now = datetime.now(timezone.utc)
-    expired_giveaways = []
-    
-    for message_id, data in list(giveaways.items()):
-        if data.get("status") != "active":
-            continue
-            
-        if "end_time" not in data:
-            logging.warning(f"Giveaway {message_id} missing end_time, skipping")
-            continue
-            
+    message_id = None
+    channel = bot.get_channel(schedule["channel_id"])
+    if not channel:
+        logging.warning(f"Channel {schedule['channel_id']} not found for schedule {schedule_id}")
+    elif not channel.permissions_for(channel.guild.me).send_messages:
+        logging.warning(f"Missing permission to post scheduled giveaway {schedule_id} in channel {channel.id}")
+    elif pro_options_error(schedule["server_id"], schedule.get("required_role"),
+                           schedule.get("min_account_age_days"), schedule.get("min_server_days")):
+        # Created while the server had Pro; skip runs until it renews rather than drop the requirements
+        logging.warning(f"Skipping scheduled giveaway {schedule_id}: {schedule.get('server_name')} no longer has Pro for its entry requirements")
+    else:
+        settings = {k: v for k, v in schedule.items() if k not in SCHEDULE_FIELDS}
+        settings["schedule_id"] = schedule_id
+        end_time = now + timedelta(seconds=settings["original_duration_seconds"])
+        draw_nonce = new_draw_nonce()
+        commitment = seed_commitment(derive_draw_seed(DRAW_SECRET, draw_nonce))
+        view = JoinView(message_id="temp_placeholder")
         try:
-            end_time = datetime.fromisoformat(data["end_time"].replace('Z', '+00:00'))
-        except (ValueError, AttributeError) as e:
-            logging.error(f"Invalid end_time format for giveaway {message_id}: {e}")
-            continue
-        
-        # Check if giveaway has expired
-        if now >= end_time:
-            expired_giveaways.append((message_id, data))
+            message = await channel.send(embed=build_giveaway_embed(settings, end_time, commitment), view=view)
+            message_id = register_giveaway(message, view, settings, end_time, draw_nonce)
+            logging.info(f"⏰ Scheduled giveaway {schedule_id} started as {message_id} in {schedule.get('server_name')}")
+        except discord.HTTPException as e:
+            logging.warning(f"Could not post scheduled giveaway {schedule_id}: {e}")
+
+    if schedule_id not in giveaways:
+        # Unscheduled while the message was being posted
+        return
     
-    # Process expired giveaways
-    for message_id, data in expired_giveaways:
-        await process_expired_giveaway(message_id, data)
+    next_ts = None
+    if schedule.get("recurrence"):
+        next_ts = Recurrence(schedule["recurrence"]).next_after(now.timestamp())
+    if next_ts is None:
+        remove_giveaway(schedule_id)
+        return
+    
+    schedule["runs"] = schedule.get("runs", 0) + (1 if message_id else 0)
+    schedule["last_started_at"] = now.isoformat()
+    schedule["last_message_id"] = message_id
+    schedule["next_start"] = datetime.fromtimestamp(next_ts, timezone.utc).isoformat()
+    update_giveaway(schedule_id, schedule, OP_CREATE)
+    expiry_scheduler.schedule((START_EVENT, schedule_id), next_ts)
 
 async def process_expired_giveaway(message_id: str, data: dict):
     """Process a single expired giveaway with comprehensive error handling."""
+    # The job may have waited on the pool's limits; skip it if the giveaway was
+    # ended, cancelled or cleaned up (or replaced) in the meantime
+    if giveaways.get(message_id) is not data or data.get("status") != "active":
+        logging.info(f"Skipping expiry of giveaway {message_id}: no longer active")
+        return
     try:
-        participants = data.get("participants", [])
+        participants = data.get("participants", ParticipantSet())
         
         # Get the channel and verify it exists
         channel = bot.get_channel(data["channel_id"])
@@ -1030,8 +1518,7 @@ async def process_expired_giveaway(message_id: str, data: dict):
             data["status"] = "ended"
             data["ended_at"] = datetime.now(timezone.utc).isoformat()
             data["ended_by"] = "automatic_channel_missing"
-            giveaways[message_id] = data
-            await save_database()
+            update_giveaway(message_id, data, OP_END)
             return
         
         # Try to fetch the original message
@@ -1042,22 +1529,22 @@ async def process_expired_giveaway(message_id: str, data: dict):
             data["status"] = "ended"
             data["ended_at"] = datetime.now(timezone.utc).isoformat()
             data["ended_by"] = "automatic_message_deleted"
-            giveaways[message_id] = data
-            await save_database()
+            update_giveaway(message_id, data, OP_END)
             return
         except discord.Forbidden:
             logging.warning(f"No permission to access message {message_id}")
             data["status"] = "ended"
             data["ended_at"] = datetime.now(timezone.utc).isoformat()
             data["ended_by"] = "automatic_no_permission"
-            giveaways[message_id] = data
-            await save_database()
+            update_giveaway(message_id, data, OP_END)
             return
         
         # Update giveaway status
         data["status"] = "ended"
         data["ended_at"] = datetime.now(timezone.utc).isoformat()
         data["ended_by"] = "automatic"
+        # Stop any participant-count edit before the ended embed goes out
+        embed_refresher.cancel(message_id)
         
         if not participants:
             # No participants case
@@ -1080,29 +1567,13 @@ async def process_expired_giveaway(message_id: str, data: dict):
         else:
             # Pick winners
             winners_count = min(len(participants), data["winners"])
-            winner_ids = random.sample(participants, winners_count)
+            winner_ids = pick_winners(channel.guild, message_id, data, winners_count)
             winner_mentions = [f"<@{uid}>" for uid in winner_ids]
             
             data["winner_ids"] = winner_ids
             
             # Create winner details for better tracking
-            winner_details = []
-            for winner_id in winner_ids:
-                try:
-                    user = await bot.fetch_user(int(winner_id))
-                    winner_details.append({
-                        "id": winner_id,
-                        "name": user.display_name if hasattr(user, 'display_name') else user.name,
-                        "username": str(user)
-                    })
-                except:
-                    winner_details.append({
-                        "id": winner_id,
-                        "name": "Unknown User",
-                        "username": "Unknown#0000"
-                    })
-            
-            data["winner_details"] = winner_details
+            data["winner_details"] = await build_winner_details(channel.guild, winner_ids)
             
             # Update message with results - check permissions first
             if channel.permissions_for(channel.guild.me).manage_messages:
@@ -1111,7 +1582,8 @@ async def process_expired_giveaway(message_id: str, data: dict):
                     description=f"🎁 **Prize:** {data['prize']}\n"
                                f"✨ **Donor:** {data['donor_name']}\n"
                                f"🏆 **{'Winner' if len(winner_mentions) == 1 else 'Winners'}:** {' '.join(winner_mentions)}\n"
-                               f"👥 **Total Participants:** {len(participants)}",
+                               f"👥 **Total Participants:** {len(participants)}\n"
+                               f"🔑 **Draw Seed:** `{data['draw_seed']}`",
                     color=discord.Color.gold(),
                     timestamp=datetime.now(timezone.utc)
                 )
@@ -1139,8 +1611,7 @@ async def process_expired_giveaway(message_id: str, data: dict):
                         logging.error(f"Could not send winner announcement for {message_id}: {e}")
         
         # Save updated data
-        giveaways[message_id] = data
-        await save_database()
+        update_giveaway(message_id, data, OP_END)
         
         server_name = data.get('server_name', 'Unknown Server')
         winner_count = len(winner_ids) if participants else 0
@@ -1154,8 +1625,7 @@ async def process_expired_giveaway(message_id: str, data: dict):
             data["ended_at"] = datetime.now(timezone.utc).isoformat()
             data["ended_by"] = f"automatic_error_{type(e).__name__}"
             data["error"] = str(e)
-            giveaways[message_id] = data
-            await save_database()
+            update_giveaway(message_id, data, OP_END)
         except:
             pass  # Prevent cascade failures
 
@@ -1169,36 +1639,48 @@ async def database_maintenance():
         cleanup_date = datetime.now(timezone.utc) - timedelta(days=90)
         cleaned_count = 0
         
-        for message_id in list(giveaways.keys()):
+        finished_ids = giveaway_index.status_ids("ended") | giveaway_index.status_ids("cancelled")
+        for message_id in finished_ids:
             data = giveaways[message_id]
-            if data.get("status") in ["ended", "cancelled"]:
-                try:
-                    end_date_str = data.get("ended_at") or data.get("cancelled_at")
-                    if end_date_str:
-                        end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-                        if end_date < cleanup_date:
-                            del giveaways[message_id]
-                            cleaned_count += 1
-                except (ValueError, AttributeError):
-                    # Invalid date format, keep the entry
-                    continue
+            try:
+                end_date_str = data.get("ended_at") or data.get("cancelled_at")
+                if end_date_str:
+                    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
+                    if end_date < cleanup_date:
+                        remove_giveaway(message_id)
+                        cleaned_count += 1
+            except (ValueError, AttributeError):
+                # Invalid date format, keep the entry
+                continue
         
-        # Save cleaned database
         if cleaned_count > 0:
-            await save_database()
             logging.info(f"🧹 Maintenance complete: {cleaned_count} old giveaways cleaned")
         else:
             logging.info("✨ Database maintenance complete - no cleanup needed")
+        
+        # Daily compaction of the local store
+        await giveaway_store.compact(giveaways)
             
         # Log current statistics
-        active_count = sum(1 for g in giveaways.values() if g.get("status") == "active")
-        total_servers = len(set(g.get("server_id") for g in giveaways.values() if g.get("server_id")))
+        active_count = giveaway_index.count_status("active")
+        total_servers = giveaway_index.server_count()
         
         logging.info(f"📊 Current stats: {len(giveaways)} giveaways ({active_count} active) across {total_servers} servers")
         
     except Exception as e:
         logging.error(f"❌ Error during database maintenance: {e}")
 
+@tasks.loop(hours=SHARED_BACKUP_INTERVAL_HOURS)
+async def shared_store_backup():
+    """Sharded deployments: snapshot every process's giveaways from the shared store to the database channel."""
+    try:
+        await giveaway_store.sync()
+        snapshot = await asyncio.to_thread(giveaway_store.load)
+        if snapshot:
+            await channel_backup.flush(snapshot, force_snapshot=True)
+    except Exception as e:
+        logging.error(f"Critical error backing up shared giveaway storage: {e}")
+
 @bot.event
 async def on_guild_join(guild):
     """Enhanced guild join handler with analytics."""
@@ -1211,14 +1693,15 @@ async def on_guild_join(guild):
             "I'm ready to help you manage amazing giveaways with complete server isolation!\n\n"
             "**🚀 Quick Start:**\n"
             "• Use `/giveaway` to create your first giveaway\n"
-            "• All features are available for free!\n\n"
-            "**🎁 Features:**\n"
+            "• Use `/subscription` to see this server's plan\n\n"
+            "**🎁 Free Features:**\n"
             "• Basic giveaway creation and management\n"
             "• Winner selection and rerolls\n"
+            "• Server-specific data isolation\n\n"
+            "**💎 Pro Features** (`/buy`, $2/month):\n"
             "• Role requirements for giveaways\n"
             "• Minimum account age restrictions\n"
-            "• Minimum server time requirements\n"
-            "• Server-specific data isolation\n\n"
+            "• Minimum server time requirements\n\n"
             "**🔒 Privacy & Security:**\n"
             "• All giveaway data is server-specific and private\n"
             "• No cross-server data access or sharing\n"
@@ -1253,10 +1736,23 @@ async def on_guild_remove(guild):
     logging.info(f"👋 Left server: {guild.name} ({guild.id})")
     
     # Count how many giveaways were in this server
-    server_giveaways = sum(1 for g in giveaways.values() if g.get("server_id") == guild.id)
+    server_giveaways = len(giveaway_index.server_ids(guild.id))
     if server_giveaways > 0:
         logging.info(f"📊 Had {server_giveaways} giveaways in {guild.name}")
 
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    """Drop cached eligibility verdicts and winner names that depend on the changed member data."""
+    if before.roles != after.roles:
+        eligibility_checker.invalidate_member(after.id)
+    if before.display_name != after.display_name:
+        winner_resolver.invalidate(after.guild.id, after.id)
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    """A member who leaves and rejoins gets a new join date, so their verdicts are stale."""
+    eligibility_checker.invalidate_member(member.id)
+
 @bot.event
 async def on_command_error(ctx, error):
     """Enhanced error handling for commands."""
@@ -1302,6 +1798,5 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 if not DISCORD_TOKEN:
     raise ValueError("DISCORD_TOKEN is not set in the environment.")
 
-# Start keep alive system and run the bot
-keep_alive()
+# Run the bot (the keep alive server starts in setup_hook)
 bot.run(DISCORD_TOKEN)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+import discord
+from typing import Dict, Iterable, Optional, Tuple
+
+# Gateway member queries accept at most 100 user IDs per request
+QUERY_CHUNK_SIZE = 100
+
+UNKNOWN_NAME = "Unknown User"
+UNKNOWN_USERNAME = "Unknown#0000"
+
+class WinnerResolver:
+    """Resolves winner display names without one REST call per winner.
+
+    Lookups go TTL cache -> gateway member cache (``guild.get_member``) -> chunked
+    gateway member queries for the misses -> the bot's user cache. Anything still
+    unresolved is reported as an unknown user rather than fetched individually.
+    """
+
+    def __init__(self, bot, ttl: float = 3600.0, max_entries: int = 50000):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (guild_id, user_id) -> (expires_at, display name, username)
+        self._cache: Dict[Tuple[int, int], Tuple[float, str, str]] = {}
+
+    async def resolve(self, guild: Optional[discord.Guild], user_ids: Iterable) -> Dict[int, Tuple[str, str]]:
+        """Map each user ID to ``(display name, username)``."""
+        now = time.monotonic()
+        guild_id = guild.id if guild else 0
+        resolved: Dict[int, Tuple[str, str]] = {}
+        misses = []
+
+        for raw_id in user_ids:
+            user_id = int(raw_id)
+            cached = self._cache.get((guild_id, user_id))
+            if cached and cached[0] > now:
+                resolved[user_id] = cached[1:]
+                continue
+            member = guild.get_member(user_id) if guild else None
+            if member:
+                resolved[user_id] = self._remember(guild_id, user_id, member)
+            else:
+                misses.append(user_id)
+
+        if misses and guild:
+            for i in range(0, len(misses), QUERY_CHUNK_SIZE):
+                chunk = misses[i:i + QUERY_CHUNK_SIZE]
+                try:
+                    members = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+                except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException) as e:
+                    logging.warning(f"Member query for {len(chunk)} winners in {guild.id} failed: {e}")
+                    continue
+                for member in members:
+                    resolved[member.id] = self._remember(guild_id, member.id, member)
+
+        for user_id in misses:
+            if user_id in resolved:
+                continue
+            # Winners who left the server: fall back to the bot's user cache only
+            user = self.bot.get_user(user_id)
+            if user:
+                resolved[user_id] = self._remember(guild_id, user_id, user)
+            else:
+                resolved[user_id] = (UNKNOWN_NAME, UNKNOWN_USERNAME)
+
+        return resolved
+
+    def invalidate(self, guild_id: int, user_id: int):
+        self._cache.pop((guild_id, user_id), None)
+
+    def _remember(self, guild_id: int, user_id: int, user) -> Tuple[str, str]:
+        names = (getattr(user, "display_name", None) or user.name, str(user))
+        if len(self._cache) >= self.max_entries:
+            self._evict()
+        self._cache[(guild_id, user_id)] = (time.monotonic() + self.ttl, *names)
+        return names
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, v in self._cache.items() if v[0] <= now]:
+            del self._cache[key]
+        # Still full: drop the oldest tenth (dicts keep insertion order)
+        if len(self._cache) >= self.max_entries:
+            for key in list(self._cache)[:max(1, self.max_entries // 10)]:
+                del self._cache[key]
@@ -0,0 +1,62 @@
+from array import array
+from typing import Iterable, Iterator, List, Union
+
+UserId = Union[int, str]
+
+class ParticipantSet:
+    """Insertion-ordered set of Discord user IDs.
+
+    A packed ``array('Q')`` keeps join order (stable serialization, and a sequence
+    ``random.sample`` can draw from) while a set of the same integers answers
+    membership checks in O(1).
+    """
+
+    __slots__ = ("_order", "_members")
+
+    def __init__(self, user_ids: Iterable[UserId] = ()):
+        self._order = array('Q')
+        self._members = set()
+        for user_id in user_ids:
+            self.add(user_id)
+
+    @classmethod
+    def from_json(cls, values) -> "ParticipantSet":
+        """Build from a stored participant list (string or integer IDs)."""
+        if isinstance(values, cls):
+            return values
+        return cls(values or ())
+
+    def add(self, user_id: UserId) -> bool:
+        """Add a user; returns False if they were already present."""
+        uid = int(user_id)
+        if uid in self._members:
+            return False
+        self._members.add(uid)
+        self._order.append(uid)
+        return True
+
+    def __contains__(self, user_id: UserId) -> bool:
+        try:
+            return int(user_id) in self._members
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._order)
+
+    def as_sequence(self) -> array:
+        """Join-ordered IDs as a sequence suitable for ``random.sample``."""
+        return self._order
+
+    def to_json(self) -> List[str]:
+        """Stable, join-ordered list of string IDs (the historical storage format)."""
+        return [str(uid) for uid in self._order]
+
+def json_default(obj):
+    """``json.dumps`` hook that serializes ParticipantSet values."""
+    if isinstance(obj, ParticipantSet):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
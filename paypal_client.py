@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+
+PAYPAL_LIVE_URL = "https://api-m.paypal.com"
+PAYPAL_SANDBOX_URL = "https://api-m.sandbox.paypal.com"
+
+# Tokens are refreshed this long before PayPal says they expire
+TOKEN_REFRESH_MARGIN = 300.0
+# Retried responses: rate limiting and server-side failures
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+class PayPalError(Exception):
+    """A PayPal API call failed for good (after retries, or with a non-retryable status)."""
+
+    def __init__(self, message: str, status: Optional[int] = None, body: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+class PayPalClient:
+    """Async PayPal REST client over one pooled keep-alive ``httpx.AsyncClient``.
+
+    The OAuth access token is cached until ``TOKEN_REFRESH_MARGIN`` seconds before
+    ``expires_in``; concurrent callers that find it stale wait for a single refresh
+    instead of each minting their own. Transport errors, timeouts, 429 and 5xx are
+    retried with exponential backoff (honouring ``Retry-After``), and every attempt
+    of a request carries the same ``PayPal-Request-Id``, so PayPal applies a POST
+    at most once even when an earlier attempt reached it.
+    """
+
+    def __init__(self, client_id: Optional[str], client_secret: Optional[str],
+                 base_url: str = PAYPAL_LIVE_URL, timeout: float = 20.0,
+                 max_retries: int = 3, backoff: float = 0.5,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    def _client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the running event loop
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=5, keepalive_expiry=120.0),
+                headers={"Accept": "application/json", "Accept-Language": "en_US"},
+                transport=self._transport,
+            )
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # --- OAuth -------------------------------------------------------------------
+
+    def _token_valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._token_expires
+
+    async def access_token(self, stale: Optional[str] = None) -> str:
+        """The cached access token, minting a new one when it is missing, expiring or equal to ``stale``."""
+        if self._token_valid() and self._token != stale:
+            return self._token
+        async with self._token_lock:
+            # Whoever held the lock before us may already have refreshed it
+            if self._token_valid() and self._token != stale:
+                return self._token
+            if not self.configured:
+                raise PayPalError("PayPal credentials not configured")
+            response = await self._send(
+                "POST", "/v1/oauth2/token",
+                auth=(self.client_id, self.client_secret),
+                data={"grant_type": "client_credentials"},
+            )
+            payload = response.json()
+            self._token = payload["access_token"]
+            lifetime = float(payload.get("expires_in", 0))
+            self._token_expires = time.monotonic() + max(0.0, lifetime - TOKEN_REFRESH_MARGIN)
+            logging.info(f"🔑 PayPal access token refreshed (valid for {int(lifetime)}s)")
+            return self._token
+
+    # --- requests ----------------------------------------------------------------
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None,
+                      request_id: Optional[str] = None) -> httpx.Response:
+        """Authenticated call; a 401 (token revoked early) is retried once with a fresh token."""
+        headers = {"PayPal-Request-Id": request_id} if request_id else {}
+        token = await self.access_token()
+        for attempt in range(2):
+            headers["Authorization"] = f"Bearer {token}"
+            try:
+                return await self._send(method, path, json=json, headers=headers)
+            except PayPalError as e:
+                if e.status != 401 or attempt:
+                    raise
+                token = await self.access_token(stale=token)
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """One logical request: retried with backoff on transport errors and retryable statuses."""
+        client = self._client()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise PayPalError(f"{method} {path} failed: {type(e).__name__}: {e}") from e
+                logging.warning(f"⚠️ PayPal {method} {path} failed ({type(e).__name__}), retrying")
+            else:
+                if response.is_success:
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise PayPalError(f"{method} {path} returned {response.status_code}",
+                                      response.status_code, response.text)
+                logging.warning(f"⚠️ PayPal {method} {path} returned {response.status_code}, retrying")
+                retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(self._retry_delay(attempt, retry_after))
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    # --- billing -----------------------------------------------------------------
+
+    async def create_subscription(self, payload: dict, request_id: str) -> dict:
+        response = await self.request("POST", "/v1/billing/subscriptions", json=payload, request_id=request_id)
+        return response.json()
+
+    async def get_subscription(self, subscription_id: str) -> dict:
+        response = await self.request("GET", f"/v1/billing/subscriptions/{subscription_id}")
+        return response.json()
+
+    # --- webhooks ----------------------------------------------------------------
+
+    async def fetch(self, url: str) -> bytes:
+        """GET an absolute URL (e.g. a webhook signing certificate) over the pooled connection."""
+        response = await self._send("GET", url)
+        return response.content
+
+    async def verify_webhook_signature(self, verification: dict) -> bool:
+        """Ask PayPal to check a webhook signature (used when certificates cannot be checked locally)."""
+        response = await self.request("POST", "/v1/notifications/verify-webhook-signature", json=verification)
+        return response.json().get("verification_status") == "SUCCESS"
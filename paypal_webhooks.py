@@ -0,0 +1,222 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+from paypal_client import PayPalClient, PayPalError
+
+try:
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:  # Signatures are then checked through PayPal's verify API
+    x509 = None
+
+# Webhook signature headers (aiohttp header lookups are case-insensitive)
+HEADER_TRANSMISSION_ID = "PAYPAL-TRANSMISSION-ID"
+HEADER_TRANSMISSION_TIME = "PAYPAL-TRANSMISSION-TIME"
+HEADER_TRANSMISSION_SIG = "PAYPAL-TRANSMISSION-SIG"
+HEADER_CERT_URL = "PAYPAL-CERT-URL"
+HEADER_AUTH_ALGO = "PAYPAL-AUTH-ALGO"
+SUPPORTED_AUTH_ALGO = "SHA256withRSA"
+
+# Signing certificates are only fetched from PayPal over HTTPS
+CERT_HOST_SUFFIX = ".paypal.com"
+MAX_CACHED_CERTS = 16
+# PayPal redelivers until it gets a 2xx; remember this many recent event IDs to ignore repeats
+MAX_REMEMBERED_EVENTS = 10000
+
+class WebhookVerifier:
+    """Checks ``PAYPAL-TRANSMISSION-SIG`` against the webhook's signing certificate.
+
+    The signed message is ``transmission_id|transmission_time|webhook_id|crc32(body)``.
+    Certificates are downloaded once per URL and cached; without the optional
+    ``cryptography`` package each event is checked by PayPal's verify API instead.
+    Raises PayPalError when PayPal cannot be reached, so the caller can ask for a retry.
+    """
+
+    def __init__(self, client: PayPalClient, webhook_id: Optional[str]):
+        self.client = client
+        self.webhook_id = webhook_id
+        self._certs: "OrderedDict[str, object]" = OrderedDict()
+        self._cert_lock = asyncio.Lock()
+        if webhook_id and x509 is None:
+            logging.warning("⚠️ cryptography is not installed, verifying PayPal webhooks through the API")
+
+    async def verify(self, headers: Mapping[str, str], body: bytes, event: dict) -> bool:
+        if not self.webhook_id:
+            logging.error("PAYPAL_WEBHOOK_ID not configured, rejecting PayPal webhook")
+            return False
+        transmission_id = headers.get(HEADER_TRANSMISSION_ID)
+        transmission_time = headers.get(HEADER_TRANSMISSION_TIME)
+        signature = headers.get(HEADER_TRANSMISSION_SIG)
+        cert_url = headers.get(HEADER_CERT_URL)
+        auth_algo = headers.get(HEADER_AUTH_ALGO)
+        if not all((transmission_id, transmission_time, signature, cert_url, auth_algo)):
+            return False
+
+        if x509 is None:
+            return await self.client.verify_webhook_signature({
+                "auth_algo": auth_algo,
+                "cert_url": cert_url,
+                "transmission_id": transmission_id,
+                "transmission_sig": signature,
+                "transmission_time": transmission_time,
+                "webhook_id": self.webhook_id,
+                "webhook_event": event,
+            })
+
+        if auth_algo != SUPPORTED_AUTH_ALGO:
+            logging.warning(f"Unsupported PayPal webhook signature algorithm {auth_algo!r}")
+            return False
+        certificate = await self._certificate(cert_url)
+        if certificate is None:
+            return False
+        message = f"{transmission_id}|{transmission_time}|{self.webhook_id}|{zlib.crc32(body)}".encode()
+        try:
+            certificate.public_key().verify(base64.b64decode(signature), message, padding.PKCS1v15(), hashes.SHA256())
+        except (InvalidSignature, binascii.Error, ValueError):
+            return False
+        return True
+
+    async def _certificate(self, url: str):
+        parsed = urlparse(url)
+        if parsed.scheme != "https" or not (parsed.hostname or "").endswith(CERT_HOST_SUFFIX):
+            logging.warning(f"Refusing PayPal webhook certificate from {url!r}")
+            return None
+        certificate = self._cached(url)
+        if certificate is not None:
+            return certificate
+        async with self._cert_lock:
+            # A concurrent webhook may have fetched it while we waited
+            certificate = self._cached(url)
+            if certificate is not None:
+                return certificate
+            try:
+                certificate = x509.load_pem_x509_certificate(await self.client.fetch(url))
+            except ValueError as e:
+                logging.error(f"Invalid PayPal webhook certificate at {url}: {e}")
+                return None
+            self._certs[url] = certificate
+            while len(self._certs) > MAX_CACHED_CERTS:
+                self._certs.popitem(last=False)
+            logging.info(f"🔏 Cached PayPal webhook certificate {url}")
+            return certificate
+
+    def _cached(self, url: str):
+        certificate = self._certs.get(url)
+        if certificate is None:
+            return None
+        # not_valid_after_utc needs cryptography 42+
+        expires = getattr(certificate, "not_valid_after_utc", None) or certificate.not_valid_after.replace(tzinfo=timezone.utc)
+        if expires <= datetime.now(timezone.utc):
+            del self._certs[url]
+            return None
+        self._certs.move_to_end(url)
+        return certificate
+
+class WebhookReceiver:
+    """``POST /webhooks/paypal``: verify, drop repeats, queue, and apply events in batches.
+
+    The HTTP handler only verifies the signature and enqueues, answering PayPal
+    right away; a single consumer drains the queue up to ``max_batch`` events at a
+    time into ``apply_batch``, which updates subscriptions and persists them once
+    per batch. A full queue answers 503 so PayPal redelivers later.
+    """
+
+    def __init__(self, verifier: WebhookVerifier, apply_batch: Callable[[List[dict]], Awaitable[None]],
+                 max_batch: int = 100, max_queue: int = 1000):
+        self.verifier = verifier
+        self._apply_batch = apply_batch
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        # Event IDs being verified; an overlapping delivery waits for the outcome (set when done)
+        self._in_flight: Dict[str, asyncio.Event] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return web.Response(status=400, text="invalid JSON")
+        event_id = event.get("id") if isinstance(event, dict) else None
+        if not event_id:
+            return web.Response(status=400, text="missing event id")
+        # An unverified request must not settle the event for the genuine delivery: wait
+        # until the one in flight is accepted (then this is a duplicate) or rejected
+        while event_id in self._in_flight:
+            await self._in_flight[event_id].wait()
+        if event_id in self._seen:
+            return web.Response(text="duplicate")
+
+        claim = self._in_flight[event_id] = asyncio.Event()
+        try:
+            try:
+                verified = await self.verifier.verify(request.headers, body, event)
+            except PayPalError as e:
+                logging.error(f"Could not verify PayPal webhook {event_id}: {e}")
+                return web.Response(status=503, text="verification unavailable")
+            if not verified:
+                logging.warning(f"⚠️ Rejected PayPal webhook {event_id} with an invalid signature")
+                return web.Response(status=401, text="invalid signature")
+
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logging.warning(f"⚠️ PayPal webhook queue full, deferring {event_id}")
+                return web.Response(status=503, text="busy")
+            self._remember(event_id)
+            return web.Response(text="ok")
+        finally:
+            del self._in_flight[event_id]
+            claim.set()
+
+    def _remember(self, event_id: str):
+        self._seen[event_id] = None
+        if len(self._seen) > MAX_REMEMBERED_EVENTS:
+            self._seen.popitem(last=False)
+
+    def start(self):
+        """Start the consumer (no-op if already running)."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the consumer and apply every event still queued."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            await self._apply(self._take_batch([]))
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            await self._apply(self._take_batch([first]))
+
+    def _take_batch(self, batch: List[dict]) -> List[dict]:
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _apply(self, batch: List[dict]):
+        try:
+            await self._apply_batch(batch)
+        except Exception as e:
+            logging.error(f"Error applying {len(batch)} PayPal webhook events: {e}")
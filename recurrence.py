@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from typing import FrozenSet, Optional
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+# How far ahead next_after looks before deciding an expression never matches (e.g. 31 2 *)
+MAX_SEARCH_DAYS = 5 * 366
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"invalid step in {field!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"{field!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+class Recurrence:
+    """A five-field cron expression (minute hour day-of-month month day-of-week), in UTC.
+
+    Supports ``*``, lists, ranges, ``*/n`` steps and the ``@hourly``, ``@daily``,
+    ``@weekly`` and ``@monthly`` shorthands. As in cron, when both day fields are
+    restricted a day matching either one qualifies. Sunday is 0 (or 7).
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError("expected 5 fields: minute hour day-of-month month day-of-week")
+        try:
+            self.minutes = _parse_field(fields[0], 0, 59)
+            self.hours = _parse_field(fields[1], 0, 23)
+            self.days = _parse_field(fields[2], 1, 31)
+            self.months = _parse_field(fields[3], 1, 12)
+            weekdays = _parse_field(fields[4], 0, 7)
+        except ValueError as e:
+            raise ValueError(f"invalid cron expression {expression!r}: {e}") from None
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+        self._sorted_hours = sorted(self.hours)
+        self._sorted_minutes = sorted(self.minutes)
+
+    def __str__(self) -> str:
+        return self.expression
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return (self._any_day or dom) and (self._any_weekday or dow)
+        return dom or dow
+
+    def next_after(self, timestamp: float) -> Optional[float]:
+        """First matching minute strictly after ``timestamp``, or None if there is none."""
+        start = datetime.fromtimestamp(timestamp, timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(MAX_SEARCH_DAYS):
+            if self._day_matches(day):
+                for hour in self._sorted_hours:
+                    for minute in self._sorted_minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate.timestamp()
+            day += timedelta(days=1)
+        return None
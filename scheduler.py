@@ -0,0 +1,107 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Upper bound on a single sleep so wall-clock adjustments never stall the scheduler for long
+MAX_SLEEP_SECONDS = 300
+
+class ExpiryScheduler:
+    """Min-heap of deadlines that sleeps until the next one is due.
+
+    Entries are keyed (main.py uses ``(event, ID)`` pairs for giveaway starts and
+    ends) so they can be rescheduled or cancelled; stale heap entries are skipped
+    lazily when popped. Every key due at the same moment is handed to the callback
+    in one batch.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Add or move a deadline (UNIX timestamp) for ``key``."""
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if self._heap[0] == (deadline, key):
+            self._wakeup.set()
+        self._maybe_compact()
+
+    def cancel(self, key: Hashable):
+        """Forget ``key``; its heap entry is discarded when it surfaces."""
+        self._deadlines.pop(key, None)
+
+    def rebuild(self, entries: Iterable[Tuple[Hashable, float]]):
+        """Replace every deadline at once (used after loading the database)."""
+        self._deadlines = dict(entries)
+        self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest live deadline, or None when nothing is scheduled."""
+        while self._heap:
+            deadline, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """Remove and return every key whose deadline is at or before ``now``."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    def start(self, callback: Callable[[List[Hashable]], Awaitable[None]]):
+        """Run the scheduler loop on the current event loop (no-op if already running)."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(callback))
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, callback: Callable[[List[Hashable]], Awaitable[None]]):
+        while True:
+            due = self.pop_due(time.time())
+            if due:
+                try:
+                    await callback(due)
+                except Exception as e:
+                    logging.error(f"Error handling {len(due)} scheduled deadlines: {e}")
+                continue
+
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            timeout = MAX_SLEEP_SECONDS
+            if deadline is not None:
+                timeout = min(max(0.0, deadline - time.time()), MAX_SLEEP_SECONDS)
+            # asyncio.timeout rather than wait_for: wait_for can swallow a cancel that
+            # arrives together with a wakeup, leaving stop() with a task that never ends
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+    def _maybe_compact(self):
+        # Rescheduling leaves stale entries behind; rebuild once they dominate the heap
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
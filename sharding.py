@@ -0,0 +1,75 @@
+import os
+from typing import Iterable, Optional, Tuple
+
+# Discord routes every guild to shard (guild_id >> 22) % shard_count
+SNOWFLAKE_SHARD_SHIFT = 22
+
+def _parse_shard_ids(value: str) -> Tuple[int, ...]:
+    """``"0,1,4-7"`` -> (0, 1, 4, 5, 6, 7)"""
+    shard_ids = set()
+    for part in value.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.update(range(int(start), int(end) + 1))
+        else:
+            shard_ids.add(int(part))
+    return tuple(sorted(shard_ids))
+
+class ShardPlan:
+    """Which Discord shards this process runs, and therefore which guilds' giveaways it owns.
+
+    Every process runs the shards in ``shard_ids`` out of ``shard_count`` and owns the
+    giveaways of exactly the guilds routed to them: only it schedules their timers,
+    receives their join clicks and writes their records to the shared store. Without
+    ``shard_ids`` one process runs every shard (discord.py picks the count when
+    ``shard_count`` is None too) and owns everything.
+    """
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[Iterable[int]] = None):
+        shard_ids = tuple(sorted(set(shard_ids))) if shard_ids else None
+        if shard_count is not None and shard_count < 1:
+            raise ValueError("SHARD_COUNT must be at least 1")
+        if shard_ids is not None:
+            if shard_count is None:
+                raise ValueError("SHARD_IDS requires SHARD_COUNT")
+            if shard_ids[0] < 0 or shard_ids[-1] >= shard_count:
+                raise ValueError(f"SHARD_IDS must be between 0 and {shard_count - 1}")
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self._owned = frozenset(shard_ids or ())
+
+    @classmethod
+    def from_env(cls) -> "ShardPlan":
+        """Read ``SHARD_COUNT`` and ``SHARD_IDS`` (comma-separated IDs or ranges, e.g. ``0-3``)."""
+        count = os.getenv("SHARD_COUNT", "").strip()
+        shard_ids = os.getenv("SHARD_IDS", "").strip()
+        return cls(int(count) if count else None, _parse_shard_ids(shard_ids) if shard_ids else None)
+
+    @property
+    def partial(self) -> bool:
+        """True when other processes run the remaining shards."""
+        return self.shard_ids is not None and len(self.shard_ids) < self.shard_count
+
+    @property
+    def primary(self) -> bool:
+        """The process running shard 0 also runs the once-per-deployment jobs
+        (command sync, channel backups, seeding an empty shared store)."""
+        return not self.partial or 0 in self._owned
+
+    def shard_for(self, guild_id) -> int:
+        return (int(guild_id) >> SNOWFLAKE_SHARD_SHIFT) % self.shard_count
+
+    def owns(self, guild_id) -> bool:
+        """Whether this process owns a guild; records without a guild belong to shard 0."""
+        if not self.partial:
+            return True
+        return self.shard_for(guild_id or 0) in self._owned
+
+    def describe(self) -> str:
+        if self.shard_count is None:
+            return "automatic shard count, all shards in this process"
+        if not self.partial:
+            return f"all {self.shard_count} shard(s) in this process"
+        return f"shards {', '.join(map(str, self.shard_ids))} of {self.shard_count}"
@@ -0,0 +1,632 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from participants import ParticipantSet, json_default
+
+# Journal record types
+OP_CREATE = "create"
+OP_JOIN = "join"
+OP_BULK_JOIN = "bulk_join"
+OP_END = "end"
+OP_CANCEL = "cancel"
+OP_REROLL = "reroll"
+OP_CLEANUP = "cleanup"
+
+SNAPSHOT_VERSION = "2.2-givzy"
+
+# Selectable persistence backends
+BACKEND_JOURNAL = "journal"
+BACKEND_SQLITE = "sqlite"
+BACKEND_CHANNEL = "channel"
+
+# Seconds a SQLite write waits for another process's transaction before failing
+SQLITE_BUSY_TIMEOUT = 30.0
+
+_SNAPSHOT_RE = re.compile(r"^snapshot\.(\d+)\.json$")
+_JOURNAL_RE = re.compile(r"^journal\.(\d+)\.jsonl$")
+SUBSCRIPTIONS_FILENAME = "subscriptions.jsonl"
+
+def giveaway_fields(data: dict) -> dict:
+    """A giveaway's scalar fields, i.e. everything except the participant list."""
+    return {k: v for k, v in data.items() if k != "participants"}
+
+def apply_record(giveaways: Dict[str, dict], record: dict):
+    """Replay a single journal record onto a giveaway map."""
+    op = record.get("op")
+    message_id = record.get("id")
+
+    if op == OP_CREATE:
+        data = dict(record.get("data", {}))
+        data["participants"] = ParticipantSet.from_json(data.get("participants"))
+        giveaways[message_id] = data
+    elif op == OP_JOIN:
+        data = giveaways.get(message_id)
+        if data is not None:
+            data.setdefault("participants", ParticipantSet()).add(record["user"])
+            data["last_participant_join"] = record.get("at")
+    elif op == OP_BULK_JOIN:
+        data = giveaways.get(message_id)
+        if data is not None:
+            participants = data.setdefault("participants", ParticipantSet())
+            for user_id in record.get("users", ()):
+                participants.add(user_id)
+            data["last_participant_join"] = record.get("at")
+    elif op in (OP_END, OP_CANCEL, OP_REROLL):
+        data = giveaways.get(message_id)
+        if data is not None:
+            data.update(record.get("data", {}))
+    elif op == OP_CLEANUP:
+        giveaways.pop(message_id, None)
+    else:
+        logging.warning(f"Unknown journal record type {op!r} for giveaway {message_id}, skipping")
+
+class GiveawayStore(ABC):
+    """Persistence backend interface for giveaway state.
+
+    Mutations arrive as journal-style records through ``append`` (see ``apply_record``
+    for their meaning) and become durable on ``sync``. The in-memory giveaway map in
+    main.py stays the working set; the store is the system of record and answers the
+    targeted queries used by maintenance, export and the offline CLI.
+    """
+
+    @abstractmethod
+    def load(self) -> Optional[Dict[str, dict]]:
+        """Full giveaway map, or None when the store holds no data yet."""
+
+    @abstractmethod
+    def append(self, op: str, message_id: str, **fields):
+        """Record one mutation (buffered until ``sync``)."""
+
+    async def sync(self):
+        pass
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    async def compact(self, giveaways: Dict[str, dict]):
+        """Periodic housekeeping; may checkpoint the full state."""
+
+    async def import_all(self, giveaways: Dict[str, dict]):
+        """Replace the stored state with ``giveaways`` (seeding / migration)."""
+        await self.compact(giveaways)
+
+    def close(self):
+        pass
+
+    # --- targeted queries (defaults fall back to a full load) --------------------
+
+    def server_giveaways(self, server_id: int) -> Dict[str, dict]:
+        giveaways = self.load() or {}
+        return {k: v for k, v in giveaways.items() if v.get("server_id") == server_id}
+
+    def participants(self, message_id: str) -> Iterator[int]:
+        data = (self.load() or {}).get(message_id) or {}
+        return iter(data.get("participants", ()))
+
+    def finished_before(self, cutoff: str) -> List[str]:
+        """IDs of ended/cancelled giveaways that finished before an ISO timestamp."""
+        result = []
+        for message_id, data in (self.load() or {}).items():
+            finished_at = _finished_at(data)
+            if finished_at and finished_at < cutoff:
+                result.append(message_id)
+        return result
+
+    # --- subscriptions -----------------------------------------------------------
+
+    def load_subscriptions(self) -> Optional[Dict[str, dict]]:
+        """Every stored subscription record by server ID, or None when none are stored locally."""
+        return None
+
+    def save_subscriptions(self, records: Dict[str, dict]):
+        """Durably upsert the given (changed) subscription records."""
+
+    def load_subscription_records(self, server_ids: List[str]) -> Dict[str, dict]:
+        """The stored records of the given servers (those that have one)."""
+        records = self.load_subscriptions() or {}
+        return {server_id: records[server_id] for server_id in server_ids if server_id in records}
+
+def _subscription_line(server_id: str, record: dict) -> str:
+    return json.dumps({"id": server_id, "data": record}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+def _finished_at(data: dict) -> Optional[str]:
+    if data.get("status") not in ("ended", "cancelled"):
+        return None
+    return data.get("ended_at") or data.get("cancelled_at")
+
+class ChannelDumpStore(GiveawayStore):
+    """Legacy backend: nothing local, state lives only in the database channel backup."""
+
+    def load(self) -> Optional[Dict[str, dict]]:
+        return None
+
+    def append(self, op: str, message_id: str, **fields):
+        pass
+
+class GiveawayJournal(GiveawayStore):
+    """Append-only mutation journal plus periodic compacted snapshots on local disk.
+
+    Files are grouped in generations: ``snapshot.N.json`` holds the full state at the
+    moment generation N started and ``journal.N.jsonl`` holds every mutation since.
+    Appends are buffered and made durable together by ``sync`` (group fsync), so the
+    cost of persisting a change scales with the change rather than the database.
+    """
+
+    def __init__(self, directory: str, compact_after: int = 5000):
+        self.directory = directory
+        self.compact_after = compact_after
+        self.generation = 0
+        self.records_since_snapshot = 0
+        self._file = None
+        self._unsynced = 0
+        self._subscription_lines = 0
+
+    # --- loading -----------------------------------------------------------------
+
+    def load(self) -> Optional[Dict[str, dict]]:
+        """Rebuild state from the newest snapshot plus the journals that follow it.
+
+        Returns None when the directory holds no data yet (first start on this disk).
+        """
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        snapshots = self._generations(_SNAPSHOT_RE)
+        journals = self._generations(_JOURNAL_RE)
+        if not snapshots and not journals:
+            return None
+
+        giveaways: Dict[str, dict] = {}
+        base_generation = 0
+        for generation in reversed(snapshots):
+            try:
+                giveaways = self._read_snapshot(generation)
+                base_generation = generation
+                break
+            except (OSError, ValueError) as e:
+                logging.warning(f"Snapshot {generation} unreadable, trying an older one: {e}")
+
+        replayed = 0
+        for generation in journals:
+            if generation >= base_generation:
+                replayed += self._replay_journal(generation, giveaways)
+
+        self.generation = max(journals + snapshots)
+        self.records_since_snapshot = replayed
+        logging.info(f"✅ Loaded {len(giveaways)} giveaways from local storage "
+                     f"(snapshot {base_generation} + {replayed} journal records)")
+        return giveaways
+
+    def _read_snapshot(self, generation: int) -> Dict[str, dict]:
+        with open(self._path("snapshot", generation), encoding="utf-8") as f:
+            data = json.load(f)
+        giveaways = data.get("giveaways", {})
+        for entry in giveaways.values():
+            entry["participants"] = ParticipantSet.from_json(entry.get("participants"))
+        return giveaways
+
+    def _replay_journal(self, generation: int, giveaways: Dict[str, dict]) -> int:
+        count = 0
+        with open(self._path("journal", generation), encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write after a crash; everything before it is intact
+                    logging.warning(f"Skipping corrupt journal record {generation}:{line_number}")
+                    continue
+                apply_record(giveaways, record)
+                count += 1
+        return count
+
+    # --- writing -----------------------------------------------------------------
+
+    def append(self, op: str, message_id: str, **fields):
+        """Buffer a mutation record; it becomes durable on the next ``sync``."""
+        record = {"op": op, "id": message_id, **fields}
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        self._open_journal().write(line + "\n")
+        self._unsynced += 1
+        self.records_since_snapshot += 1
+
+    async def sync(self):
+        """Flush buffered records and fsync them as one group."""
+        if not self._file or not self._unsynced:
+            return
+        self._file.flush()
+        await asyncio.to_thread(os.fsync, self._file.fileno())
+        # Only once durable: after a failure the next sync tries again
+        self._unsynced = 0
+
+    def needs_compaction(self) -> bool:
+        return self.records_since_snapshot >= self.compact_after
+
+    async def compact(self, giveaways: Dict[str, dict]):
+        """Write a snapshot of ``giveaways`` and start a fresh journal generation."""
+        await self.sync()
+        # Switch journals and serialize in the same step so no record falls between them
+        self.close()
+        self.generation += 1
+        generation = self.generation
+        self.records_since_snapshot = 0
+        self._open_journal()
+        content = json.dumps({
+            "giveaways": giveaways,
+            "metadata": {
+                "version": SNAPSHOT_VERSION,
+                "generation": generation,
+                "saved_at": datetime.now(timezone.utc).isoformat(),
+                "total_giveaways": len(giveaways),
+            },
+        }, ensure_ascii=False, separators=(",", ":"), default=json_default)
+
+        await asyncio.to_thread(self._write_snapshot, generation, content)
+        logging.info(f"🗜️ Compacted {len(giveaways)} giveaways into snapshot {generation}")
+
+    def _write_snapshot(self, generation: int, content: str):
+        path = self._path("snapshot", generation)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._fsync_directory()
+
+        # Older generations are fully covered by the new snapshot
+        for pattern, kind in ((_SNAPSHOT_RE, "snapshot"), (_JOURNAL_RE, "journal")):
+            for old in self._generations(pattern):
+                if old < generation:
+                    try:
+                        os.remove(self._path(kind, old))
+                    except OSError as e:
+                        logging.warning(f"Could not remove old {kind} {old}: {e}")
+
+    def close(self):
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._unsynced = 0
+
+    # --- subscriptions -----------------------------------------------------------
+    #
+    # One upsert line per changed record in subscriptions.jsonl (the last line for a
+    # server wins), rewritten compactly on load once superseded lines dominate.
+
+    def load_subscriptions(self) -> Optional[Dict[str, dict]]:
+        path = os.path.join(self.directory, SUBSCRIPTIONS_FILENAME)
+        records: Dict[str, dict] = {}
+        lines = 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logging.warning("Skipping corrupt subscription record")
+                        continue
+                    records[entry["id"]] = entry["data"]
+                    lines += 1
+        except FileNotFoundError:
+            return None
+        self._subscription_lines = lines
+        if lines > 2 * len(records) + 100:
+            self._rewrite_subscriptions(records)
+        return records
+
+    def save_subscriptions(self, records: Dict[str, dict]):
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, SUBSCRIPTIONS_FILENAME), "a", encoding="utf-8") as f:
+            for server_id, record in records.items():
+                f.write(_subscription_line(server_id, record))
+            f.flush()
+            os.fsync(f.fileno())
+        self._subscription_lines += len(records)
+
+    def _rewrite_subscriptions(self, records: Dict[str, dict]):
+        path = os.path.join(self.directory, SUBSCRIPTIONS_FILENAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for server_id, record in records.items():
+                f.write(_subscription_line(server_id, record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._fsync_directory()
+        logging.info(f"🗜️ Compacted {self._subscription_lines} subscription records into {len(records)}")
+        self._subscription_lines = len(records)
+
+    # --- helpers -----------------------------------------------------------------
+
+    def _open_journal(self):
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = open(self._path("journal", self.generation), "a", encoding="utf-8")
+        return self._file
+
+    def _path(self, kind: str, generation: int) -> str:
+        extension = "jsonl" if kind == "journal" else "json"
+        return os.path.join(self.directory, f"{kind}.{generation}.{extension}")
+
+    def _generations(self, pattern) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(pattern.match, names) if m)
+
+    def _fsync_directory(self):
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+class SQLiteGiveawayStore(GiveawayStore):
+    """SQLite (WAL mode) backend with indexed giveaway, participant, winner and subscription tables.
+
+    Records are buffered in memory and written in one transaction per ``sync``, so a
+    burst of joins becomes a single bulk insert.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS giveaways (
+            message_id TEXT PRIMARY KEY,
+            server_id INTEGER,
+            status TEXT,
+            end_time TEXT,
+            finished_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_giveaways_server ON giveaways (server_id);
+        CREATE INDEX IF NOT EXISTS idx_giveaways_status_end ON giveaways (status, end_time);
+        CREATE INDEX IF NOT EXISTS idx_giveaways_finished ON giveaways (finished_at);
+
+        CREATE TABLE IF NOT EXISTS participants (
+            message_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            UNIQUE (message_id, user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS winners (
+            message_id TEXT NOT NULL,
+            round INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (message_id, round, position)
+        );
+
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            server_id TEXT PRIMARY KEY,
+            tier TEXT,
+            status TEXT,
+            expires_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_subscriptions_expiry ON subscriptions (expires_at);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending: List[dict] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shard processes sharing the database take turns holding the write lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    # --- loading -----------------------------------------------------------------
+
+    def load(self) -> Optional[Dict[str, dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT message_id, data FROM giveaways").fetchall()
+            if not rows:
+                return None
+            giveaways = {}
+            for message_id, data in rows:
+                entry = json.loads(data)
+                entry["participants"] = ParticipantSet()
+                giveaways[message_id] = entry
+            # rowid order is join order
+            for message_id, user_id in self._conn.execute(
+                "SELECT message_id, user_id FROM participants ORDER BY rowid"
+            ):
+                entry = giveaways.get(message_id)
+                if entry is not None:
+                    entry["participants"].add(user_id)
+        logging.info(f"✅ Loaded {len(giveaways)} giveaways from SQLite ({self.path})")
+        return giveaways
+
+    # --- writing -----------------------------------------------------------------
+
+    def append(self, op: str, message_id: str, **fields):
+        self._pending.append({"op": op, "id": message_id, **fields})
+
+    async def sync(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except BaseException:
+            # The transaction rolled back; put the records back (ahead of newer ones) for the retry
+            self._pending[:0] = batch
+            raise
+
+    def _write_batch(self, batch: List[dict]):
+        joins: List[Tuple[str, int]] = []
+        with self._lock, self._conn:
+            for record in batch:
+                op = record["op"]
+                message_id = record["id"]
+                if op == OP_JOIN:
+                    joins.append((message_id, int(record["user"])))
+                    continue
+                if op == OP_BULK_JOIN:
+                    joins.extend((message_id, int(uid)) for uid in record.get("users", ()))
+                    continue
+                # Flush joins first so ordering relative to other records is preserved
+                if joins:
+                    self._insert_participants(joins)
+                    joins = []
+                if op == OP_CLEANUP:
+                    for table in ("participants", "winners", "giveaways"):
+                        self._conn.execute(f"DELETE FROM {table} WHERE message_id = ?", (message_id,))
+                elif op == OP_CREATE:
+                    self._upsert_giveaway(message_id, record.get("data", {}))
+                else:
+                    self._merge_giveaway(message_id, record.get("data", {}))
+            if joins:
+                self._insert_participants(joins)
+
+    def _insert_participants(self, joins: List[Tuple[str, int]]):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO participants (message_id, user_id) VALUES (?, ?)", joins
+        )
+
+    def _merge_giveaway(self, message_id: str, fields: dict):
+        row = self._conn.execute(
+            "SELECT data FROM giveaways WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if row is None:
+            return
+        data = json.loads(row[0])
+        data.update(fields)
+        self._upsert_giveaway(message_id, data)
+
+    def _upsert_giveaway(self, message_id: str, data: dict):
+        fields = giveaway_fields(data)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO giveaways (message_id, server_id, status, end_time, finished_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (message_id, fields.get("server_id"), fields.get("status"), fields.get("end_time"),
+             _finished_at(fields), json.dumps(fields, ensure_ascii=False, default=json_default)),
+        )
+        winner_ids = fields.get("winner_ids")
+        if winner_ids:
+            round_number = fields.get("reroll_count", 0)
+            self._conn.execute(
+                "DELETE FROM winners WHERE message_id = ? AND round = ?", (message_id, round_number)
+            )
+            self._conn.executemany(
+                "INSERT INTO winners (message_id, round, position, user_id) VALUES (?, ?, ?, ?)",
+                [(message_id, round_number, i, int(uid)) for i, uid in enumerate(winner_ids)],
+            )
+
+    async def compact(self, giveaways: Dict[str, dict]):
+        """Fold the WAL back into the main database file."""
+        await self.sync()
+        await asyncio.to_thread(self._checkpoint)
+
+    def _checkpoint(self):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def import_all(self, giveaways: Dict[str, dict]):
+        self._pending = []
+        await asyncio.to_thread(self._replace_all, giveaways)
+
+    def _replace_all(self, giveaways: Dict[str, dict]):
+        with self._lock, self._conn:
+            for table in ("participants", "winners", "giveaways"):
+                self._conn.execute(f"DELETE FROM {table}")
+            for message_id, data in giveaways.items():
+                self._upsert_giveaway(message_id, data)
+                self._insert_participants(
+                    [(message_id, int(uid)) for uid in data.get("participants", ())]
+                )
+        logging.info(f"🗜️ Imported {len(giveaways)} giveaways into SQLite")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- targeted queries --------------------------------------------------------
+
+    def server_giveaways(self, server_id: int) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id, data FROM giveaways WHERE server_id = ?", (server_id,)
+            ).fetchall()
+        return {message_id: json.loads(data) for message_id, data in rows}
+
+    def participants(self, message_id: str) -> Iterator[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id FROM participants WHERE message_id = ? ORDER BY rowid", (message_id,)
+            ).fetchall()
+        return (user_id for (user_id,) in rows)
+
+    def finished_before(self, cutoff: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id FROM giveaways WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (cutoff,),
+            ).fetchall()
+        return [message_id for (message_id,) in rows]
+
+    # --- subscriptions -----------------------------------------------------------
+
+    def load_subscriptions(self) -> Optional[Dict[str, dict]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT server_id, data FROM subscriptions").fetchall()
+        if not rows:
+            return None
+        return {server_id: json.loads(data) for server_id, data in rows}
+
+    def load_subscription_records(self, server_ids: List[str]) -> Dict[str, dict]:
+        records: Dict[str, dict] = {}
+        with self._lock:
+            for start in range(0, len(server_ids), 500):
+                chunk = server_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT server_id, data FROM subscriptions WHERE server_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                records.update((server_id, json.loads(data)) for server_id, data in rows)
+        return records
+
+    def save_subscriptions(self, records: Dict[str, dict]):
+        """Upsert the given subscription records in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subscriptions (server_id, tier, status, expires_at, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(server_id, r.get("tier"), r.get("status"), r.get("expires_at"),
+                  json.dumps(r, ensure_ascii=False)) for server_id, r in records.items()],
+            )
+
+def create_store(backend: str, data_dir: str) -> GiveawayStore:
+    """Build the persistence backend selected by name."""
+    if backend == BACKEND_SQLITE:
+        return SQLiteGiveawayStore(os.path.join(data_dir, "givzy.sqlite3"))
+    if backend == BACKEND_CHANNEL:
+        return ChannelDumpStore()
+    if backend != BACKEND_JOURNAL:
+        logging.warning(f"Unknown storage backend {backend!r}, using {BACKEND_JOURNAL!r}")
+    return GiveawayJournal(os.path.join(data_dir, "giveaways"))
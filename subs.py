@@ -1,15 +1,20 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import copy
 import json
 import os
+import io
+import gzip
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Tuple
-import requests
-import base64
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 import secrets
 import asyncio
+import time
+from paypal_client import PayPalClient, PayPalError
+from scheduler import ExpiryScheduler
+from subscription_index import SubscriptionIndex
 
 # PayPal API configuration
 PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID")
@@ -17,44 +22,128 @@ PAYPAL_CLIENT_SECRET = os.getenv("PAYPAL_CLIENT_SECRET")
 PAYPAL_PLAN_ID = os.getenv("PAYPAL_PLAN_ID")  # ADD THIS TO YOUR ENVIRONMENT VARIABLES
 PAYPAL_BASE_URL = "https://api-m.paypal.com"  # Use https://api-m.paypal.com for production
 
+# Shared PayPal connection pool and token cache
+paypal = PayPalClient(PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET, PAYPAL_BASE_URL)
+
 # Subscription database channel ID
 SUBSCRIPTION_DB_CHANNEL_ID = 1406622696326041641
 
+# Reconciliation against PayPal: records expiring within the window ahead (or that expired
+# within the lookback, in case their webhooks were missed) and records stuck in one of the
+# statuses below are re-checked every interval, at most this many PayPal calls at a time
+RECONCILE_INTERVAL = 3600
+RECONCILE_WINDOW = timedelta(days=3)
+RECONCILE_LOOKBACK = timedelta(days=7)
+RECONCILE_STATUSES = ("pending", "payment_failed")
+RECONCILE_FINAL_STATUSES = ("expired", "abandoned")
+RECONCILE_CONCURRENCY = 8
+# Access granted past PayPal's next billing time, so a renewal charge has time to land
+RENEWAL_GRACE = timedelta(days=1)
+# Checkouts still unapproved after this long are marked abandoned and no longer re-checked
+PENDING_ABANDON_AFTER = timedelta(days=3)
+# Shard processes other than shard 0 get no webhooks; they re-read the shared store this often (seconds)
+SUBSCRIPTION_REFRESH_INTERVAL = 300
+
 # Global subscription data
 subscriptions = {}
+# Local persistence (a storage.GiveawayStore) and the records changed since the last save
+subscription_store = None
+_dirty_subscriptions: Set[str] = set()
+# One save at a time: appends from overlapping saves could land out of order, and the last line wins
+_subscription_save_lock = asyncio.Lock()
+# Whether the channel backup is behind the in-memory records
+_backup_pending = False
+SUBSCRIPTION_BACKUP_FILENAME = "givzy-subscriptions.json.gz"
 
 class SubscriptionTier:
     FREE = "free"
     PRO = "pro"
 
-def get_paypal_access_token():
-    """Get PayPal access token for API calls."""
+# Live tier per server (int ID), holding only servers whose Pro access is current; everyone
+# else is free. Rebuilt on load, refreshed whenever a record changes (webhook, /buy) and
+# flipped by subscription_expiry at the exact expiry instant, so lookups are one dict read
+server_tiers: Dict[int, str] = {}
+subscription_expiry = ExpiryScheduler()
+# Expiry-ordered / status index over every record, for the reconciliation job
+subscription_index = SubscriptionIndex()
+_subscription_task: Optional[asyncio.Task] = None
+
+def set_subscription_expiry(record: dict, expires: datetime):
+    """Store the expiry both for display (ISO) and pre-parsed for tier checks (epoch seconds)."""
+    record["expires_at"] = expires.isoformat()
+    record["expires_ts"] = expires.timestamp()
+
+def subscription_expiry_ts(record: dict) -> Optional[float]:
+    """Epoch expiry of a record; records saved before ``expires_ts`` existed are parsed once and upgraded."""
+    expires_ts = record.get("expires_ts")
+    if expires_ts is None and record.get("expires_at"):
+        try:
+            expires_ts = datetime.fromisoformat(record["expires_at"].replace('Z', '+00:00')).timestamp()
+        except (ValueError, AttributeError):
+            return None
+        record["expires_ts"] = expires_ts
+    return expires_ts
+
+def _live_pro_expiry(record: Optional[dict], now: float) -> Optional[float]:
+    if not record or record.get("tier") != SubscriptionTier.PRO:
+        return None
+    expires_ts = subscription_expiry_ts(record)
+    return expires_ts if expires_ts and expires_ts > now else None
+
+def refresh_server_tier(server_id):
+    """Recompute one server's cached tier and index entry from its record (call after every record change)."""
+    key = int(server_id)
+    record = subscriptions.get(str(server_id))
+    if record is None:
+        subscription_index.remove(str(server_id))
+    else:
+        subscription_index.update(str(server_id), subscription_expiry_ts(record), record.get("status"))
+    expires_ts = _live_pro_expiry(record, time.time())
+    if expires_ts is None:
+        server_tiers.pop(key, None)
+        subscription_expiry.cancel(key)
+    else:
+        server_tiers[key] = SubscriptionTier.PRO
+        subscription_expiry.schedule(key, expires_ts)
+
+def rebuild_tier_cache():
+    """Rebuild every cached tier and expiry timer from ``subscriptions`` (after loading)."""
+    now = time.time()
+    entries = []
+    server_tiers.clear()
+    subscription_index.clear()
+    for server_id, record in subscriptions.items():
+        subscription_index.update(server_id, subscription_expiry_ts(record), record.get("status"))
+        expires_ts = _live_pro_expiry(record, now)
+        if expires_ts is not None:
+            server_tiers[int(server_id)] = SubscriptionTier.PRO
+            entries.append((int(server_id), expires_ts))
+    subscription_expiry.rebuild(entries)
+    subscription_expiry.start(expire_server_tiers)
+
+async def expire_server_tiers(server_ids: Iterable[int]):
+    """Expiry timer callback: the servers' Pro access ran out just now."""
+    for server_id in server_ids:
+        refresh_server_tier(server_id)
+        if server_id not in server_tiers:
+            logging.info(f"⌛ Pro subscription expired for server {server_id}")
+
+async def get_paypal_access_token():
+    """Get a PayPal access token for API calls (cached until shortly before it expires)."""
     if not PAYPAL_CLIENT_ID or not PAYPAL_CLIENT_SECRET:
         logging.error("PayPal credentials not configured")
         return None
     
     try:
-        url = f"{PAYPAL_BASE_URL}/v1/oauth2/token"
-        headers = {
-            "Accept": "application/json",
-            "Accept-Language": "en_US",
-            "Authorization": f"Basic {base64.b64encode(f'{PAYPAL_CLIENT_ID}:{PAYPAL_CLIENT_SECRET}'.encode()).decode()}"
-        }
-        data = "grant_type=client_credentials"
-        
-        response = requests.post(url, headers=headers, data=data, timeout=30)
-        
-        if response.status_code == 200:
-            return response.json().get("access_token")
-        else:
-            logging.error(f"PayPal auth failed: {response.status_code} - {response.text}")
-            return None
-            
+        return await paypal.access_token()
+    except PayPalError as e:
+        logging.error(f"PayPal auth failed: {e.status} - {e.body or e}")
+        return None
     except Exception as e:
         logging.error(f"Error getting PayPal token: {e}")
         return None
 
-def create_paypal_subscription(server_id: str, server_name: str):
+async def create_paypal_subscription(server_id: str, server_name: str):
     """Create a PayPal subscription for a server."""
     # Validate configuration first
     if not PAYPAL_CLIENT_ID or not PAYPAL_CLIENT_SECRET:
@@ -65,173 +154,199 @@ def create_paypal_subscription(server_id: str, server_name: str):
         logging.error("PAYPAL_PLAN_ID environment variable not configured")
         return None
     
-    access_token = get_paypal_access_token()
-    if not access_token:
-        logging.error("Failed to get PayPal access token")
-        return None
+    subscription_data = {
+        "plan_id": PAYPAL_PLAN_ID,  # Use environment variable
+        "custom_id": f"givzy-{server_id}",
+        "application_context": {
+            "brand_name": "Givzy Bot",
+            "locale": "en-US",
+            "shipping_preference": "NO_SHIPPING",
+            "user_action": "SUBSCRIBE_NOW",
+            "payment_method": {
+                "payer_selected": "PAYPAL",
+                "payee_preferred": "IMMEDIATE_PAYMENT_REQUIRED"
+            },
+            "return_url": "https://example.com/return",  # Replace with your return URL
+            "cancel_url": "https://example.com/cancel"   # Replace with your cancel URL
+        }
+    }
+    # One idempotency key per purchase attempt; the client reuses it on every retry
+    request_id = f"givzy-sub-{server_id}-{secrets.token_hex(8)}"
     
     try:
-        # Create subscription
-        url = f"{PAYPAL_BASE_URL}/v1/billing/subscriptions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "PayPal-Request-Id": f"givzy-sub-{server_id}-{secrets.token_hex(8)}"
-        }
-        
-        subscription_data = {
-            "plan_id": PAYPAL_PLAN_ID,  # Use environment variable
-            "custom_id": f"givzy-{server_id}",
-            "application_context": {
-                "brand_name": "Givzy Bot",
-                "locale": "en-US",
-                "shipping_preference": "NO_SHIPPING",
-                "user_action": "SUBSCRIBE_NOW",
-                "payment_method": {
-                    "payer_selected": "PAYPAL",
-                    "payee_preferred": "IMMEDIATE_PAYMENT_REQUIRED"
-                },
-                "return_url": "https://example.com/return",  # Replace with your return URL
-                "cancel_url": "https://example.com/cancel"   # Replace with your cancel URL
-            }
-        }
-        
-        # Add timeout to prevent hanging
-        response = requests.post(url, headers=headers, json=subscription_data, timeout=30)
-        
-        if response.status_code == 201:
-            subscription = response.json()
-            approval_url = None
-            
-            for link in subscription.get("links", []):
-                if link.get("rel") == "approve":
-                    approval_url = link.get("href")
-                    break
-            
-            if approval_url:
-                logging.info(f"✅ PayPal subscription created for server {server_id}")
-                return {
-                    "subscription_id": subscription.get("id"),
-                    "approval_url": approval_url
-                }
-            else:
-                logging.error(f"No approval URL found in PayPal response for server {server_id}")
-                return None
-        else:
-            logging.error(f"PayPal subscription creation failed: {response.status_code}")
-            logging.error(f"Response: {response.text}")
-            return None
-            
-    except requests.exceptions.Timeout:
-        logging.error("PayPal API request timed out")
-        return None
-    except requests.exceptions.RequestException as e:
-        logging.error(f"PayPal API request failed: {e}")
+        subscription = await paypal.create_subscription(subscription_data, request_id)
+    except PayPalError as e:
+        logging.error(f"PayPal subscription creation failed: {e.status or e}")
+        if e.body:
+            logging.error(f"Response: {e.body}")
         return None
     except Exception as e:
         logging.error(f"Unexpected error creating PayPal subscription: {e}")
         return None
+    
+    approval_url = None
+    for link in subscription.get("links", []):
+        if link.get("rel") == "approve":
+            approval_url = link.get("href")
+            break
+    
+    if approval_url:
+        logging.info(f"✅ PayPal subscription created for server {server_id}")
+        return {
+            "subscription_id": subscription.get("id"),
+            "approval_url": approval_url
+        }
+    else:
+        logging.error(f"No approval URL found in PayPal response for server {server_id}")
+        return None
 
 def is_server_subscribed(server_id: int) -> bool:
     """Check if a server has an active Pro subscription."""
-    server_data = subscriptions.get(str(server_id))
-    if not server_data:
-        return False
-    
-    if server_data.get("tier") != SubscriptionTier.PRO:
-        return False
-    
-    # Check if subscription is still active
-    expires_at = server_data.get("expires_at")
-    if expires_at:
-        try:
-            expiry_date = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-            return datetime.now(timezone.utc) < expiry_date
-        except (ValueError, AttributeError):
-            return False
-    
-    return False
+    return server_id in server_tiers
 
 def get_server_tier(server_id: int) -> str:
     """Get the subscription tier for a server."""
-    if is_server_subscribed(server_id):
-        return SubscriptionTier.PRO
-    return SubscriptionTier.FREE
+    return server_tiers.get(server_id, SubscriptionTier.FREE)
 
-async def load_subscriptions(bot):
-    """Load subscription data from the database channel."""
-    global subscriptions
+async def load_subscriptions(bot, store=None, primary: bool = True):
+    """Load subscription records from local storage, falling back to the newest channel backup.
+    
+    Only the primary process (the one running shard 0) restores the backup and runs the
+    PayPal jobs; other shard processes read the shared store and keep re-reading it.
+    """
+    global subscriptions, subscription_store
+    subscription_store = store
     
     try:
-        db_channel = bot.get_channel(SUBSCRIPTION_DB_CHANNEL_ID)
-        if not db_channel:
-            logging.error(f"Subscription database channel {SUBSCRIPTION_DB_CHANNEL_ID} not found!")
+        local_records = await asyncio.to_thread(store.load_subscriptions) if store else None
+        if local_records is not None:
+            subscriptions = local_records
+            logging.info(f"✅ Loaded {len(subscriptions)} subscription records from local storage")
+            return
+        if not primary:
+            logging.warning("📂 Shared subscription storage is empty; start the process running shard 0 first to restore it")
             subscriptions = {}
             return
-
-        subscriptions = {}
         
-        # Look for the most recent valid subscription database message
-        async for message in db_channel.history(limit=20):
-            if message.author == bot.user and message.content.startswith("```json"):
-                try:
-                    json_content = message.content[7:-3].strip()  # Remove ```json and ```
-                    if json_content:
-                        data = json.loads(json_content)
-                        if isinstance(data, dict) and "subscriptions" in data:
-                            subscriptions = data["subscriptions"]
-                            logging.info(f"✅ Loaded {len(subscriptions)} subscription records")
-                            return
-                except json.JSONDecodeError:
-                    continue
-        
-        # If no valid data found, start with empty subscriptions
-        logging.info("📝 No subscription data found, starting with empty database")
-        subscriptions = {}
+        # Fresh disk (or channel-only storage): restore the backup and seed local storage with it
+        subscriptions = await restore_subscription_backup(bot)
+        if subscriptions and store:
+            await asyncio.to_thread(store.save_subscriptions, subscriptions)
         
     except Exception as e:
         logging.error(f"Critical error loading subscriptions: {e}")
         subscriptions = {}
+    finally:
+        rebuild_tier_cache()
+        start_subscription_jobs(bot, primary)
+
+async def restore_subscription_backup(bot) -> Dict[str, dict]:
+    """Newest subscription backup in the database channel (attachment, or a legacy inline JSON message)."""
+    db_channel = bot.get_channel(SUBSCRIPTION_DB_CHANNEL_ID)
+    if not db_channel:
+        logging.error(f"Subscription database channel {SUBSCRIPTION_DB_CHANNEL_ID} not found!")
+        return {}
+    
+    async for message in db_channel.history(limit=None):
+        if message.author != bot.user:
+            continue
+        try:
+            if message.attachments and message.attachments[0].filename == SUBSCRIPTION_BACKUP_FILENAME:
+                compressed = await message.attachments[0].read()
+                data = json.loads(await asyncio.to_thread(gzip.decompress, compressed))
+            elif message.content.startswith("```json"):
+                json_content = message.content[7:-3].strip()  # Remove ```json and ```
+                data = json.loads(json_content) if json_content else None
+            else:
+                continue
+        except (discord.HTTPException, OSError, EOFError, json.JSONDecodeError) as e:
+            logging.warning(f"Skipping unreadable subscription backup {message.id}: {e}")
+            continue
+        if isinstance(data, dict) and "subscriptions" in data:
+            logging.info(f"✅ Restored {len(data['subscriptions'])} subscription records from backup {message.id}")
+            return data["subscriptions"]
+    
+    # If no valid data found, start with empty subscriptions
+    logging.info("📝 No subscription data found, starting with empty database")
+    return {}
+
+def note_subscription_change(server_id):
+    """Record that a subscription record changed: refresh its tier and queue it for saving."""
+    global _backup_pending
+    _dirty_subscriptions.add(str(server_id))
+    _backup_pending = True
+    refresh_server_tier(server_id)
 
 async def save_subscriptions(bot):
-    """Save subscription data to the database channel."""
+    """Write the changed subscription records to local storage.
+    
+    Without local storage the channel backup is the only copy, so it is posted right
+    away; otherwise it follows on the hourly subscription job.
+    """
+    global _dirty_subscriptions
+    if subscription_store is None:
+        _dirty_subscriptions = set()
+        await backup_subscriptions(bot)
+        return
+    
+    async with _subscription_save_lock:
+        if not _dirty_subscriptions:
+            return
+        dirty, _dirty_subscriptions = _dirty_subscriptions, set()
+        # Copied on the loop: webhooks and reconciliation keep changing the live records
+        # while the worker thread serializes them
+        records = {server_id: copy.deepcopy(subscriptions[server_id]) for server_id in dirty if server_id in subscriptions}
+        try:
+            await asyncio.to_thread(subscription_store.save_subscriptions, records)
+            logging.info(f"✅ Saved {len(records)} changed subscription record(s)")
+        except Exception as e:
+            # Keep them queued for the next save
+            _dirty_subscriptions |= dirty
+            logging.error(f"Critical error saving subscriptions: {e}")
+
+async def backup_subscriptions(bot, force: bool = False):
+    """Post every subscription record to the database channel as one gzip-compressed attachment."""
+    global _backup_pending
+    if not (force or _backup_pending):
+        return
     try:
         db_channel = bot.get_channel(SUBSCRIPTION_DB_CHANNEL_ID)
         if not db_channel:
             logging.error(f"Subscription database channel {SUBSCRIPTION_DB_CHANNEL_ID} not found!")
             return
 
+        _backup_pending = False
         # Create subscription database structure
         subscription_data = {
             "subscriptions": subscriptions,
             "metadata": {
-                "version": "1.0",
+                "version": "2.0",
                 "last_updated": datetime.now(timezone.utc).isoformat(),
                 "total_subscriptions": len(subscriptions),
-                "active_subscriptions": sum(1 for s in subscriptions.values() if s.get("tier") == SubscriptionTier.PRO)
+                "active_subscriptions": len(server_tiers)
             }
         }
         
-        json_content = json.dumps(subscription_data, indent=2, ensure_ascii=False)
+        raw = json.dumps(subscription_data, ensure_ascii=False, separators=(",", ":")).encode()
+        compressed = await asyncio.to_thread(gzip.compress, raw, 6)
         timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
         
-        message_content = f"```json\n{json_content}\n```"
-        
         embed = discord.Embed(
             title="💳 Givzy Subscription Database",
             description=f"**Total Subscriptions:** {len(subscriptions)}\n"
                        f"**Active Pro:** {subscription_data['metadata']['active_subscriptions']}\n"
-                       f"**Last Updated:** {timestamp}",
+                       f"**Last Updated:** {timestamp}\n"
+                       f"**Size:** {len(raw):,} bytes ({len(compressed):,} compressed)",
             color=discord.Color.gold(),
             timestamp=datetime.now(timezone.utc)
         )
         
-        await db_channel.send(content=message_content, embed=embed)
-        logging.info(f"✅ Subscription database saved successfully")
+        await db_channel.send(embed=embed, file=discord.File(io.BytesIO(compressed), filename=SUBSCRIPTION_BACKUP_FILENAME))
+        logging.info(f"✅ Subscription backup posted ({len(compressed):,} bytes)")
         
     except Exception as e:
-        logging.error(f"Critical error saving subscriptions: {e}")
+        _backup_pending = True
+        logging.error(f"Critical error backing up subscriptions: {e}")
 
 def add_subscription_commands(tree: app_commands.CommandTree, bot):
     """Add subscription-related commands to the command tree."""
@@ -285,19 +400,11 @@ def add_subscription_commands(tree: app_commands.CommandTree, bot):
             # Check if already subscribed (quick check)
             if is_server_subscribed(interaction.guild.id):
                 server_data = subscriptions.get(str(interaction.guild.id))
-                expires_at = server_data.get("expires_at", "Unknown")
-                
-                try:
-                    timestamp = int(datetime.fromisoformat(expires_at.replace('Z', '+00:00')).timestamp())
-                    await interaction.edit_original_response(
-                        content=f"✅ This server already has Givzy Pro!\n"
-                                f"**Expires:** <t:{timestamp}:F> (<t:{timestamp}:R>)"
-                    )
-                except:
-                    await interaction.edit_original_response(
-                        content="✅ This server already has Givzy Pro!\n"
-                                f"**Expires:** {expires_at}"
-                    )
+                timestamp = int(subscription_expiry_ts(server_data))
+                await interaction.edit_original_response(
+                    content=f"✅ This server already has Givzy Pro!\n"
+                            f"**Expires:** <t:{timestamp}:F> (<t:{timestamp}:R>)"
+                )
                 return
             
             # Update status message
@@ -309,9 +416,8 @@ def add_subscription_commands(tree: app_commands.CommandTree, bot):
             
             # Create PayPal subscription asynchronously with proper error handling
             try:
-                # Use asyncio.to_thread to run the blocking PayPal call in a thread
                 paypal_data = await asyncio.wait_for(
-                    asyncio.to_thread(create_paypal_subscription, str(interaction.guild.id), interaction.guild.name),
+                    create_paypal_subscription(str(interaction.guild.id), interaction.guild.name),
                     timeout=25.0  # Reduced timeout to be safer
                 )
                 
@@ -360,6 +466,7 @@ def add_subscription_commands(tree: app_commands.CommandTree, bot):
                 "created_at": datetime.now(timezone.utc).isoformat(),
                 "owner_id": interaction.user.id
             }
+            note_subscription_change(interaction.guild.id)
             
             # Save subscription data
             try:
@@ -471,15 +578,12 @@ def add_subscription_commands(tree: app_commands.CommandTree, bot):
                 embed.set_footer(text="Free tier includes all core giveaway features")
             else:
                 # Pro subscription
-                expires_at = server_data.get("expires_at")
+                expires_ts = subscription_expiry_ts(server_data)
                 status = "Active ✅" if is_server_subscribed(interaction.guild.id) else "Expired ❌"
                 
-                if expires_at:
-                    try:
-                        timestamp = int(datetime.fromisoformat(expires_at.replace('Z', '+00:00')).timestamp())
-                        expiry_text = f"<t:{timestamp}:F> (<t:{timestamp}:R>)"
-                    except:
-                        expiry_text = expires_at
+                if expires_ts:
+                    timestamp = int(expires_ts)
+                    expiry_text = f"<t:{timestamp}:F> (<t:{timestamp}:R>)"
                 else:
                     expiry_text = "Unknown"
                 
@@ -526,9 +630,9 @@ def add_subscription_commands(tree: app_commands.CommandTree, bot):
             except:
                 pass  # Give up gracefully
 
-# Webhook handler for PayPal (you'll need to implement this in your web server)
-def handle_paypal_webhook(webhook_data):
-    """Handle PayPal webhook notifications for subscription events."""
+# Webhook handler for PayPal (events arrive through paypal_webhooks.WebhookReceiver)
+def handle_paypal_webhook(webhook_data) -> bool:
+    """Handle PayPal webhook notifications for subscription events. Returns True if a record changed."""
     try:
         event_type = webhook_data.get("event_type")
         resource = webhook_data.get("resource", {})
@@ -544,9 +648,11 @@ def handle_paypal_webhook(webhook_data):
                     subscriptions[server_id]["tier"] = SubscriptionTier.PRO
                     subscriptions[server_id]["status"] = "active"
                     subscriptions[server_id]["activated_at"] = datetime.now(timezone.utc).isoformat()
-                    subscriptions[server_id]["expires_at"] = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+                    set_subscription_expiry(subscriptions[server_id], datetime.now(timezone.utc) + timedelta(days=30))
+                    note_subscription_change(server_id)
                     
                     logging.info(f"✅ Subscription activated for server {server_id}")
+                    return True
         
         elif event_type == "BILLING.SUBSCRIPTION.CANCELLED":
             # Subscription cancelled
@@ -557,8 +663,11 @@ def handle_paypal_webhook(webhook_data):
                 if server_id in subscriptions:
                     subscriptions[server_id]["status"] = "cancelled"
                     subscriptions[server_id]["cancelled_at"] = datetime.now(timezone.utc).isoformat()
+                    # Access already paid for lasts until expires_at
+                    note_subscription_change(server_id)
                     
                     logging.info(f"❌ Subscription cancelled for server {server_id}")
+                    return True
         
         elif event_type == "BILLING.SUBSCRIPTION.PAYMENT.FAILED":
             # Payment failed
@@ -569,11 +678,189 @@ def handle_paypal_webhook(webhook_data):
                 if server_id in subscriptions:
                     subscriptions[server_id]["status"] = "payment_failed"
                     subscriptions[server_id]["payment_failed_at"] = datetime.now(timezone.utc).isoformat()
+                    note_subscription_change(server_id)
                     
                     logging.warning(f"⚠️ Payment failed for server {server_id}")
+                    return True
         
     except Exception as e:
         logging.error(f"Error processing PayPal webhook: {e}")
+    return False
+
+def webhook_server_id(event) -> Optional[str]:
+    """The server a subscription webhook event is about (from the ``givzy-<id>`` custom ID)."""
+    custom_id = (event.get("resource") or {}).get("custom_id") or ""
+    return custom_id[len("givzy-"):] if custom_id.startswith("givzy-") else None
+
+async def apply_webhook_events(bot, events):
+    """Apply a batch of verified webhook events, then persist the subscriptions once."""
+    # The /buy that created a record may have run in another shard process, which
+    # only wrote it to the shared store
+    await refresh_subscriptions_from_store(filter(None, map(webhook_server_id, events)))
+    changed = 0
+    for event in events:
+        if handle_paypal_webhook(event):
+            changed += 1
+    if changed:
+        logging.info(f"💳 Applied {changed} subscription change(s) from {len(events)} PayPal webhook event(s)")
+        await save_subscriptions(bot)
+
+# --- reconciliation ---------------------------------------------------------------
+
+def reconciliation_candidates(now: float) -> List[str]:
+    """Server IDs due for a status check: near (or just past) expiry, or stuck pending/failed."""
+    due = subscription_index.expiring_between(
+        now - RECONCILE_LOOKBACK.total_seconds(), now + RECONCILE_WINDOW.total_seconds()
+    )
+    seen = set(due)
+    for status in RECONCILE_STATUSES:
+        due.extend(sorted(subscription_index.status_ids(status) - seen))
+        seen.update(due)
+    return [server_id for server_id in due
+            if subscriptions.get(server_id, {}).get("paypal_subscription_id")
+            and subscriptions[server_id].get("status") not in RECONCILE_FINAL_STATUSES]
+
+async def fetch_paypal_subscriptions(subscription_ids: List[str]) -> Dict[str, Optional[dict]]:
+    """Look up many PayPal subscriptions concurrently over the pooled client (None where a lookup failed)."""
+    semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def fetch(subscription_id: str) -> Optional[dict]:
+        async with semaphore:
+            try:
+                return await paypal.get_subscription(subscription_id)
+            except PayPalError as e:
+                logging.warning(f"⚠️ Could not fetch PayPal subscription {subscription_id}: {e}")
+                return None
+
+    results = await asyncio.gather(*(fetch(subscription_id) for subscription_id in subscription_ids))
+    return dict(zip(subscription_ids, results))
+
+def apply_paypal_state(server_id: str, remote: dict) -> bool:
+    """Bring one record in line with PayPal's view of its subscription. Returns True if it changed."""
+    record = subscriptions[server_id]
+    before = dict(record)
+    paypal_status = remote.get("status")
+    now = datetime.now(timezone.utc)
+
+    if paypal_status == "ACTIVE":
+        record["tier"] = SubscriptionTier.PRO
+        record["status"] = "active"
+        record.setdefault("activated_at", now.isoformat())
+        next_billing = (remote.get("billing_info") or {}).get("next_billing_time")
+        try:
+            expires = datetime.fromisoformat(next_billing.replace('Z', '+00:00')) + RENEWAL_GRACE
+        except (ValueError, AttributeError):
+            expires = now + timedelta(days=30)
+        if expires.timestamp() != subscription_expiry_ts(record):
+            set_subscription_expiry(record, expires)
+    elif paypal_status == "CANCELLED":
+        # Access already paid for lasts until expires_at
+        record["status"] = "cancelled"
+        record.setdefault("cancelled_at", now.isoformat())
+    elif paypal_status == "SUSPENDED":
+        record["status"] = "payment_failed"
+        record.setdefault("payment_failed_at", now.isoformat())
+    elif paypal_status == "EXPIRED":
+        record["tier"] = SubscriptionTier.FREE
+        record["status"] = "expired"
+    elif paypal_status == "APPROVAL_PENDING" and record.get("status") == "pending":
+        try:
+            created = datetime.fromisoformat(record["created_at"])
+        except (KeyError, ValueError, TypeError):
+            created = now
+        if now - created > PENDING_ABANDON_AFTER:
+            record["status"] = "abandoned"
+
+    if record == before:
+        return False
+    note_subscription_change(server_id)
+    return True
+
+async def reconcile_subscriptions(bot) -> int:
+    """Check every due record against PayPal, apply the results and persist them in one save."""
+    candidates = reconciliation_candidates(time.time())
+    if not candidates:
+        return 0
+    by_paypal_id = {subscriptions[server_id]["paypal_subscription_id"]: server_id for server_id in candidates}
+    remote_states = await fetch_paypal_subscriptions(list(by_paypal_id))
+
+    changed = 0
+    for paypal_id, remote in remote_states.items():
+        server_id = by_paypal_id[paypal_id]
+        # The record may have been replaced (e.g. a new /buy) while we were waiting on PayPal
+        record = subscriptions.get(server_id)
+        if remote is None or not record or record.get("paypal_subscription_id") != paypal_id:
+            continue
+        if apply_paypal_state(server_id, remote):
+            changed += 1
+
+    logging.info(f"🔄 Reconciled {len(candidates)} subscription(s) with PayPal, {changed} updated")
+    if changed:
+        await save_subscriptions(bot)
+    return changed
+
+async def _subscription_loop(bot):
+    while True:
+        if paypal.configured:
+            try:
+                # Include records other shard processes created since the last run
+                await reload_subscriptions()
+                await reconcile_subscriptions(bot)
+            except Exception as e:
+                logging.error(f"Error reconciling subscriptions: {e}")
+        await backup_subscriptions(bot)
+        await asyncio.sleep(RECONCILE_INTERVAL)
+
+async def reload_subscriptions():
+    """Re-read every record from the shared store, keeping local changes that are not saved yet."""
+    global subscriptions
+    if subscription_store is None:
+        return
+    # Not while a save is writing: the store would still hold the older versions
+    async with _subscription_save_lock:
+        records = await asyncio.to_thread(subscription_store.load_subscriptions)
+        if records is None:
+            return
+        for server_id in _dirty_subscriptions:
+            if server_id in subscriptions:
+                records[server_id] = subscriptions[server_id]
+        subscriptions = records
+        rebuild_tier_cache()
+
+async def refresh_subscriptions_from_store(server_ids: Iterable[str]):
+    """Re-read a few records from the shared store, keeping local changes that are not saved yet."""
+    if subscription_store is None:
+        return
+    wanted = sorted(set(server_ids) - _dirty_subscriptions)
+    if not wanted:
+        return
+    async with _subscription_save_lock:
+        records = await asyncio.to_thread(subscription_store.load_subscription_records, wanted)
+        for server_id, record in records.items():
+            # Changed here while we were reading
+            if server_id in _dirty_subscriptions:
+                continue
+            subscriptions[server_id] = record
+            refresh_server_tier(server_id)
+
+async def _subscription_refresh_loop():
+    while True:
+        await asyncio.sleep(SUBSCRIPTION_REFRESH_INTERVAL)
+        try:
+            await reload_subscriptions()
+        except Exception as e:
+            logging.error(f"Error reloading subscriptions: {e}")
+
+def start_subscription_jobs(bot, primary: bool = True):
+    """Start the hourly reconciliation and channel backup job, or the shared-store refresh
+    on non-primary shard processes (no-op if already running)."""
+    global _subscription_task
+    if _subscription_task and not _subscription_task.done():
+        return
+    if primary:
+        _subscription_task = asyncio.create_task(_subscription_loop(bot))
+    else:
+        _subscription_task = asyncio.create_task(_subscription_refresh_loop())
 
 def check_feature_access(server_id: int, feature: str) -> Tuple[bool, str]:
     """
@@ -630,8 +917,7 @@ def validate_paypal_config() -> Tuple[bool, str]:
 async def test_paypal_connection():
     """Test PayPal API connection."""
     try:
-        # Run in thread to avoid blocking
-        token = await asyncio.to_thread(get_paypal_access_token)
+        token = await get_paypal_access_token()
         if token:
             logging.info("✅ PayPal API connection test successful")
             return True
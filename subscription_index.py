@@ -0,0 +1,64 @@
+import bisect
+from typing import Dict, List, Optional, Set, Tuple
+
+class SubscriptionIndex:
+    """Expiry-ordered and per-status indexes over the subscription records.
+
+    ``(expires_ts, server_id)`` pairs are kept sorted, so "everything expiring in
+    this window" is a bisect plus a slice instead of a scan over every record.
+    Records are re-indexed through ``update`` whenever they change.
+    """
+
+    def __init__(self):
+        self._by_expiry: List[Tuple[float, str]] = []
+        self._by_status: Dict[str, Set[str]] = {}
+        # server_id -> (expires_ts, status) currently indexed, used to unlink on change
+        self._entries: Dict[str, Tuple[Optional[float], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, server_id: str, expires_ts: Optional[float], status: Optional[str]):
+        """Index a record, or re-index it after its expiry or status changed."""
+        previous = self._entries.get(server_id)
+        if previous == (expires_ts, status):
+            return
+        if previous is not None:
+            self._unlink(server_id, *previous)
+
+        if expires_ts is not None:
+            bisect.insort(self._by_expiry, (expires_ts, server_id))
+        if status:
+            self._by_status.setdefault(status, set()).add(server_id)
+        self._entries[server_id] = (expires_ts, status)
+
+    def remove(self, server_id: str):
+        previous = self._entries.pop(server_id, None)
+        if previous is not None:
+            self._unlink(server_id, *previous)
+
+    def clear(self):
+        self._by_expiry.clear()
+        self._by_status.clear()
+        self._entries.clear()
+
+    def expiring_between(self, start: float, end: float) -> List[str]:
+        """Server IDs whose expiry falls in ``[start, end)``, soonest first."""
+        low = bisect.bisect_left(self._by_expiry, (start, ""))
+        high = bisect.bisect_left(self._by_expiry, (end, ""))
+        return [server_id for _, server_id in self._by_expiry[low:high]]
+
+    def status_ids(self, status: str) -> Set[str]:
+        return self._by_status.get(status, set())
+
+    def _unlink(self, server_id: str, expires_ts: Optional[float], status: Optional[str]):
+        if expires_ts is not None:
+            position = bisect.bisect_left(self._by_expiry, (expires_ts, server_id))
+            if position < len(self._by_expiry) and self._by_expiry[position] == (expires_ts, server_id):
+                del self._by_expiry[position]
+        if status:
+            bucket = self._by_status.get(status)
+            if bucket is not None:
+                bucket.discard(server_id)
+                if not bucket:
+                    del self._by_status[status]
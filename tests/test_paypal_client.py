@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from paypal_client import PayPalClient, PayPalError
+
+class StandIn:
+    """A scripted PayPal: hands out tokens and answers API calls from a queue of statuses."""
+
+    def __init__(self, statuses=(), retry_after=None, token_delay=0.0):
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+        self.tokens_issued = 0
+        self.api_requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/v1/oauth2/token":
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            self.tokens_issued += 1
+            return httpx.Response(200, json={"access_token": f"token-{self.tokens_issued}", "expires_in": 32400})
+
+        self.api_requests.append(request)
+        status = self.statuses.pop(0) if self.statuses else 201
+        headers = {"Retry-After": self.retry_after} if self.retry_after and status in (429, 503) else {}
+        return httpx.Response(status, headers=headers, json={"id": "I-SUB", "status": "APPROVAL_PENDING"})
+
+def make_client(stand_in: StandIn, **kwargs) -> PayPalClient:
+    kwargs.setdefault("backoff", 0.0)
+    return PayPalClient("client-id", "secret", base_url="https://paypal.test",
+                        transport=httpx.MockTransport(stand_in), **kwargs)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_token_is_cached_between_calls():
+    stand_in = StandIn()
+
+    async def scenario():
+        client = make_client(stand_in)
+        try:
+            for _ in range(3):
+                await client.get_subscription("I-SUB")
+        finally:
+            await client.aclose()
+
+    run(scenario())
+    assert stand_in.tokens_issued == 1
+    assert {r.headers["Authorization"] for r in stand_in.api_requests} == {"Bearer token-1"}
+
+def test_concurrent_callers_share_one_token_refresh():
+    stand_in = StandIn(token_delay=0.05)
+
+    async def scenario():
+        client = make_client(stand_in)
+        try:
+            return await asyncio.gather(*(client.access_token() for _ in range(20)))
+        finally:
+            await client.aclose()
+
+    tokens = run(scenario())
+    assert stand_in.tokens_issued == 1
+    assert set(tokens) == {"token-1"}
+
+def test_revoked_token_is_refreshed_once():
+    stand_in = StandIn(statuses=[401])
+
+    async def scenario():
+        client = make_client(stand_in)
+        try:
+            return await client.get_subscription("I-SUB")
+        finally:
+            await client.aclose()
+
+    assert run(scenario())["id"] == "I-SUB"
+    assert stand_in.tokens_issued == 2
+    assert [r.headers["Authorization"] for r in stand_in.api_requests] == ["Bearer token-1", "Bearer token-2"]
+
+@pytest.mark.parametrize("status", [408, 429, 500, 502, 503, 504])
+def test_retryable_statuses_reuse_the_request_id(status):
+    stand_in = StandIn(statuses=[status, status], retry_after="0")
+
+    async def scenario():
+        client = make_client(stand_in)
+        try:
+            return await client.create_subscription({"plan_id": "P-1"}, request_id="givzy-123-abc")
+        finally:
+            await client.aclose()
+
+    assert run(scenario())["id"] == "I-SUB"
+    assert len(stand_in.api_requests) == 3
+    assert {r.headers["PayPal-Request-Id"] for r in stand_in.api_requests} == {"givzy-123-abc"}
+    assert all(json.loads(r.content) == {"plan_id": "P-1"} for r in stand_in.api_requests)
+
+def test_retry_after_is_honoured(monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def record_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr("paypal_client.asyncio.sleep", record_sleep)
+    stand_in = StandIn(statuses=[429], retry_after="7")
+
+    async def scenario():
+        client = make_client(stand_in)
+        try:
+            await client.get_subscription("I-SUB")
+        finally:
+            await client.aclose()
+
+    run(scenario())
+    assert delays == [7.0]
+
+def test_gives_up_after_max_retries():
+    stand_in = StandIn(statuses=[503] * 10)
+
+    async def scenario():
+        client = make_client(stand_in, max_retries=2)
+        try:
+            await client.get_subscription("I-SUB")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(PayPalError) as excinfo:
+        run(scenario())
+    assert excinfo.value.status == 503
+    assert len(stand_in.api_requests) == 3
+
+def test_client_errors_are_not_retried():
+    stand_in = StandIn(statuses=[422])
+
+    async def scenario():
+        client = make_client(stand_in)
+        try:
+            await client.create_subscription({"plan_id": "P-1"}, request_id="givzy-1")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(PayPalError) as excinfo:
+        run(scenario())
+    assert excinfo.value.status == 422
+    assert len(stand_in.api_requests) == 1
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("httpx")
+
+import subs
+from storage import create_store, BACKEND_SQLITE
+
+def activation_event(server_id: str) -> dict:
+    return {
+        "id": f"WH-{server_id}",
+        "event_type": "BILLING.SUBSCRIPTION.ACTIVATED",
+        "resource": {"id": "I-OTHER", "custom_id": f"givzy-{server_id}"},
+    }
+
+def test_activation_for_record_created_by_another_process(tmp_path):
+    async def scenario():
+        primary_store = create_store(BACKEND_SQLITE, str(tmp_path))
+        other_store = create_store(BACKEND_SQLITE, str(tmp_path))
+        try:
+            primary_store.save_subscriptions({"1": {"tier": "free", "status": "expired"}})
+            await subs.load_subscriptions(None, primary_store, primary=True)
+            assert "42" not in subs.subscriptions
+
+            # /buy ran in the shard process that owns server 42
+            other_store.save_subscriptions({"42": {
+                "tier": "free", "status": "pending", "paypal_subscription_id": "I-OTHER",
+                "created_at": time.time(),
+            }})
+
+            await subs.apply_webhook_events(None, [activation_event("42")])
+
+            assert subs.is_server_subscribed(42)
+            assert other_store.load_subscriptions()["42"]["status"] == "active"
+        finally:
+            if subs._subscription_task:
+                subs._subscription_task.cancel()
+            subs.subscription_expiry.stop()
+            primary_store.close()
+            other_store.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Set
+
+class _KeyedSemaphores:
+    """Lazily created semaphores per key, dropped again once nobody holds them."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphores: Dict[Hashable, asyncio.Semaphore] = {}
+        self._users: Dict[Hashable, int] = {}
+
+    async def acquire(self, key: Hashable):
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.limit)
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._release_user(key)
+            raise
+
+    def release(self, key: Hashable):
+        self._semaphores[key].release()
+        self._release_user(key)
+
+    def _release_user(self, key: Hashable):
+        self._users[key] -= 1
+        if not self._users[key]:
+            del self._users[key]
+            del self._semaphores[key]
+
+class BoundedWorkerPool:
+    """Runs submitted jobs concurrently under global, per-guild and per-channel limits.
+
+    Jobs are keyed so the same item is never processed twice at once. ``submit``
+    returns immediately; limits are acquired guild -> channel -> global so a job
+    blocked on a busy channel never occupies a global slot.
+    """
+
+    def __init__(self, max_workers: int = 16, per_guild: int = 4, per_channel: int = 2):
+        self._global = asyncio.Semaphore(max_workers)
+        self._guilds = _KeyedSemaphores(per_guild)
+        self._channels = _KeyedSemaphores(per_channel)
+        self._in_flight: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def submit(self, key: Hashable, job: Callable[..., Awaitable[None]], *args,
+               guild_id: Optional[int] = None, channel_id: Optional[int] = None) -> bool:
+        """Schedule ``job(*args)``; returns False if ``key`` is already queued or running."""
+        if key in self._in_flight:
+            return False
+        self._in_flight.add(key)
+        task = asyncio.create_task(self._run(key, job, args, guild_id, channel_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def join(self):
+        """Wait until every submitted job has finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _run(self, key, job, args, guild_id, channel_id):
+        try:
+            await self._guilds.acquire(guild_id)
+            try:
+                await self._channels.acquire(channel_id)
+                try:
+                    async with self._global:
+                        await job(*args)
+                finally:
+                    self._channels.release(channel_id)
+            finally:
+                self._guilds.release(guild_id)
+        except Exception as e:
+            logging.error(f"Worker job {key} failed: {e}")
+        finally:
+            self._in_flight.discard(key)